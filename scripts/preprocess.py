@@ -7,17 +7,20 @@ March 2021.
 
 """
 import os
+import argparse
 import configparser
 import json
-import random
+import multiprocessing
 import numpy as np
 import pandas as pd
 import geopandas as gpd
-import pyproj
 from shapely.geometry import MultiPolygon
 import rasterio
-from rasterio.mask import mask
-from rasterstats import zonal_stats
+from rasterio.mask import raster_geometry_mask
+
+from cucumber.areas import geodesic_area, cached_geodesic_areas
+from cucumber.tasks import Stage, run_stages
+from cucumber.zonal import zonal_sums, zonal_sums_tiled, clip_raster_tiled
 
 from misc import find_country_list
 
@@ -28,6 +31,96 @@ BASE_PATH = CONFIG['file_locations']['base_path']
 DATA_RAW = os.path.join(BASE_PATH, '..', '..', 'data_raw')
 DATA_INTERMEDIATE = os.path.join(BASE_PATH, 'intermediate')
 DATA_PROCESSED = os.path.join(BASE_PATH, 'processed')
+TILE_SIZE = CONFIG.getint('raster', 'tile_size', fallback=0)
+SEED = 42
+
+
+def build_gadm_index(level):
+    """
+    Index the rows of a global GADM layer by country.
+
+    Only the attribute table is read. The index records each country's
+    runs of consecutive rows, so a country's shapes can later be read
+    without loading the rest of the world. The index is rebuilt when
+    the GADM layer changes.
+
+    Parameters
+    ----------
+    level : int
+        GADM administrative level.
+
+    Returns
+    -------
+    path : string
+        Path to the .csv index.
+
+    """
+    path_gadm = os.path.join(DATA_RAW, 'gadm36_levels_shp',
+        'gadm36_{}.shp'.format(level))
+
+    folder = os.path.join(DATA_INTERMEDIATE, 'gadm_index')
+    path = os.path.join(folder, 'gadm36_{}.csv'.format(level))
+
+    if (os.path.exists(path) and os.path.getmtime(path) >=
+        os.path.getmtime(path_gadm.replace('.shp', '.dbf'))):
+        return path
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    gid_0 = gpd.read_file(path_gadm, ignore_geometry=True)['GID_0']
+
+    #a new run starts wherever the country code changes
+    starts = np.flatnonzero(np.r_[True, gid_0.values[1:] != gid_0.values[:-1]])
+    stops = np.r_[starts[1:], len(gid_0)]
+
+    index = pd.DataFrame({
+        'GID_0': gid_0.values[starts],
+        'start': starts,
+        'stop': stops,
+    })
+
+    index.to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+    return path
+
+
+def read_gadm_country(level, iso3):
+    """
+    Read a single country's rows of a global GADM layer.
+
+    Parameters
+    ----------
+    level : int
+        GADM administrative level.
+    iso3 : string
+        Country code.
+
+    Returns
+    -------
+    regions : GeoDataFrame
+        The country's shapes, indexed by their row in the global layer.
+
+    """
+    path_gadm = os.path.join(DATA_RAW, 'gadm36_levels_shp',
+        'gadm36_{}.shp'.format(level))
+
+    index = pd.read_csv(build_gadm_index(level), keep_default_na=False)
+    index = index[index['GID_0'] == iso3]
+
+    if len(index) == 0:
+        return gpd.read_file(path_gadm, rows=1).iloc[:0]
+
+    parts = []
+    for start, stop in zip(index['start'], index['stop']):
+        part = gpd.read_file(path_gadm, rows=slice(start, stop))
+        part.index = pd.RangeIndex(start, stop)
+        parts.append(part)
+
+    regions = pd.concat(parts) if len(parts) > 1 else parts[0]
+
+    return regions
 
 
 def process_country_shapes(country):
@@ -44,18 +137,12 @@ def process_country_shapes(country):
 
     path = os.path.join(DATA_INTERMEDIATE, iso3)
 
-    if os.path.exists(os.path.join(path, 'national_outline.shp')):
-        return 'Completed national outline processing'
-
     if not os.path.exists(path):
         os.makedirs(path)
 
     shape_path = os.path.join(path, 'national_outline.shp')
 
-    path = os.path.join(DATA_RAW, 'gadm36_levels_shp', 'gadm36_0.shp')
-    countries = gpd.read_file(path)
-
-    single_country = countries[countries.GID_0 == iso3].reset_index()
+    single_country = read_gadm_country(0, iso3).reset_index()
 
     if not iso3 in ['MDV','COK','KIR','MHL','NIU']:
         single_country['geometry'] = single_country.apply(
@@ -98,17 +185,10 @@ def process_regions(country):
         folder = os.path.join(DATA_INTERMEDIATE, iso3, 'regions')
         path_processed = os.path.join(folder, filename)
 
-        if os.path.exists(path_processed):
-            continue
-
         if not os.path.exists(folder):
             os.mkdir(folder)
 
-        filename = 'gadm36_{}.shp'.format(regional_level)
-        path_regions = os.path.join(DATA_RAW, 'gadm36_levels_shp', filename)
-        regions = gpd.read_file(path_regions)
-
-        regions = regions[regions.GID_0 == iso3]
+        regions = read_gadm_country(regional_level, iso3)
 
         # exclusions = country['regions_to_exclude_GID_1']
         # regions = regions[~regions['GID_1'].astype(str).str.startswith(tuple(exclusions))]
@@ -125,7 +205,7 @@ def process_regions(country):
     return
 
 
-def process_settlement_layer(country):
+def process_settlement_layer(country, tile_size=TILE_SIZE):
     """
     Clip the settlement layer to the chosen country boundary
     and place in desired country folder.
@@ -134,6 +214,9 @@ def process_settlement_layer(country):
     ----------
     country : dict
         Contains all desired country information.
+    tile_size : int
+        If positive, stream the raster in tiles of this many pixels
+        rather than clipping it in memory.
 
     """
     iso3 = country['iso3']
@@ -142,9 +225,7 @@ def process_settlement_layer(country):
     path_settlements = os.path.join(DATA_RAW,'settlement_layer',
         'ppp_2020_1km_Aggregated.tif')
 
-    settlements = rasterio.open(path_settlements, 'r+')
-    settlements.nodata = 255
-    settlements.crs = {"init": "epsg:4326"}
+    settlements = rasterio.open(path_settlements)
 
     iso3 = country['iso3']
     path_country = os.path.join(DATA_INTERMEDIATE, iso3,
@@ -158,9 +239,6 @@ def process_settlement_layer(country):
     path_country = os.path.join(DATA_INTERMEDIATE, iso3)
     shape_path = os.path.join(path_country, 'settlements.tif')
 
-    if os.path.exists(shape_path):
-        return print('Completed settlement layer processing')
-
     print('----')
     print('Working on {} level {}'.format(iso3, regional_level))
 
@@ -171,11 +249,20 @@ def process_settlement_layer(country):
 
     coords = [json.loads(geo.to_json())['features'][0]['geometry']]
 
-    out_img, out_transform = mask(settlements, coords, crop=True)
+    if tile_size > 0:
+        clip_raster_tiled(settlements, coords, shape_path, tile_size,
+            nodata=255, crs='epsg:4326')
+        return print('Completed processing of settlement layer')
+
+    shape_mask, out_transform, window = raster_geometry_mask(
+        settlements, coords, crop=True)
+    out_img = settlements.read(window=window)
+    out_img[:, shape_mask] = 255
 
     out_meta = settlements.meta.copy()
 
     out_meta.update({"driver": "GTiff",
+                    "nodata": 255,
                     "height": out_img.shape[1],
                     "width": out_img.shape[2],
                     "transform": out_transform,
@@ -187,7 +274,7 @@ def process_settlement_layer(country):
     return print('Completed processing of settlement layer')
 
 
-def get_regional_data(country):
+def get_regional_data(country, tile_size=TILE_SIZE):
     """
     Extract regional data including luminosity and population.
 
@@ -195,6 +282,9 @@ def get_regional_data(country):
     ----------
     country : dict
         Contains all desired country information.
+    tile_size : int
+        If positive, read the settlement layer in tiles of this many
+        pixels rather than as a single array.
 
     """
     iso3 = country['iso3']
@@ -207,9 +297,6 @@ def get_regional_data(country):
         os.mkdir(folder)
     path_output = os.path.join(folder, filename)
 
-    # if os.path.exists(path_output):
-    #     return print('Regional data already exists')
-
     path_country = os.path.join(DATA_INTERMEDIATE, iso3,
         'national_outline.shp')
 
@@ -229,28 +316,30 @@ def get_regional_data(country):
         path = os.path.join(folder, filename)
         regions = gpd.read_file(path)#[:1]
 
-    results = []
-
-    for index, region in regions.iterrows():
+    if gid_level in regions:
+        region_ids = regions[gid_level]
+    else:
+        region_ids = regions.index
+    areas = cached_geodesic_areas(region_ids, regions['geometry'],
+        os.path.join(DATA_INTERMEDIATE, iso3, 'population', 'region_areas.csv'))
 
+    if tile_size > 0:
+        population_sums = zonal_sums_tiled(path_settlements,
+            list(regions['geometry']), tile_size)
+    else:
         with rasterio.open(path_settlements) as src:
+            population_sums = zonal_sums(src.read(1), src.transform,
+                list(regions['geometry']))
 
-            affine = src.transform
-            array = src.read(1)
-            array[array <= 0] = 0
-            
-            if region['geometry'] == None:
-                continue
+    results = []
 
-            population_summation = [d['sum'] for d in zonal_stats(
-                region['geometry'],
-                array,
-                stats=['sum'],
-                nodata=0,
-                affine=affine
-                )][0]
+    for (index, region), population_summation, area in zip(
+        regions.iterrows(), population_sums, areas):
 
-        area_km2 = round(area_of_polygon(region['geometry']) / 1e6)
+        if region['geometry'] == None:
+            continue
+
+        area_km2 = round(area / 1e6)
 
         if area_km2 == 0:
             continue
@@ -286,13 +375,7 @@ def area_of_polygon(geom):
     Returns the area of a polygon. Assume WGS84 as crs.
 
     """
-    geod = pyproj.Geod(ellps="WGS84")
-
-    poly_area, poly_perimeter = geod.geometry_area_perimeter(
-        geom
-    )
-
-    return abs(poly_area)
+    return geodesic_area(geom)
 
 
 def remove_small_shapes(x):
@@ -346,10 +429,17 @@ def remove_small_shapes(x):
         return MultiPolygon(new_geom)
 
 
-def process_unconstrained_site_estimation(country):
+def process_unconstrained_site_estimation(country, seed=SEED):
     """
     Allocate towers using an unconstrained site estimation process.
 
+    Parameters
+    ----------
+    country : dict
+        Contains all desired country information.
+    seed : int
+        Seed for the backhaul allocation draws.
+
     """
     iso3 = country['iso3']
     level = country['regional_level']
@@ -403,6 +493,7 @@ def process_unconstrained_site_estimation(country):
     data = sorted(regional_data, key=lambda k: k['population_km2'], reverse=True)
 
     output = []
+    sites_2G = []
 
     covered_pop_so_far = 0
     covered_pop_so_far_2G = 0
@@ -420,7 +511,7 @@ def process_unconstrained_site_estimation(country):
         else:
             total_existing_sites_4G = 0
 
-        backhaul_estimates = estimate_backhaul(total_existing_sites_2G, backhaul_lut)
+        sites_2G.append(total_existing_sites_2G)
 
         output.append({
             'GID_0': region['GID_0'],
@@ -433,10 +524,6 @@ def process_unconstrained_site_estimation(country):
             'total_existing_sites_4G': round(total_existing_sites_4G),
             # 'sites_estimated_2G_km2': round(total_existing_sites_2G / region['area_km2'],4),
             # 'sites_estimated_4G_km2': round(total_existing_sites_4G / region['area_km2'], 4),
-            'backhaul_fiber': backhaul_estimates['backhaul_fiber'],
-            # 'backhaul_copper': backhaul_estimates['backhaul_copper'],
-            'backhaul_wireless': backhaul_estimates['backhaul_wireless'],
-            # 'backhaul_satellite': backhaul_estimates['backhaul_satellite'],
         })
 
         if region['population'] == None:
@@ -445,7 +532,14 @@ def process_unconstrained_site_estimation(country):
         covered_pop_so_far_2G += region['population']
         covered_pop_so_far_4G += region['population']
 
+    backhaul_estimates = estimate_backhaul(sites_2G, backhaul_lut, seed)
+
     output = pd.DataFrame(output)
+    output['backhaul_fiber'] = backhaul_estimates['backhaul_fiber']
+    # output['backhaul_copper'] = backhaul_estimates['backhaul_copper']
+    output['backhaul_wireless'] = backhaul_estimates['backhaul_wireless']
+    # output['backhaul_satellite'] = backhaul_estimates['backhaul_satellite']
+
     folder = os.path.join(DATA_INTERMEDIATE, iso3, 'sites')
     if not os.path.exists(folder):
         os.makedirs(folder)
@@ -455,32 +549,52 @@ def process_unconstrained_site_estimation(country):
     return output
 
 
-def estimate_backhaul(total_sites, backhaul_lut):
+def estimate_backhaul(total_sites, backhaul_lut, seed=None):
+    """
+    Split each region's sites between backhaul technologies.
 
-    output = {}
+    Each site independently uses fiber, copper, microwave or satellite
+    with the shares in the backhaul lookup table, so the counts for all
+    regions are drawn at once from a multinomial distribution.
 
-    backhaul_fiber = 0
-    backhaul_copper = 0
-    backhaul_wireless = 0
-    backhaul_satellite = 0
+    Parameters
+    ----------
+    total_sites : array_like
+        Number of sites in each region.
+    backhaul_lut : dict
+        Cumulative shares by technology (see `get_backhaul_lut`).
+    seed : int, optional
+        Seed for the random number generator.
 
-    for i in range(1, int(round(total_sites)) + 1):
+    Returns
+    -------
+    output : dict
+        Site counts by backhaul technology, one per region.
 
-        num = random.uniform(0, 1)
+    """
+    total_sites = np.round(np.asarray(total_sites, dtype=float)).astype(int)
+    total_sites = np.maximum(total_sites, 0)
 
-        if num <= backhaul_lut['fiber']:
-            backhaul_fiber += 1
-        elif backhaul_lut['fiber'] < num <= backhaul_lut['copper']:
-            backhaul_copper += 1
-        elif backhaul_lut['copper'] < num <= backhaul_lut['microwave']:
-            backhaul_wireless += 1
-        elif backhaul_lut['microwave'] < num:
-            backhaul_satellite += 1
+    counts = np.zeros((len(total_sites), 4), dtype=int)
 
-    output['backhaul_fiber'] = backhaul_fiber
-    output['backhaul_copper'] = backhaul_copper
-    output['backhaul_wireless'] = backhaul_wireless
-    output['backhaul_satellite'] = backhaul_satellite
+    if total_sites.any():
+        cumulative = np.array([
+            backhaul_lut['fiber'],
+            backhaul_lut['copper'],
+            backhaul_lut['microwave'],
+            1,
+        ])
+        shares = np.clip(np.diff(cumulative, prepend=0), 0, None)
+
+        rng = np.random.default_rng(seed)
+        counts = rng.multinomial(total_sites, shares / shares.sum())
+
+    output = {}
+
+    output['backhaul_fiber'] = counts[:, 0]
+    output['backhaul_copper'] = counts[:, 1]
+    output['backhaul_wireless'] = counts[:, 2]
+    output['backhaul_satellite'] = counts[:, 3]
 
     return output
 
@@ -525,24 +639,23 @@ def get_backhaul_lut(iso3, region, year):
     
 def load_sites(country, sites):
     """
-    Load sites lookup table.
+    Load sites lookup table, keyed by GID_id (the last row wins for a
+    repeated region).
 
     """
     gid_id = 'GID_{}'.format(country['regional_level'])
-    
-    output = {}
 
     sites = pd.read_csv(sites)
+    sites = sites.drop_duplicates(subset=gid_id, keep='last')
 
-    for idx, site in sites.iterrows():
-        output[site[gid_id]] = {
-            'GID_0': site['GID_0'],
-            'total_existing_sites': int(site['total_existing_sites']),
-            # 'total_estimated_sites_2G': int(site['total_estimated_sites_2G']),
-            'total_existing_sites_4G': int(site['total_existing_sites_4G']),
-            'backhaul_wireless': float(site['backhaul_wireless']),
-            'backhaul_fiber':  float(site['backhaul_fiber']),
-        }
+    output = pd.DataFrame({
+        'GID_id': sites[gid_id],
+        'total_existing_sites': sites['total_existing_sites'].astype(int),
+        # 'total_estimated_sites_2G': sites['total_estimated_sites_2G'].astype(int),
+        'total_existing_sites_4G': sites['total_existing_sites_4G'].astype(int),
+        'backhaul_wireless': sites['backhaul_wireless'].astype(float),
+        'backhaul_fiber': sites['backhaul_fiber'].astype(float),
+    })
 
     return output
 
@@ -573,8 +686,6 @@ def load_regions(country, path, sites_lut):
     Load country regions.
 
     """
-    data_initial = []
-
     regions = pd.read_csv(path)
     regions = regions[regions['population'] > 0]
     regions = regions.sort_values(by='population_km2', ascending=True)
@@ -590,83 +701,55 @@ def load_regions(country, path, sites_lut):
         n = len(regions)
         regions.insert(len(regions.columns), 'decile', range(1, n + 1))
 
-    regions = regions.to_dict('records')
-
-    for item in regions:
-        for key, value in sites_lut.items():
-            if item['GID_id'] == key:
-                data_initial.append({
-                    'GID_0': item['GID_0'],
-                    'GID_id': item['GID_id'],
-                    'GID_level': item['GID_level'],
-                    'population_total': item['population'],
-                    'area_km2': item['area_km2'],
-                    # 'population_km2': item['population_km2'],
-                    # 'mean_luminosity_km2': item['mean_luminosity_km2'],
-                    'decile': item['decile'],
-                    # 'geotype': item['geotype'],
-                    # 'sites_4G': value['sites_4G'],
-                    'total_existing_sites': value['total_existing_sites'],
-                    'total_existing_sites_4G': value['total_existing_sites_4G'],
-                    'backhaul_wireless': value['backhaul_wireless'],
-                    'backhaul_fiber': value['backhaul_fiber'],
-                    'on_grid_perc': 95, #value['on_grid_perc'],
-                    'grid_other_perc': 5, #value['grid_other_perc'],
-                })
+    regions['decile'] = regions['decile'].astype(int)
+
+    #inner join keeps the region order
+    data = regions.merge(sites_lut, on='GID_id', how='inner')
+
+    data_initial = pd.DataFrame({
+        'GID_0': data['GID_0'],
+        'GID_id': data['GID_id'],
+        'GID_level': data['GID_level'],
+        'population_total': data['population'],
+        'area_km2': data['area_km2'],
+        'decile': data['decile'],
+        'total_existing_sites': data['total_existing_sites'],
+        'total_existing_sites_4G': data['total_existing_sites_4G'],
+        'backhaul_wireless': data['backhaul_wireless'],
+        'backhaul_fiber': data['backhaul_fiber'],
+        'on_grid_perc': 95,
+        'grid_other_perc': 5,
+    })
 
     return data_initial
 
 
 def aggregate_to_deciles(data_initial):
     """
+    Sum the regional data within each decile.
 
     """
-    unique_deciles = set()
-    for item in data_initial:
-        unique_deciles.add(item['decile'])
-
-    output = []
+    if len(data_initial) == 0:
+        return pd.DataFrame()
 
-    for decile in list(unique_deciles):
+    grouped = data_initial.groupby('decile', sort=True)
 
-        population_total = 0
-        area_km2 = 0
-        total_existing_sites = 0
-        total_existing_sites_4G = 0
-        backhaul_wireless = 0
-        backhaul_fiber = 0
-        on_grid_perc = []
-        grid_other_perc = []
+    output = grouped[[
+        'population_total',
+        'area_km2',
+        'total_existing_sites',
+        'total_existing_sites_4G',
+        'backhaul_wireless',
+        'backhaul_fiber',
+    ]].sum().reset_index()
 
-        for item in data_initial:
+    output.insert(0, 'GID_0', data_initial['GID_0'].iloc[-1])
+    output.insert(4, 'population_km2', [round(population / area, 4)
+        for population, area in zip(output['population_total'],
+        output['area_km2'])])
 
-            if not decile == item['decile']:
-                continue
-
-            population_total += item['population_total']
-            area_km2 += item['area_km2']
-            total_existing_sites += item['total_existing_sites']
-            total_existing_sites_4G += item['total_existing_sites_4G']
-            backhaul_wireless += item['backhaul_wireless']
-            backhaul_fiber += item['backhaul_fiber']
-            on_grid_perc.append(item['on_grid_perc'])
-            grid_other_perc.append(item['grid_other_perc'])
-
-        output.append({
-            'GID_0': item['GID_0'],
-            'decile': decile,
-            'population_total': population_total,
-            'area_km2': area_km2,
-            'population_km2': round(population_total / area_km2, 4),
-            'total_existing_sites': total_existing_sites,
-            'total_existing_sites_4G': total_existing_sites_4G,
-            'backhaul_wireless': backhaul_wireless,
-            'backhaul_fiber': backhaul_fiber,
-            'on_grid_perc': sum(on_grid_perc)/len(on_grid_perc),
-            'grid_other_perc': sum(grid_other_perc)/len(grid_other_perc),
-        })
-
-    output = pd.DataFrame(output)
+    output['on_grid_perc'] = grouped['on_grid_perc'].mean().values
+    output['grid_other_perc'] = grouped['grid_other_perc'].mean().values
 
     # output['geotype'] = output.apply(define_geotype, axis=1)
 
@@ -718,32 +801,163 @@ def get_regional_data_lut(country):
     return
 
 
-if __name__ == '__main__':
+def build_stages(country):
+    """
+    Describe the preprocessing stages for a country, with the files
+    each stage reads and writes.
 
-    countries = find_country_list([])
-    countries = countries
+    Parameters
+    ----------
+    country : dict
+        Contains all desired country information.
 
-    for country in countries:
+    Returns
+    -------
+    stages : list of Stage
+        Stages in dependency order.
 
-        # if not country['iso3'] == 'KOR':
-        #     continue
+    """
+    iso3 = country['iso3']
+    level = country['regional_level']
 
-        if "{}".format(country['adb_region']) == 'nan':
-            continue
-        print(country['adb_region'])
-        print('----')
-        print('-- Working on {}'.format(country['country_name']))
+    folder = os.path.join(DATA_INTERMEDIATE, iso3)
+    gadm = os.path.join(DATA_RAW, 'gadm36_levels_shp')
 
-        process_country_shapes(country)
+    national_outline = os.path.join(folder, 'national_outline.shp')
+    regions = [os.path.join(folder, 'regions',
+        'regions_{}_{}.shp'.format(regional_level, iso3))
+        for regional_level in range(1, level + 1)]
+    settlements = os.path.join(folder, 'settlements.tif')
+    population = os.path.join(folder, 'population', 'population.csv')
+    sites = os.path.join(folder, 'sites', 'sites.csv')
+
+    if not iso3 in ['MDV','COK','KIR','MHL','NIU']:
+        boundaries = regions[-1:]
+    else:
+        boundaries = [national_outline]
+
+    return [
+        Stage('country_shapes',
+            lambda: process_country_shapes(country),
+            [os.path.join(gadm, 'gadm36_0.shp'),
+                os.path.join(BASE_PATH, 'global_information.csv')],
+            [national_outline],
+            params={'country': country}),
+        Stage('regions',
+            lambda: process_regions(country),
+            [os.path.join(gadm, 'gadm36_{}.shp'.format(regional_level))
+                for regional_level in range(1, level + 1)],
+            regions,
+            params={'country': country}),
+        Stage('settlement_layer',
+            lambda: process_settlement_layer(country),
+            [os.path.join(DATA_RAW, 'settlement_layer',
+                'ppp_2020_1km_Aggregated.tif'), national_outline],
+            [settlements],
+            params={'country': country}),
+        Stage('regional_data',
+            lambda: get_regional_data(country),
+            [national_outline, settlements] + boundaries,
+            [population],
+            params={'country': country}),
+        Stage('site_estimation',
+            lambda: process_unconstrained_site_estimation(country),
+            [population,
+                os.path.join(BASE_PATH, 'raw', 'site_counts',
+                    'hybrid_site_data_v3.csv'),
+                os.path.join(BASE_PATH, 'raw', 'gsma', 'backhaul.csv')],
+            [sites],
+            params={'country': country, 'seed': SEED}),
+        Stage('deciles',
+            lambda: generate_deciles(country),
+            [sites, population],
+            [os.path.join(folder, 'decile_data.csv')],
+            params={'country': country}),
+        Stage('regional_data_lut',
+            lambda: get_regional_data_lut(country),
+            [population],
+            [os.path.join(folder, 'population', 'regional_data_deciles.csv')],
+            params={'country': country}),
+    ]
 
-        process_regions(country)
 
-        process_settlement_layer(country)
+def run_country(country):
+    """
+    Run the stale preprocessing stages for a country.
 
-        get_regional_data(country)
+    Each country keeps a manifest of the stages it has completed, so an
+    interrupted or repeated run resumes where the inputs changed.
 
-        process_unconstrained_site_estimation(country)
+    Parameters
+    ----------
+    country : dict
+        Contains all desired country information.
+
+    Returns
+    -------
+    ran : list
+        Names of the stages that were run.
+
+    """
+    print('-- Working on {}'.format(country['country_name']))
+
+    manifest_path = os.path.join(DATA_INTERMEDIATE, country['iso3'],
+        'preprocess_manifest.json')
+
+    return run_stages(build_stages(country), manifest_path)
+
+
+def run_countries(countries, workers):
+    """
+    Preprocess all countries, either serially or across a process pool.
+
+    Countries only share read-only raw inputs, so they run independently.
+
+    Parameters
+    ----------
+    countries : list of dicts
+        Contains all desired country information.
+    workers : int
+        Number of worker processes.
+
+    Returns
+    -------
+    ran : dict
+        Names of the stages run, by iso3 code.
+
+    """
+    if workers <= 1:
+        results = [run_country(country) for country in countries]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            'fork' if 'fork' in methods else 'spawn')
+        with context.Pool(workers) as pool:
+            results = pool.map(run_country, countries, chunksize=1)
+
+    return {country['iso3']: ran for country, ran in zip(countries, results)}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1,
+        help='number of countries to preprocess in parallel')
+    args = parser.parse_args()
+
+    countries = find_country_list([])
+
+    countries = [country for country in countries
+        if not "{}".format(country['adb_region']) == 'nan']
+
+    #index the global layers once, before countries run in parallel
+    levels = set([0])
+    for country in countries:
+        levels.update(range(1, country['regional_level'] + 1))
+    for level in sorted(levels):
+        build_gadm_index(level)
 
-        generate_deciles(country)
+    ran = run_countries(countries, args.workers)
 
-        get_regional_data_lut(country)
+    for iso3, stages in ran.items():
+        print('{}: {}'.format(iso3, ', '.join(stages) if stages else 'up to date'))
@@ -7,18 +7,18 @@ June 7th 2024.
 
 """
 import os
-import csv
+import argparse
 import configparser
+import multiprocessing
 import pandas as pd
 import geopandas
 from collections import OrderedDict
 from tqdm import tqdm
 
-from cucumber.demand import estimate_demand
-from cucumber.supply import estimate_supply
-from cucumber.energy import assess_energy
-from cucumber.emissions import assess_emissions
-from cucumber.costs import assess_cost
+from cucumber.columnar import parse_options, run_sweep
+from cucumber.emissions import compile_emissions_factors
+from cucumber.lut import compile_capacity_lut, load_capacity_lut
+from cucumber.sinks import open_sink
 
 from options import all_options, PARAMETERS
 from misc import find_country_list
@@ -32,132 +32,237 @@ DATA_INTERMEDIATE = os.path.join(BASE_PATH, 'intermediate')
 DATA_PROCESSED = os.path.join(BASE_PATH, 'processed')
 OUTPUT = os.path.join(BASE_PATH, '..', 'results', 'model_results')
 
+ENERGY_SCENARIOS = {
+    'sps-2022': ("Stated Policies Scenario", 2022),
+    'sps-2030': ("Stated Policies Scenario", 2030),
+    'aps-2030': ("Announced Pledges Scenario", 2030),
+}
+
+PRODUCT_NAMES = {
+    'modern bioenergy and renewable waste': 'bioenergy',
+    'hydrogen and h2-based fuels': 'hydrogen and ammonia',
+    'fossil fuels: with ccus': 'fossil fuels with ccus',
+    'coal: unabated': 'unabated coal',
+    'natural gas: unabated': 'unabated natural gas',
+}
+
 
 def read_capacity_lut(path):
     """
+    Load the capacity lookup table, first compiling the .csv to the
+    memory-mapped binary format (next to the .csv) if it is missing or
+    out of date.
 
     """
-    capacity_lut = {}
+    return load_capacity_lut(compile_capacity_lut(path))
 
-    with open(path, 'r') as capacity_lookup_file:
-        reader = csv.DictReader(capacity_lookup_file)
-        for idx, row in enumerate(reader):
 
-            if float(row["capacity_mbps_km2"]) <= 0:
-                continue
+def read_emissions_lut(path):
+    """
+    Read the IEA emissions factors, compiled into a dense array indexed
+    by (region, scenario, fuel).
 
-            environment = row["environment"].lower()
-            ant_type = row["ant_type"]
-            frequency_GHz = str(int(float(row["frequency_GHz"]) * 1e3))
-            generation = str(row["generation"])
-            ci = str(row['confidence_interval'])
+    """
+    data = pd.read_csv(path)
+
+    return compile_emissions_factors(pd.DataFrame({
+        'region': data['region'],
+        'scenario': data['scenario'],
+        'fuel': data['generation_twh'].str.lower(),
+        'co2_g_kwh': data['co2_g_kwh'],
+    }))
 
-            if (ant_type, frequency_GHz, generation, ci) \
-                not in capacity_lut:
-                capacity_lut[(ant_type, frequency_GHz, generation, ci)
-                    ] = []
 
-            capacity_lut[(
-                ant_type,
-                frequency_GHz,
-                generation,
-                ci)].append((
-                    float(row["sites_per_km2"]),
-                    float(row["capacity_mbps_km2"])
-                ))
+def load_weo_data(path):
+    """
+    Load IEA WEO2023 electricity generation data, keeping only the rows
+    used to calculate the on-grid generation mix.
 
-        for key, value_list in capacity_lut.items():
-            value_list.sort(key=lambda tup: tup[0])
+    """
+    data = pd.read_csv(path)
+    data = data[data.FLOW == 'Electricity generation']
+    data = data[data.CATEGORY == 'Energy']
+    data = data[data.PRODUCT != 'Total']
+    data = data[data.REGION != 'World']
+    data = data[data['PRODUCT'] != 'Renewables']
 
-    return capacity_lut
+    return data
 
 
-def read_emissions_lut(path):
+def build_grid_mix_lut(data):
     """
+    Calculate the normalized on-grid generation mix for every
+    (IEA region, scenario, year), in a single pass over the WEO data.
+
+    Parameters
+    ----------
+    data : pandas DataFrame
+        WEO data loaded with `load_weo_data`.
+
+    Returns
+    -------
+    grid_mix_lut : pandas DataFrame
+        One row per region, scenario, year and product, giving the
+        product's share of generation.
 
     """
-    capacity_lut = {}
+    data = data[['REGION', 'SCENARIO', 'YEAR', 'PRODUCT', 'VALUE']].copy()
 
-    data = pd.read_csv(path)
-    regions = data['region'].unique()
-    scenarios = data['scenario'].unique()
-    data = data.to_dict('records')
+    #calculate energy generation mix share
+    data['share'] = (
+        data['VALUE'] /
+        data.groupby(['SCENARIO', 'YEAR', 'REGION'])['VALUE'].transform('sum')
+    )
+
+    products = data['PRODUCT'].str.lower()
+    data['product'] = products.map(PRODUCT_NAMES).fillna(products)
 
-    for region in regions:
-        
-        # if region == 'na'
-        region_dict = {}
-        for scenario in scenarios:
-            technologies = {}
-            for item in data:
-                if not region == item['region']:
-                    continue
-                if not scenario == item['scenario']:
-                    continue
-                technologies[item['generation_twh'].lower()] = item['co2_g_kwh']
+    return pd.DataFrame({
+        'region': data['REGION'],
+        'scenario': data['SCENARIO'],
+        'year': data['YEAR'],
+        'product': data['product'],
+        'share': data['share'],
+    })
 
-            region_dict[scenario] = technologies
-        capacity_lut[region] = region_dict
 
-    return capacity_lut
+def compile_grid_mix_lut(weo_path, lut_path):
+    """
+    Write the grid mix lookup table, unless it is newer than the WEO data.
 
+    Returns
+    -------
+    lut_path : string
+        Path to the grid mix lookup table.
 
-def load_on_grid_mix(country, energy_scenario, path):
     """
-    Load IEA WEO2023 data.
-    
+    if (os.path.exists(lut_path) and
+        os.path.getmtime(lut_path) >= os.path.getmtime(weo_path)):
+        return lut_path
+
+    grid_mix_lut = build_grid_mix_lut(load_weo_data(weo_path))
+
+    folder = os.path.dirname(lut_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    grid_mix_lut.to_csv(lut_path + '.tmp', index=False, float_format='%.17g')
+    os.replace(lut_path + '.tmp', lut_path)
+
+    return lut_path
+
+
+def read_grid_mix_lut(path):
     """
-    iea_classification = country['iea_classification']
-
-    if energy_scenario == 'sps-2022':
-        energy_scenario_long = "Stated Policies Scenario"
-        year = 2022
-    if energy_scenario == 'sps-2030':
-        energy_scenario_long = "Stated Policies Scenario"
-        year = 2030
-    if energy_scenario == 'aps-2030':
-        energy_scenario_long = "Announced Pledges Scenario"
-        year = 2030
-    
-    on_grid_mix = {}
+    Read the grid mix lookup table.
 
-    data = pd.read_csv(path)
-    data = data[data.FLOW == 'Electricity generation']
-    data = data[data.CATEGORY == 'Energy']
-    data = data[data.SCENARIO == energy_scenario_long]
-    data = data[data.YEAR == int(year)]
-    data = data[data.PRODUCT != 'Total']
-    data = data[data.REGION != 'World']
-    data = data[['PRODUCT','REGION','VALUE']]
-    data = data[data['PRODUCT'] != 'Renewables']
+    Returns
+    -------
+    grid_mix_lut : dict
+        Share of generation by product, keyed by (IEA region, scenario,
+        year), with products in WEO file order.
 
-    #calculate energy generation mix share
-    data['share']  = (
-        data['VALUE'] / 
-        data.groupby('REGION')['VALUE'].transform('sum')
-    )
-    # data.to_csv(os.path.join(BASE_PATH,'test.csv'), index=False)
+    """
+    grid_mix_lut = {}
 
-    for idx, item in data.iterrows():
+    data = pd.read_csv(path, keep_default_na=False,
+        float_precision='round_trip')
 
-        if not item['REGION'] == iea_classification:
-            continue
+    for region, scenario, year, product, share in zip(data['region'],
+        data['scenario'], data['year'], data['product'], data['share']):
 
-        product = item['PRODUCT'].lower()
-        if product == 'modern bioenergy and renewable waste':
-            product = 'bioenergy'
-        elif product == 'hydrogen and h2-based fuels':
-            product = 'hydrogen and ammonia'
-        elif product == 'fossil fuels: with ccus':
-            product = 'fossil fuels with ccus'
-        elif product == 'coal: unabated':
-            product = 'unabated coal'
-        elif product == 'natural gas: unabated':
-            product = 'unabated natural gas'
+        key = (region, scenario, int(year))
+        if key not in grid_mix_lut:
+            grid_mix_lut[key] = {}
+        grid_mix_lut[key][product] = share
 
-        on_grid_mix[product] = item['share'] #* 100
+    return grid_mix_lut
 
-    return on_grid_mix
+
+def load_on_grid_mix(country, energy_scenario, grid_mix_lut):
+    """
+    Look up the on-grid generation mix for a country and energy scenario.
+
+    Parameters
+    ----------
+    country : dict
+        Contains all desired country information.
+    energy_scenario : string
+        Energy scenario (see `ENERGY_SCENARIOS`).
+    grid_mix_lut : dict
+        Grid mix lookup table loaded with `read_grid_mix_lut`.
+
+    """
+    energy_scenario_long, year = ENERGY_SCENARIOS[energy_scenario]
+
+    key = (country['iea_classification'], energy_scenario_long, year)
+
+    return grid_mix_lut.get(key, {})
+
+
+class ScenarioInputs(object):
+    """
+
+    Loads the inputs shared by scenario runs once and keeps them in memory,
+    keyed by what they actually depend on.
+
+    The on-grid mix depends only on the IEA region and energy scenario,
+    and is looked up in the grid mix table, which is read once. The
+    decile table depends only on the country.
+
+    Parameters
+    ----------
+    grid_mix_path : string
+        Path to the grid mix lookup table (see `compile_grid_mix_lut`).
+
+    """
+    def __init__(self, grid_mix_path):
+
+        self.grid_mix_path = grid_mix_path
+        self.grid_mix_lut = None
+        self.deciles = {}
+        self.disk_reads = 0
+        self.requests = 0
+
+
+    def get_on_grid_mix(self, country, energy_scenario):
+        """
+        Return the on-grid generation mix for a country and energy scenario.
+
+        """
+        self.requests += 1
+
+        if self.grid_mix_lut is None:
+            self.grid_mix_lut = read_grid_mix_lut(self.grid_mix_path)
+            self.disk_reads += 1
+
+        return load_on_grid_mix(country, energy_scenario, self.grid_mix_lut)
+
+
+    def get_deciles(self, iso3):
+        """
+        Return a copy of the decile data for a country.
+
+        """
+        self.requests += 1
+
+        if iso3 not in self.deciles:
+
+            filename = 'decile_data.csv'
+            path = os.path.join(DATA_INTERMEDIATE, iso3, filename)
+            self.deciles[iso3] = pd.read_csv(path)
+            self.disk_reads += 1
+
+        return self.deciles[iso3].copy()
+
+
+    def reads_saved(self):
+        """
+        Return the number of disk reads avoided, compared with reading
+        each input once per request.
+
+        """
+        return self.requests - self.disk_reads
 
 
 def load_country_parameters():
@@ -197,11 +302,33 @@ def load_country_parameters():
     return output
 
 
-def collect_results(countries):
+COST_COLUMNS = [
+    'GID_0',
+    'capacity','generation',
+    'backhaul','energy_scenario','sharing_scenario',
+    'income', 'wb_region','adb_region',#'product',
+    'population_with_smartphones','smartphones_on_network',
+    'demand_mbps_km2',
+    'network_required_sites', 
+    'network_existing_sites',
+    'network_upgraded_sites','network_new_sites',
+    'total_upgraded_sites','total_new_sites', 
+    'total_cost_equipment_usd',
+    'total_cost_site_build_usd',
+    'total_cost_installation_usd',
+    'total_cost_operation_and_maintenance_usd',
+    'total_cost_power_usd',
+    'total_new_cost_usd'
+    ]
+
+
+def collect_results(countries, backend='csv'):
     """
-    
+    Stream each country's results into the global results files, one
+    country at a time.
+
     """
-    output = []
+    paths = []
 
     for country in countries:
 
@@ -210,81 +337,269 @@ def collect_results(countries):
 
         iso3 = country['iso3']
         filename = 'results_{}.csv'.format(iso3)
-        path = os.path.join(OUTPUT, iso3, filename)
+        paths.append(os.path.join(OUTPUT, iso3, filename))
+
+    folder = os.path.join(OUTPUT, '..', 'global_results')
+    path_results = os.path.join(folder, 'global_results.{}'.format(backend))
+    path_costs = os.path.join(folder, 'global_cost_results.{}'.format(backend))
+
+    with open_sink(path_results, find_columns(paths), backend) as results, \
+        open_sink(path_costs, COST_COLUMNS, backend) as costs:
+
+        for path in paths:
+            if not os.path.exists(path):
+                print('Path does not exist: {}'.format(path))
+                continue
+            data = pd.read_csv(path)
+            results.write(data)
+            costs.write(data[COST_COLUMNS])
+
+    return
+
+
+def collect_satellite_areas(countries, backend='csv'):
+    """
+    Stream each country's regional decile data into a single file.
+
+    """
+    paths = []
+
+    for country in countries:
+
+        if "{}".format(country['adb_region']) == 'nan':
+            continue
+
+        iso3 = country['iso3']
+        filename = 'regional_data_deciles.csv'
+        paths.append(os.path.join(DATA_INTERMEDIATE, iso3, 'population', filename))
+
+    folder = os.path.join(OUTPUT, '..', 'global_results')
+    path_out = os.path.join(folder, 'satellite_areas.{}'.format(backend))
+
+    with open_sink(path_out, find_columns(paths), backend) as output:
+
+        for path in paths:
+            if not os.path.exists(path):
+                print('Path does not exist: {}'.format(path))
+                continue
+            output.write(pd.read_csv(path))
+
+    return
+
+
+def find_columns(paths):
+    """
+    Return the union of the column names across .csv files, in order of
+    first appearance, reading only the headers.
+
+    """
+    columns = []
+
+    for path in paths:
         if not os.path.exists(path):
-            print('Path does not exist: {}'.format(path))
-        data = pd.read_csv(path)
-        data = data.to_dict('records')
-        output = output + data
+            continue
+        for column in pd.read_csv(path, nrows=0).columns:
+            if column not in columns:
+                columns.append(column)
+
+    return columns
+
+
+def run_country(country, options, capacity_lut, emissions_lut,
+    country_parameters, scenario_inputs):
+    """
+    Run all options for a single country and write its results.
+
+    Parameters
+    ----------
+    country : dict
+        Contains all desired country information.
+    options : list
+        Option strings (see `options.all_options`).
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    emissions_lut : EmissionsFactors
+        Emissions factors by region, scenario and fuel.
+    country_parameters : dict
+        Network counts by sharing scenario for each country.
+    scenario_inputs : ScenarioInputs
+        Shared on-grid mix and decile inputs.
+
+    """
+    if "{}".format(country['adb_region']) == 'nan':
+        return
     
-    output = pd.DataFrame(output)
-    filename = 'global_results.csv'.format(iso3)
-    folder = os.path.join(OUTPUT, '..', 'global_results')
-    if not os.path.exists(folder):
-        os.mkdir(folder)
-    path_out = os.path.join(folder, filename)
+    iso3 = country['iso3']
+    country.update(PARAMETERS)
+    country['networks'] = country_parameters[country['iso3']]['networks']
+
+    # if not iso3 == "KOR":
+    #     return
+
+    print('--Working on {}'.format(iso3))
+    
+    OUTPUT_COUNTRY = os.path.join(OUTPUT, iso3)
+
+    if not os.path.exists(OUTPUT_COUNTRY):
+        os.makedirs(OUTPUT_COUNTRY)
+
+    energy_scenarios = parse_options(options)['energy_scenario'].unique()
+    on_grid_mixes = {
+        energy_scenario: scenario_inputs.get_on_grid_mix(
+            country, energy_scenario)
+        for energy_scenario in energy_scenarios
+    }
+
+    deciles = scenario_inputs.get_deciles(iso3)#[:1]
+
+    output = run_sweep(
+        country,
+        deciles,
+        options,
+        capacity_lut,
+        on_grid_mixes,
+        emissions_lut
+    )
+
+    if len(output) == 0:
+        return
+    filename = 'results_{}.csv'.format(iso3)
+    path_out = os.path.join(OUTPUT_COUNTRY, filename)
     output.to_csv(path_out, index=False)
 
     output = output[[
-        'GID_0',
+        'GID_0','decile',
         'capacity','generation',
         'backhaul','energy_scenario','sharing_scenario',
-        'income', 'wb_region','adb_region',#'product',
+        # 'income','wb_region','iea_classification',#'product',
+        'population_total', 'area_km2', 'population_km2',
         'population_with_smartphones','smartphones_on_network',
         'demand_mbps_km2',
         'network_required_sites', 
         'network_existing_sites',
         'network_upgraded_sites','network_new_sites',
         'total_upgraded_sites','total_new_sites', 
-        'total_cost_equipment_usd',
-        'total_cost_site_build_usd',
-        'total_cost_installation_usd',
-        'total_cost_operation_and_maintenance_usd',
-        'total_cost_power_usd',
+        # 'network_existing_energy_kwh','network_new_energy_kwh',
+        'total_existing_energy_kwh','total_new_energy_kwh',
+        # 'network_existing_emissions_t_co2','network_new_emissions_t_co2',
+        'total_existing_emissions_t_co2', 'total_new_emissions_t_co2',
         'total_new_cost_usd'
         ]]
+    filename = 'decile_emissions_{}.csv'.format(iso3)
+    path_out = os.path.join(OUTPUT_COUNTRY, filename)
+    output.to_csv(path_out, index=False)
 
-    filename = 'global_cost_results.csv'.format(iso3)
-    folder = os.path.join(OUTPUT, '..', 'global_results')
-    path_out = os.path.join(folder, filename)
+    output = output[[
+        'GID_0',#'decile',
+        'capacity','generation',
+        'backhaul','energy_scenario','sharing_scenario',
+        #'income', 'wb_region','iea_classification',#'product',
+        'population_total', 'area_km2', 'population_km2',
+        'population_with_smartphones','smartphones_on_network',
+        'demand_mbps_km2',
+        'network_required_sites', 
+        'network_existing_sites',
+        'network_upgraded_sites','network_new_sites',
+        'total_upgraded_sites','total_new_sites', 
+        # 'network_existing_energy_kwh','network_new_energy_kwh',
+        'total_existing_energy_kwh','total_new_energy_kwh',
+        # 'network_existing_emissions_t_co2','network_new_emissions_t_co2',
+        'total_existing_emissions_t_co2', 'total_new_emissions_t_co2',
+        'total_new_cost_usd'
+        ]]
+    output = output.groupby([
+        'GID_0','capacity','generation',
+        'backhaul','energy_scenario','sharing_scenario'], as_index=False).sum()
+    filename = 'national_emissions_{}.csv'.format(iso3)
+    path_out = os.path.join(OUTPUT_COUNTRY, filename)
     output.to_csv(path_out, index=False)
 
     return
 
 
-def collect_satellite_areas(countries):
+WORKER_INPUTS = {}
+
+
+def init_worker(inputs):
     """
-        
+    Store the read-only lookup tables in each worker process.
+
+    With the fork start method the tables are inherited from the parent
+    rather than pickled.
+
     """
-    output = []
+    WORKER_INPUTS.update(inputs)
 
-    for country in countries:
 
-        if "{}".format(country['adb_region']) == 'nan':
-            continue
+def run_country_worker(country):
+    """
+    Run a single country in a worker process, returning the number of
+    scenario input reads and requests made.
 
-        iso3 = country['iso3']
-        filename = 'regional_data_deciles.csv'
-        path = os.path.join(DATA_INTERMEDIATE, iso3, 'population',filename)
-        if not os.path.exists(path):
-            print('Path does not exist: {}'.format(path))
-        data = pd.read_csv(path)
-        data = data.to_dict('records')
-        output = output + data
-    
-    output = pd.DataFrame(output)
-    filename = 'satellite_areas.csv'.format(iso3)
-    folder = os.path.join(OUTPUT, '..', 'global_results')
-    if not os.path.exists(folder):
-        os.mkdir(folder)
-    path_out = os.path.join(folder, filename)
-    output.to_csv(path_out, index=False)
+    """
+    scenario_inputs = WORKER_INPUTS['scenario_inputs']
+    disk_reads = scenario_inputs.disk_reads
+    requests = scenario_inputs.requests
+
+    run_country(country, **WORKER_INPUTS)
+
+    return (scenario_inputs.disk_reads - disk_reads,
+        scenario_inputs.requests - requests)
 
-    return
+
+def run_countries(countries, workers, **inputs):
+    """
+    Run all countries, either serially or across a process pool.
+
+    Each country writes its own results, so outputs do not depend on the
+    order in which workers finish.
+
+    Parameters
+    ----------
+    countries : list of dicts
+        Contains all desired country information.
+    workers : int
+        Number of worker processes.
+    inputs : dict
+        Keyword arguments passed to `run_country`.
+
+    Returns
+    -------
+    disk_reads : int
+        Number of scenario input reads from disk.
+    reads_saved : int
+        Number of scenario input reads avoided.
+
+    """
+    if workers <= 1:
+        init_worker(inputs)
+        results = [run_country_worker(country) for country in tqdm(countries)]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            'fork' if 'fork' in methods else 'spawn')
+        with context.Pool(workers, initializer=init_worker,
+            initargs=(inputs,)) as pool:
+            results = list(tqdm(
+                pool.imap(run_country_worker, countries),
+                total=len(countries)
+            ))
+
+    disk_reads = sum(result[0] for result in results)
+    requests = sum(result[1] for result in results)
+
+    return disk_reads, requests - disk_reads
 
 
 if __name__ == '__main__':
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1,
+        help='number of countries to run in parallel')
+    parser.add_argument('--format', default='csv', choices=['csv', 'parquet'],
+        help='file format for the global results')
+    args = parser.parse_args()
+
     countries = find_country_list([])
     options = all_options()
 
@@ -301,139 +616,25 @@ if __name__ == '__main__':
     path = os.path.join(folder, filename)
     emissions_lut = read_emissions_lut(path)
 
-    for country in tqdm(countries):#[::-1]:#[:1]:
-
-        if "{}".format(country['adb_region']) == 'nan':
-            continue
-        
-        iso3 = country['iso3']
-        country.update(PARAMETERS)
-        country['networks'] = country_parameters[country['iso3']]['networks']
-
-        # if not iso3 == "KOR":
-        #     continue
-
-        print('--Working on {}'.format(iso3))
-        
-        OUTPUT_COUNTRY = os.path.join(OUTPUT, iso3)
-
-        if not os.path.exists(OUTPUT_COUNTRY):
-            os.makedirs(OUTPUT_COUNTRY)
-
-        output = []
-        energy_output = []
-        emissions_output = []
+    folder = os.path.join(DATA_RAW, 'IEA_data', 'WEO2023 extended data')
+    filename = 'WEO2023_Extended_Data_Regions.csv'
+    grid_mix_path = compile_grid_mix_lut(os.path.join(folder, filename),
+        os.path.join(DATA_INTERMEDIATE, 'luts', 'grid_mix_lut.csv'))
+    scenario_inputs = ScenarioInputs(grid_mix_path)
+
+    disk_reads, reads_saved = run_countries(
+        countries,
+        args.workers,
+        options=options,
+        capacity_lut=capacity_lut,
+        emissions_lut=emissions_lut,
+        country_parameters=country_parameters,
+        scenario_inputs=scenario_inputs,
+    )
 
-        for option in options:
+    print('Read scenario inputs from disk {} times ({} reads saved)'.format(
+        disk_reads, reads_saved))
 
-            folder = os.path.join(DATA_RAW, 'IEA_data', 'WEO2023 extended data')
-            filename = 'WEO2023_Extended_Data_Regions.csv'
-            path_in = os.path.join(folder, filename)
-            energy_scenario = option.split('_')[3]
-            on_grid_mix = load_on_grid_mix(country, energy_scenario, path_in)
+    collect_results(countries, args.format)
 
-            filename = 'decile_data.csv'
-            path_out = os.path.join(DATA_INTERMEDIATE, country['iso3'], filename)
-            deciles = pd.read_csv(path_out)#[:1]
-
-            # capacity_generation_backhaul_energy_year
-            deciles['capacity'] = option.split('_')[0]
-            deciles['generation'] = option.split('_')[1]
-            deciles['backhaul'] = option.split('_')[2]
-            deciles['energy_scenario'] = option.split('_')[3]
-            deciles['sharing_scenario'] = option.split('_')[4]
-            # deciles = deciles[deciles['decile'] == 7]
-
-            deciles = deciles.to_dict('records')#[9:10]
-
-            deciles = estimate_demand(
-                country,
-                deciles,
-            )
-
-            deciles = estimate_supply(
-                country,
-                deciles,
-                capacity_lut,
-            )
-
-            deciles, energy = assess_energy(
-                country,
-                deciles,
-                on_grid_mix
-            )
-
-            deciles, emissions = assess_emissions(
-                country,
-                deciles,
-                on_grid_mix,
-                emissions_lut
-            )
-
-            deciles = assess_cost(
-                country,
-                deciles,
-            )
-            
-            output = output + deciles
-            energy_output = energy_output + energy
-            emissions_output = emissions_output + emissions
-
-        output = pd.DataFrame(output)
-        if len(output) == 0:
-            continue
-        filename = 'results_{}.csv'.format(iso3)
-        path_out = os.path.join(OUTPUT_COUNTRY, filename)
-        output.to_csv(path_out, index=False)
-
-        output = output[[
-            'GID_0','decile',
-            'capacity','generation',
-            'backhaul','energy_scenario','sharing_scenario',
-            # 'income','wb_region','iea_classification',#'product',
-            'population_total', 'area_km2', 'population_km2',
-            'population_with_smartphones','smartphones_on_network',
-            'demand_mbps_km2',
-            'network_required_sites', 
-            'network_existing_sites',
-            'network_upgraded_sites','network_new_sites',
-            'total_upgraded_sites','total_new_sites', 
-            # 'network_existing_energy_kwh','network_new_energy_kwh',
-            'total_existing_energy_kwh','total_new_energy_kwh',
-            # 'network_existing_emissions_t_co2','network_new_emissions_t_co2',
-            'total_existing_emissions_t_co2', 'total_new_emissions_t_co2',
-            'total_new_cost_usd'
-            ]]
-        filename = 'decile_emissions_{}.csv'.format(iso3)
-        path_out = os.path.join(OUTPUT_COUNTRY, filename)
-        output.to_csv(path_out, index=False)
-
-        output = output[[
-            'GID_0',#'decile',
-            'capacity','generation',
-            'backhaul','energy_scenario','sharing_scenario',
-            #'income', 'wb_region','iea_classification',#'product',
-            'population_total', 'area_km2', 'population_km2',
-            'population_with_smartphones','smartphones_on_network',
-            'demand_mbps_km2',
-            'network_required_sites', 
-            'network_existing_sites',
-            'network_upgraded_sites','network_new_sites',
-            'total_upgraded_sites','total_new_sites', 
-            # 'network_existing_energy_kwh','network_new_energy_kwh',
-            'total_existing_energy_kwh','total_new_energy_kwh',
-            # 'network_existing_emissions_t_co2','network_new_emissions_t_co2',
-            'total_existing_emissions_t_co2', 'total_new_emissions_t_co2',
-            'total_new_cost_usd'
-            ]]
-        output = output.groupby([
-            'GID_0','capacity','generation',
-            'backhaul','energy_scenario','sharing_scenario'], as_index=False).sum()
-        filename = 'national_emissions_{}.csv'.format(iso3)
-        path_out = os.path.join(OUTPUT_COUNTRY, filename)
-        output.to_csv(path_out, index=False)
-
-    collect_results(countries)
-
-    collect_satellite_areas(countries)
-    
\ No newline at end of file
+    collect_satellite_areas(countries, args.format)
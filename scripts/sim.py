@@ -10,17 +10,26 @@ January 2022
 """
 import os
 import sys
+import argparse
 import configparser
 import csv
+import hashlib
+import json
 import math
+import multiprocessing
 from random import choice
 import numpy as np
 from shapely.geometry import shape, Point, LineString, mapping
+from tqdm import tqdm
 
+from cucumber import generate_hex, path_loss, sketch, system_simulator
+from cucumber import variations
 from cucumber.generate_hex import produce_sites_and_site_areas
-from cucumber.system_simulator import SimulationManager
-
-np.random.seed(42)
+from cucumber.system_simulator import (SimulationManager,
+    compile_spectral_efficiency_lut, estimate_spectral_efficiency_arrays)
+from cucumber.variations import (band_key, variation_stream,
+    draw_variations, VariationStreams)
+from cucumber.sketch import TDigest
 
 CONFIG = configparser.ConfigParser()
 CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
@@ -28,7 +37,7 @@ BASE_PATH = CONFIG['file_locations']['base_path']
 DATA_INTERMEDIATE = os.path.join(BASE_PATH, 'intermediate')
 
 
-def generate_receivers(site_area, parameters, grid):
+def generate_receivers(site_area, parameters, grid, rng=None):
     """
     Generate receiver locations as points within the site area.
 
@@ -44,6 +53,9 @@ def generate_receivers(site_area, parameters, grid):
         Contains all necessary simulation parameters.
     grid : int
         Binary indicator to dictate receiver generation type.
+    rng : numpy Generator
+        Draws the indoor/outdoor probabilities. Seeded from the seed
+        value when not given.
 
     Output
     ------
@@ -53,6 +65,9 @@ def generate_receivers(site_area, parameters, grid):
     """
     receivers = []
 
+    if rng is None:
+        rng = variation_stream(parameters['seed_value'])
+
     if grid == 1:
 
         geom = shape(site_area[0]['geometry'])
@@ -80,7 +95,7 @@ def generate_receivers(site_area, parameters, grid):
         for i in range(len(x_axis)):
             for j in range(len(y_axis)):
                 receiver = Point((xv[i,j], yv[i,j]))
-                indoor_outdoor_probability = np.random.rand(1,1)[0][0]
+                indoor_outdoor_probability = rng.random()
                 if geom.contains(receiver):
                     receivers.append({
                         'type': "Feature",
@@ -117,7 +132,7 @@ def generate_receivers(site_area, parameters, grid):
         id_number = 0
         for increment_value in range(1, 11):
             point = path.interpolate(increment * increment_value)
-            indoor_outdoor_probability = np.random.rand(1,1)[0][0]
+            indoor_outdoor_probability = rng.random()
             receivers.append({
                 'type': "Feature",
                 'geometry': mapping(point),
@@ -241,6 +256,134 @@ def obtain_percentile_values(results, transmission_type, parameters, confidence_
     return output
 
 
+#metrics summarized over Monte Carlo iterations, and whether higher is better
+SKETCH_METRICS = [
+    ('path_loss', False),
+    ('received_power', True),
+    ('interference', False),
+    ('sinr', True),
+]
+
+
+def simulate_iterations(manager, streams, frequency, bandwidth, generation,
+    transmission_type, spectral_efficiency_lut, parameters):
+    """
+
+    Run the Monte Carlo iterations for a work item, evaluating all
+    receivers for a batch of iterations at once.
+
+    Each metric is summarized in a streaming quantile sketch, so memory
+    does not grow with the number of iterations.
+
+    Parameters
+    ----------
+    manager : SimulationManager
+        Sites and receivers for the work item.
+    streams : VariationStreams
+        Random variation streams for the site radius and band.
+    frequency : float
+        Spectral frequency of carrier band in GHz.
+    bandwidth : int
+        Channel bandwidth of carrier band in MHz.
+    generation : string
+        Either 4G or 5G depending on technology generation.
+    transmission_type : string
+        The transmission type (SISO, MIMO etc.).
+    spectral_efficiency_lut : dict
+        Compiled modulation and coding lookup table.
+    parameters : dict
+        Contains all necessary simulation parameters, including the
+        number of 'iterations' and 'iterations_per_batch'.
+
+    Output
+    ------
+    sketches : dict
+        Quantile sketch of each metric in `SKETCH_METRICS`.
+    noise : float
+        Received noise in decibels.
+
+    """
+    iterations = parameters['iterations']
+    batch_size = parameters.get('iterations_per_batch', 50)
+
+    sketches = {metric: TDigest() for metric, higher in SKETCH_METRICS}
+
+    for start in range(0, iterations, batch_size):
+
+        arrays = manager.estimate_link_budget_arrays(frequency, bandwidth,
+            generation, transmission_type, spectral_efficiency_lut,
+            parameters, streams.draw(min(batch_size, iterations - start)))
+
+        for metric, sketch in sketches.items():
+            sketch.update(arrays[metric])
+
+    return sketches, arrays['noise']
+
+
+def obtain_sketch_percentile_values(sketches, noise, bandwidth, generation,
+    transmission_type, site_area_km2, spectral_efficiency_lut,
+    confidence_intervals):
+    """
+
+    Get the threshold value for each metric from the quantile sketches,
+    in the same form as `obtain_percentile_values`.
+
+    Spectral efficiency and capacity increase with SINR, so they are
+    looked up from the SINR threshold rather than sketched.
+
+    Parameters
+    ----------
+    sketches : dict
+        Quantile sketch of each metric in `SKETCH_METRICS`.
+    noise : float
+        Received noise in decibels.
+    bandwidth : int
+        Channel bandwidth of carrier band in MHz.
+    generation : string
+        Either 4G or 5G depending on technology generation.
+    transmission_type : string
+        The transmission type (SISO, MIMO etc.).
+    site_area_km2 : float
+        Site area in square kilometers.
+    spectral_efficiency_lut : dict
+        Compiled modulation and coding lookup table.
+    confidence_intervals: list
+        Integer confidence interval values.
+
+    Output
+    ------
+    percentile_site_results : list of dicts
+        Contains the confidence interval values for each metric.
+
+    """
+    output = []
+
+    for confidence_interval in confidence_intervals:
+
+        result = {
+            'confidence_interval': confidence_interval,
+            'tranmission_type': transmission_type,
+            'noise': noise,
+        }
+
+        for metric, higher in SKETCH_METRICS:
+            percentile = (100 - confidence_interval if higher else
+                confidence_interval)
+            result[metric] = float(sketches[metric].quantile(percentile / 100))
+
+        result['sinr'] = round(result['sinr'], 2)
+        result['spectral_efficiency'] = float(
+            estimate_spectral_efficiency_arrays(result['sinr'], generation,
+            spectral_efficiency_lut, transmission_type))
+        result['capacity_mbps'] = (
+            bandwidth * 1e6 * result['spectral_efficiency']) / 1e6
+        result['capacity_mbps_km2'] = result['capacity_mbps'] / site_area_km2
+
+        output.append(result)
+
+    return output
+
+
 # def obtain_threshold_values_choice(results, parameters):
 #     """
 
@@ -430,12 +573,33 @@ def write_full_results(data, environment, site_radius, frequency,
             ))
 
 
-def write_frequency_lookup_table(results, environment, site_radius,
-    frequency, bandwidth, generation, ant_type, tranmission_type,
-    directory, filename, parameters):
+LUT_HEADER = (
+    'confidence_interval',
+    'environment',
+    'inter_site_distance_m',
+    'site_area_km2',
+    'sites_per_km2',
+    'frequency_GHz',
+    'bandwidth_MHz',
+    'number_of_sectors',
+    'generation',
+    'ant_type',
+    'transmission_type',
+    'path_loss_dB',
+    'received_power_dBm',
+    'interference_dBm',
+    'noise_dB',
+    'sinr_dB',
+    'spectral_efficiency_bps_hz',
+    'capacity_mbps',
+    'capacity_mbps_km2',
+)
+
+
+def frequency_lookup_table_rows(results, environment, site_radius,
+    frequency, bandwidth, generation, ant_type, tranmission_type, parameters):
     """
-    Write the main, comprehensive lookup table for all environments,
-    site radii, frequencies etc.
+    Convert percentile results into lookup table rows.
 
     Parameters
     ----------
@@ -455,13 +619,14 @@ def write_frequency_lookup_table(results, environment, site_radius,
         Type of transmitters modelled.
     tranmission_type : string
         The transmission type (SISO, MIMO etc.).
-    directory : string
-        Folder the data will be written to.
-    filename : string
-        Name of the .csv file.
     parameters : dict
         Contains all necessary simulation parameters.
 
+    Returns
+    -------
+    rows : list of tuples
+        Lookup table rows, ordered as in `LUT_HEADER`.
+
     """
     inter_site_distance = site_radius * 2
     site_area_km2 = math.sqrt(3) / 2 * inter_site_distance ** 2 / 1e6
@@ -469,43 +634,10 @@ def write_frequency_lookup_table(results, environment, site_radius,
 
     sectors = parameters['sectorization']
 
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-    directory = os.path.join(directory, filename)
-
-    if not os.path.exists(directory):
-        lut_file = open(directory, 'w', newline='')
-        lut_writer = csv.writer(lut_file)
-        lut_writer.writerow(
-            (
-                'confidence_interval',
-                'environment',
-                'inter_site_distance_m',
-                'site_area_km2',
-                'sites_per_km2',
-                'frequency_GHz',
-                'bandwidth_MHz',
-                'number_of_sectors',
-                'generation',
-                'ant_type',
-                'transmission_type',
-                'path_loss_dB',
-                'received_power_dBm',
-                'interference_dBm',
-                'noise_dB',
-                'sinr_dB',
-                'spectral_efficiency_bps_hz',
-                'capacity_mbps',
-                'capacity_mbps_km2',
-            )
-        )
-    else:
-        lut_file = open(directory, 'a', newline='')
-        lut_writer = csv.writer(lut_file)
+    rows = []
 
     for result in results:
-        lut_writer.writerow(
+        rows.append(
             (
                 result['confidence_interval'],
                 environment,
@@ -529,12 +661,473 @@ def write_frequency_lookup_table(results, environment, site_radius,
             )
         )
 
+    return rows
+
+
+def write_frequency_lookup_table(results, environment, site_radius,
+    frequency, bandwidth, generation, ant_type, tranmission_type,
+    directory, filename, parameters):
+    """
+    Write the main, comprehensive lookup table for all environments,
+    site radii, frequencies etc.
+
+    Parameters
+    ----------
+    results : list of dicts
+        Contains all results ready to be written.
+    environment : string
+        Either urban, suburban or rural clutter type.
+    site_radius : int
+        Radius of site area in meters.
+    frequency : float
+        Spectral frequency of carrier band in GHz.
+    bandwidth : int
+        Channel bandwidth of carrier band in MHz.
+    generation : string
+        Either 4G or 5G depending on technology generation.
+    ant_type : string
+        Type of transmitters modelled.
+    tranmission_type : string
+        The transmission type (SISO, MIMO etc.).
+    directory : string
+        Folder the data will be written to.
+    filename : string
+        Name of the .csv file.
+    parameters : dict
+        Contains all necessary simulation parameters.
+
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    directory = os.path.join(directory, filename)
+
+    if not os.path.exists(directory):
+        lut_file = open(directory, 'w', newline='')
+        lut_writer = csv.writer(lut_file)
+        lut_writer.writerow(LUT_HEADER)
+    else:
+        lut_file = open(directory, 'a', newline='')
+        lut_writer = csv.writer(lut_file)
+
+    lut_writer.writerows(frequency_lookup_table_rows(results, environment,
+        site_radius, frequency, bandwidth, generation, ant_type,
+        tranmission_type, parameters))
+
     lut_file.close()
 
 
+def write_lookup_table(rows, directory, filename):
+    """
+    Write all lookup table rows in a single pass, replacing any
+    existing file.
+
+    Parameters
+    ----------
+    rows : list of tuples
+        Lookup table rows, ordered as in `LUT_HEADER`.
+    directory : string
+        Folder the data will be written to.
+    filename : string
+        Name of the .csv file.
+
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(os.path.join(directory, filename), 'w', newline='') as lut_file:
+        lut_writer = csv.writer(lut_file)
+        lut_writer.writerow(LUT_HEADER)
+        lut_writer.writerows(rows)
+
+
+def build_work_items(environments, ant_types, site_radii, spectrum_portfolio):
+    """
+    List every (site radius, spectrum band) combination to simulate,
+    in the order the lookup table is written.
+
+    Parameters
+    ----------
+    environments : list
+        Clutter environments to simulate.
+    ant_types : list
+        Transmitter types to simulate.
+    site_radii : dict
+        Site radii by antenna type and environment.
+    spectrum_portfolio : list of tuples
+        Frequency, bandwidth, generation and transmission type per band.
+
+    Returns
+    -------
+    items : list of tuples
+        Contains the environment, antenna type, site radius and band for
+        each work item.
+
+    """
+    items = []
+
+    for environment in environments:
+        for ant_type in ant_types:
+            for site_radius in site_radii[ant_type][environment]:
+
+                if environment == 'urban' and site_radius > 5000:
+                    continue
+                if environment == 'suburban' and site_radius > 15000:
+                    continue
+
+                for band in spectrum_portfolio:
+                    items.append((environment, ant_type, site_radius, band))
+
+    return items
+
+
+SITE_GEOMETRY = {}
+
+
+def generate_site_geometry(site_radius, parameters, frequencies):
+    """
+    Generate the hex sites and receivers for a site radius, with the
+    number of rings of interfering sites set by 'interference_rings',
+    and draw the random variations for every band in bulk.
+
+    The most recent radius is kept, so consecutive bands for the same
+    radius reuse the geometry and variations. Variations come from
+    streams keyed by (site radius, band, receiver), so they are the same
+    whichever process draws them.
+
+    """
+    key = (site_radius, tuple(frequencies))
+
+    if key not in SITE_GEOMETRY:
+
+        SITE_GEOMETRY.clear()
+
+        transmitter, interfering_transmitters, site_area, int_site_areas = \
+            produce_sites_and_site_areas(
+                UNPROJECTED_POINT['geometry']['coordinates'],
+                site_radius,
+                UNPROJECTED_CRS,
+                PROJECTED_CRS,
+                parameters.get('interference_rings', 1)
+                )
+
+        receivers = generate_receivers(site_area, parameters, 1,
+            variation_stream(parameters['seed_value'], site_radius))
+
+        random_variations = draw_variations(parameters['seed_value'],
+            site_radius, frequencies, len(receivers),
+            1 + len(interfering_transmitters))
+
+        SITE_GEOMETRY[key] = (
+            transmitter, interfering_transmitters, site_area, receivers,
+            {band_key(frequency): variations[0] for frequency, variations
+                in zip(frequencies, random_variations)}
+        )
+
+    return SITE_GEOMETRY[key]
+
+
+WORKER_INPUTS = {}
+
+
+def init_worker(inputs):
+    """
+    Store the simulation settings in each worker process, compiling the
+    modulation and coding lookup table once.
+
+    """
+    WORKER_INPUTS.update(inputs)
+    WORKER_INPUTS['spectral_efficiency_lut'] = compile_spectral_efficiency_lut(
+        inputs['modulation_and_coding_lut'])
+
+
+def run_work_item(item):
+    """
+    Simulate a single (site radius, spectrum band) work item.
+
+    Random variations are drawn from streams keyed by the seed value,
+    site radius, band and receiver, so results do not depend on which
+    process runs the item or in what order.
+
+    With more than one of the 'iterations' in the parameters, the
+    confidence intervals are taken over every receiver and iteration
+    (Monte Carlo mode), and the full results hold the first iteration.
+
+    Parameters
+    ----------
+    item : tuple
+        Contains the environment, antenna type, site radius and band.
+
+    Returns
+    -------
+    rows : list of tuples
+        Lookup table rows for the work item.
+
+    """
+    environment, ant_type, site_radius, band = item
+    frequency, bandwidth, generation, transmission_type = band
+
+    parameters = WORKER_INPUTS['parameters']
+
+    frequencies = WORKER_INPUTS.get('frequencies') or [frequency]
+    if frequency not in frequencies:
+        frequencies = list(frequencies) + [frequency]
+
+    transmitter, interfering_transmitters, site_area, receivers, \
+        random_variations = generate_site_geometry(
+            site_radius, parameters, frequencies)
+
+    manager = SimulationManager(
+        transmitter, interfering_transmitters, ant_type,
+        receivers, site_area, parameters
+        )
+
+    results = manager.estimate_link_budget_vectorized(
+        frequency,
+        bandwidth,
+        generation,
+        ant_type,
+        transmission_type,
+        environment,
+        WORKER_INPUTS['spectral_efficiency_lut'],
+        parameters,
+        random_variations[band_key(frequency)]
+        )
+
+    folder = os.path.join(DATA_INTERMEDIATE, 'luts', 'full_tables')
+    filename = 'full_capacity_lut_{}_{}_{}_{}_{}_{}.csv'.format(
+        environment, site_radius, generation, frequency, ant_type, transmission_type)
+
+    write_full_results(results, environment, site_radius,
+        frequency, bandwidth, generation, ant_type, transmission_type,
+        folder, filename, parameters)
+
+    if parameters.get('iterations', 1) > 1:
+
+        streams = VariationStreams(parameters['seed_value'], site_radius,
+            frequency, len(receivers), 1 + len(interfering_transmitters))
+
+        sketches, noise = simulate_iterations(manager, streams, frequency,
+            bandwidth, generation, transmission_type,
+            WORKER_INPUTS['spectral_efficiency_lut'], parameters)
+
+        percentile_site_results = obtain_sketch_percentile_values(
+            sketches, noise, bandwidth, generation, transmission_type,
+            manager.site_area.area / 1e6,
+            WORKER_INPUTS['spectral_efficiency_lut'],
+            WORKER_INPUTS['confidence_intervals']
+        )
+
+    else:
+
+        percentile_site_results = obtain_percentile_values(
+            results, transmission_type, parameters,
+            WORKER_INPUTS['confidence_intervals']
+        )
+
+    return frequency_lookup_table_rows(percentile_site_results, environment,
+        site_radius, frequency, bandwidth, generation, ant_type,
+        transmission_type, parameters)
+
+
+CACHE_VERSION = 5
+
+#modules whose source produces the lookup table rows
+CODE_MODULES = [system_simulator, generate_hex, path_loss, variations, sketch]
+
+
+def code_fingerprint(modules=None, paths=None):
+    """
+    Hash the source of the code that produces the lookup table rows
+    (the simulator modules and this script), so cached entries are not
+    reused after the code changes.
+
+    Parameters
+    ----------
+    modules : list, optional
+        Modules to hash. Defaults to `CODE_MODULES`.
+    paths : list, optional
+        Other source files to hash. Defaults to this script.
+
+    Returns
+    -------
+    fingerprint : string
+        Hex digest of the source files.
+
+    """
+    if modules is None:
+        modules = CODE_MODULES
+    if paths is None:
+        paths = [os.path.abspath(__file__)]
+
+    digest = hashlib.sha256()
+
+    for path in [module.__file__ for module in modules] + list(paths):
+        with open(path, 'rb') as source:
+            digest.update(hashlib.sha256(source.read()).digest())
+
+    return digest.hexdigest()
+
+
+def work_item_key(item, inputs, fingerprint=None):
+    """
+    Content address for a work item's lookup table rows.
+
+    The key covers everything the rows depend on: the environment,
+    antenna type, site radius and band, the simulation parameters, the
+    modulation and coding table for the band's generation, the
+    confidence intervals and the source of the simulator code. Changing
+    one band or one generation's table therefore only invalidates the
+    affected entries, while any code change invalidates them all.
+
+    Parameters
+    ----------
+    item : tuple
+        Contains the environment, antenna type, site radius and band.
+    inputs : dict
+        Contains the simulation parameters, modulation and coding lookup
+        table and confidence intervals.
+    fingerprint : string, optional
+        Code fingerprint. Computed with `code_fingerprint` if not given.
+
+    Returns
+    -------
+    key : string
+        Hex digest identifying the work item.
+
+    """
+    environment, ant_type, site_radius, band = item
+
+    if fingerprint is None:
+        fingerprint = code_fingerprint()
+
+    content = {
+        'version': CACHE_VERSION,
+        'code': fingerprint,
+        'environment': environment,
+        'ant_type': ant_type,
+        'site_radius': site_radius,
+        'band': list(band),
+        'parameters': inputs['parameters'],
+        'modulation_and_coding_lut':
+            inputs['modulation_and_coding_lut'][band[2]],
+        'confidence_intervals': inputs['confidence_intervals'],
+    }
+
+    encoded = json.dumps(content, sort_keys=True).encode('utf-8')
+
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def read_cache_entry(cache_directory, key):
+    """
+    Read the lookup table rows stored under a key.
+
+    """
+    with open(os.path.join(cache_directory, key + '.csv'), newline='') as f:
+        return [tuple(row) for row in csv.reader(f)]
+
+
+def write_cache_entry(cache_directory, key, rows):
+    """
+    Store lookup table rows under a key.
+
+    The entry is written to a temporary file and renamed, so an
+    interrupted run never leaves a partial entry behind.
+
+    """
+    if not os.path.exists(cache_directory):
+        os.makedirs(cache_directory)
+
+    path = os.path.join(cache_directory, key + '.csv')
+
+    with open(path + '.tmp', 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+    os.replace(path + '.tmp', path)
+
+
+def run_work_items(items, workers, cache_directory, **inputs):
+    """
+    Simulate all work items missing from the cache, either serially or
+    across a process pool, then assemble the rows from the cache.
+
+    Rows are returned in work item order whichever way the items are
+    run, so the lookup table can be written once by the parent process.
+
+    Parameters
+    ----------
+    items : list of tuples
+        Work items from `build_work_items`.
+    workers : int
+        Number of worker processes.
+    cache_directory : string
+        Folder holding one cache entry per work item.
+    inputs : dict
+        Contains the simulation parameters, modulation and coding lookup
+        table and confidence intervals, and optionally the frequencies
+        of all bands, whose variations are drawn together per radius.
+
+    Returns
+    -------
+    rows : list of tuples
+        Lookup table rows for all work items.
+
+    """
+    fingerprint = code_fingerprint()
+    keys = [work_item_key(item, inputs, fingerprint) for item in items]
+
+    missing = []
+    for item, key in zip(items, keys):
+        if not os.path.exists(os.path.join(cache_directory, key + '.csv')):
+            missing.append((item, key))
+
+    print('Simulating {} of {} work items ({} cached)'.format(
+        len(missing), len(items), len(items) - len(missing)))
+
+    if workers <= 1:
+        init_worker(inputs)
+        for item, key in tqdm(missing):
+            write_cache_entry(cache_directory, key, run_work_item(item))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            'fork' if 'fork' in methods else 'spawn')
+        with context.Pool(workers, initializer=init_worker,
+            initargs=(inputs,)) as pool:
+            results = pool.imap(run_work_item, [item for item, key in missing])
+            for (item, key), rows in tqdm(zip(missing, results),
+                total=len(missing)):
+                write_cache_entry(cache_directory, key, rows)
+
+    return [row for key in keys for row in read_cache_entry(
+        cache_directory, key)]
+
+
+UNPROJECTED_POINT = {
+    'type': 'Feature',
+    'geometry': {
+        'type': 'Point',
+        'coordinates': (0, 0),
+        },
+    'properties': {
+        'site_id': 'Radio Tower'
+        }
+    }
+
+UNPROJECTED_CRS = 'epsg:4326'
+PROJECTED_CRS = 'epsg:3857'
+
+
 if __name__ == '__main__':
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1,
+        help='number of (site radius, band) work items to run in parallel')
+    args = parser.parse_args()
+
     PARAMETERS = {
+        'seed_value': 42,
         'seed_value2_4G': 4,
         'seed_value2_5G': 6,
         'seed_value2_free-space': 14,
@@ -549,7 +1142,13 @@ if __name__ == '__main__':
         'rx_height': 1.5,
         'network_load': 100,
         'sectorization': 3,
+        #Monte Carlo iterations per receiver (1 for a single draw)
         'iterations': 100,
+        'iterations_per_batch': 50,
+        #tiers of interfering sites (1, 2 or 3 rings: 6, 18 or 36 sites)
+        'interference_rings': 1,
+        #strongest interferers summed at each receiver (None for all)
+        'interference_top_n': 3,
     }
 
     # SPECTRUM_PORTFOLIO = [
@@ -667,85 +1266,21 @@ if __name__ == '__main__':
             },
         }
 
-    unprojected_point = {
-        'type': 'Feature',
-        'geometry': {
-            'type': 'Point',
-            'coordinates': (0, 0),
-            },
-        'properties': {
-            'site_id': 'Radio Tower'
-            }
-        }
-
-    unprojected_crs = 'epsg:4326'
-    projected_crs = 'epsg:3857'
-
     environments =[
         'free-space'
     ]
 
-    for environment in environments:
-        for ant_type in ANT_TYPES:
-            site_radii_generator = SITE_RADII[ant_type]
-            for site_radius in site_radii_generator[environment]:
+    items = build_work_items(environments, ANT_TYPES, SITE_RADII,
+        SPECTRUM_PORTFOLIO)
 
-                # if site_radius > 1000:
-                #     continue
+    cache_directory = os.path.join(DATA_INTERMEDIATE, 'luts', 'cache')
 
-                if environment == 'urban' and site_radius > 5000:
-                    continue
-                if environment == 'suburban' and site_radius > 15000:
-                    continue
+    rows = run_work_items(items, args.workers, cache_directory,
+        parameters=PARAMETERS,
+        modulation_and_coding_lut=MODULATION_AND_CODING_LUT,
+        confidence_intervals=CONFIDENCE_INTERVALS,
+        frequencies=[band[0] for band in SPECTRUM_PORTFOLIO]
+    )
 
-                print('--working on {}: {}'.format(environment, site_radius))
-
-                transmitter, interfering_transmitters, site_area, int_site_areas = \
-                    produce_sites_and_site_areas(
-                        unprojected_point['geometry']['coordinates'],
-                        site_radius,
-                        unprojected_crs,
-                        projected_crs
-                        )
-
-                receivers = generate_receivers(site_area, PARAMETERS, 1)
-                # receivers = receivers[:100]
-                # print(len(receivers))
-                for frequency, bandwidth, generation, transmission_type in SPECTRUM_PORTFOLIO:
-
-                    print('{}, {}, {}, {}'.format(frequency, bandwidth, generation, transmission_type))
-
-                    MANAGER = SimulationManager(
-                        transmitter, interfering_transmitters, ant_type,
-                        receivers, site_area, PARAMETERS
-                        )
-
-                    results = MANAGER.estimate_link_budget(
-                        frequency,
-                        bandwidth,
-                        generation,
-                        ant_type,
-                        transmission_type,
-                        environment,
-                        MODULATION_AND_CODING_LUT,
-                        PARAMETERS
-                        )
-
-                    folder = os.path.join(DATA_INTERMEDIATE, 'luts', 'full_tables')
-                    filename = 'full_capacity_lut_{}_{}_{}_{}_{}_{}.csv'.format(
-                        environment, site_radius, generation, frequency, ant_type, transmission_type)
-
-                    write_full_results(results, environment, site_radius,
-                        frequency, bandwidth, generation, ant_type, transmission_type,
-                        folder, filename, PARAMETERS)
-
-                    percentile_site_results = obtain_percentile_values(
-                        results, transmission_type, PARAMETERS, CONFIDENCE_INTERVALS
-                    )
-
-                    results_directory = os.path.join(DATA_INTERMEDIATE, 'luts')
-                    write_frequency_lookup_table(percentile_site_results, environment,
-                        site_radius, frequency, bandwidth, generation,
-                        ant_type, transmission_type, results_directory,
-                        'capacity_lut_by_frequency.csv', PARAMETERS
-                    )
+    results_directory = os.path.join(DATA_INTERMEDIATE, 'luts')
+    write_lookup_table(rows, results_directory, 'capacity_lut_by_frequency.csv')
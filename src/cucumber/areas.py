@@ -0,0 +1,144 @@
+"""
+Geodesic polygon areas.
+
+A single WGS84 `Geod` is shared by all area calculations, which can be
+spread over a process pool for large layers, and areas can be cached by
+region ID so later runs skip regions whose shapes have not changed.
+
+Written by Ed Oughton.
+
+October 2026
+
+"""
+import os
+import hashlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pyproj
+
+GEOD = pyproj.Geod(ellps='WGS84')
+
+
+def geodesic_area(geometry):
+    """
+    Return the area of a polygon in square meters, assuming WGS84.
+
+    Missing or empty geometries have an area of NaN.
+
+    """
+    if geometry is None or geometry.is_empty:
+        return np.nan
+
+    poly_area, poly_perimeter = GEOD.geometry_area_perimeter(geometry)
+
+    return abs(poly_area)
+
+
+def _geodesic_areas(geometries):
+
+    return [geodesic_area(geometry) for geometry in geometries]
+
+
+def geodesic_areas(geometries, workers=1, chunksize=500):
+    """
+    Return the area of every polygon in square meters.
+
+    Parameters
+    ----------
+    geometries : list or GeoSeries
+        Shapely geometries in WGS84.
+    workers : int
+        Number of worker processes. Chunks of geometries are sent to a
+        pool when this is above 1 and there is more than one chunk.
+    chunksize : int
+        Number of geometries per chunk.
+
+    Returns
+    -------
+    areas : numpy array
+        Area of each geometry.
+
+    """
+    geometries = list(geometries)
+
+    chunks = [geometries[idx:idx + chunksize]
+        for idx in range(0, len(geometries), chunksize)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        results = [_geodesic_areas(chunk) for chunk in chunks]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            'fork' if 'fork' in methods else 'spawn')
+        with context.Pool(workers) as pool:
+            results = pool.map(_geodesic_areas, chunks)
+
+    return np.array([area for chunk in results for area in chunk], dtype=float)
+
+
+def geometry_key(geometry):
+    """
+    Hash a geometry, so cached areas are only reused for the same shape.
+
+    """
+    if geometry is None:
+        return ''
+
+    return hashlib.sha1(geometry.wkb).hexdigest()
+
+
+def cached_geodesic_areas(ids, geometries, path, workers=1):
+    """
+    Return the area of every polygon, reusing areas cached by region ID.
+
+    Regions are recomputed when they are new or their shape has changed,
+    and the cache at `path` is then updated.
+
+    Parameters
+    ----------
+    ids : list
+        Region IDs.
+    geometries : list or GeoSeries
+        Shapely geometries in WGS84.
+    path : string
+        Cache .csv path.
+    workers : int
+        Number of worker processes for uncached regions.
+
+    Returns
+    -------
+    areas : numpy array
+        Area of each geometry in square meters.
+
+    """
+    ids = [str(region_id) for region_id in ids]
+    geometries = list(geometries)
+    keys = [geometry_key(geometry) for geometry in geometries]
+
+    cache = {}
+    if os.path.exists(path):
+        data = pd.read_csv(path, dtype={'id': str, 'key': str},
+            keep_default_na=False, float_precision='round_trip')
+        for region_id, key, area in zip(data['id'], data['key'],
+            data['area_m2']):
+            cache[(region_id, key)] = float(area)
+
+    missing = [idx for idx, item in enumerate(zip(ids, keys))
+        if item not in cache]
+
+    if missing:
+        areas = geodesic_areas([geometries[idx] for idx in missing], workers)
+        for idx, area in zip(missing, areas):
+            cache[(ids[idx], keys[idx])] = area
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        pd.DataFrame([{'id': region_id, 'key': key, 'area_m2': area}
+            for (region_id, key), area in cache.items()]).to_csv(
+            path + '.tmp', index=False, float_format='%.17g')
+        os.replace(path + '.tmp', path)
+
+    return np.array([cache[item] for item in zip(ids, keys)], dtype=float)
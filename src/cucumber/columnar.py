@@ -0,0 +1,837 @@
+"""
+Columnar decile pipeline.
+
+Array-based equivalents of the demand, supply, energy, emissions and
+cost stages. Each function takes the decile table as a pandas DataFrame
+(one row per decile, and optionally one row per decile per option) and
+computes every metric as a whole-column operation, producing the same
+columns as the dict-based functions in the sibling modules.
+
+Written by Ed Oughton.
+
+October 2026
+
+"""
+import numpy as np
+import pandas as pd
+
+from cucumber.demand import get_per_user_capacity
+from cucumber.emissions import as_emissions_factors
+from cucumber.supply import get_density_curve, find_site_densities
+
+
+def run_pipeline(country, deciles, capacity_lut, on_grid_mix, emissions_lut,
+    long_format=True):
+    """
+    Run demand, supply, energy, emissions and cost over a decile table.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    on_grid_mix : dict
+        Share of on-grid generation by fuel type.
+    emissions_lut : EmissionsFactors or dict
+        Emissions factors (g CO2 per kWh) by region, scenario and fuel.
+    long_format : bool
+        Whether to return energy and emissions by fuel type as long-format
+        tables, rather than as matrices.
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    energy : pandas DataFrame
+        Energy by decile and fuel type (long format).
+    emissions : pandas DataFrame
+        Emissions by decile and fuel type (long format).
+
+    If `long_format` is not set, `deciles` and the matrices by fuel type
+    (see `estimate_by_fuel`) are returned instead.
+
+    """
+    deciles = estimate_demand(country, deciles)
+
+    deciles = estimate_supply(country, deciles, capacity_lut)
+
+    deciles, by_fuel = assess_energy_emissions(
+        country, deciles, on_grid_mix, emissions_lut)
+
+    deciles = assess_cost(country, deciles)
+
+    if long_format:
+        return (deciles, energy_long_format(country, deciles, by_fuel),
+            emissions_long_format(country, deciles, by_fuel))
+
+    return deciles, by_fuel
+
+
+SWEEP_AXES = ['capacity', 'generation', 'backhaul', 'energy_scenario',
+    'sharing_scenario']
+
+
+def parse_options(options):
+    """
+    Split option strings (capacity_generation_backhaul_energy_sharing)
+    into a table with one column per axis, in the order given.
+
+    """
+    return pd.DataFrame([option.split('_') for option in options],
+        columns=SWEEP_AXES)
+
+
+def run_sweep(country, deciles, options, capacity_lut, on_grid_mixes,
+    emissions_lut, density_curves=None, long_format=False):
+    """
+    Run every option over a decile table in a single pass.
+
+    Rather than rerunning the whole pipeline for each option, each stage
+    runs once per unique combination of the axes it depends on, with the
+    deciles stacked for all of those combinations. The table is then
+    broadcast over the extra axes of the next stage:
+
+    - demand: capacity and sharing scenario
+    - required sites: plus generation
+    - backhaul and network energy: plus backhaul
+    - emissions and cost: plus energy scenario
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    options : list
+        Option strings (see `parse_options`).
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    on_grid_mixes : dict
+        Share of on-grid generation by fuel type, for each energy scenario.
+    emissions_lut : EmissionsFactors or dict
+        Emissions factors (g CO2 per kWh) by region, scenario and fuel.
+    density_curves : dict, optional
+        Precompiled site density curves (see
+        `cucumber.supply.compile_density_curves`).
+    long_format : bool
+        Whether to also return energy and emissions by fuel type as
+        long-format tables.
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for every option and decile, ordered by option and then
+        decile, as if each option had been run in turn.
+    energy : pandas DataFrame
+        Energy by option, decile and fuel type (only if `long_format`).
+    emissions : pandas DataFrame
+        Emissions by option, decile and fuel type (only if `long_format`).
+
+    """
+    options = parse_options(options)
+    options['option_idx'] = np.arange(len(options))
+
+    deciles = pd.DataFrame(deciles).drop(
+        columns=[axis for axis in SWEEP_AXES if axis in deciles])
+    columns = list(deciles.columns)
+    deciles['decile_idx'] = np.arange(len(deciles))
+
+    table = _broadcast(deciles, options, ['capacity', 'sharing_scenario'])
+    table = estimate_demand(country, table)
+
+    table = _broadcast(table, options, ['generation'])
+    table = estimate_required_sites(
+        country, table, capacity_lut, density_curves)
+
+    table = _broadcast(table, options, ['backhaul'])
+    table = estimate_backhaul_upgrades(country, table)
+    table = estimate_network_energy(country, table)
+
+    table = _broadcast(table, options, ['energy_scenario', 'option_idx'])
+
+    groups = []
+    energy = []
+    emissions = []
+    for scenario, group in table.groupby('energy_scenario', sort=False):
+        by_fuel = estimate_by_fuel(
+            country, group, on_grid_mixes[scenario], emissions_lut)
+        groups.append(add_emissions(group, by_fuel))
+        if long_format:
+            energy.append(_with_order(group,
+                energy_long_format(country, group, by_fuel), by_fuel))
+            emissions.append(_with_order(group,
+                emissions_long_format(country, group, by_fuel), by_fuel))
+
+    #site totals are set by the cost stage, as in the dict-based functions
+    table = _in_order(pd.concat(groups)).drop(columns=['total_required_sites'])
+    table = assess_cost(country, table)
+
+    columns = columns + SWEEP_AXES
+    table = table[columns + [column for column in table.columns
+        if column not in columns + ['decile_idx', 'option_idx']]]
+
+    if long_format:
+        return (table, _in_order(pd.concat(energy)),
+            _in_order(pd.concat(emissions)))
+
+    return table
+
+
+def _broadcast(table, options, axes):
+    """
+    Repeat a table for each combination of some new option axes, keeping
+    only the combinations that occur alongside the axes already present.
+
+    """
+    present = [axis for axis in SWEEP_AXES if axis in table]
+    combinations = options[present + axes].drop_duplicates()
+
+    if present:
+        return table.merge(combinations, on=present, how='inner')
+
+    return table.merge(combinations, how='cross')
+
+
+def _with_order(group, long_table, by_fuel):
+    """
+    Copy the option and decile order to a long-format table.
+
+    """
+    repeats = len(by_fuel['fuels'])
+
+    long_table['option_idx'] = np.repeat(group['option_idx'].to_numpy(),
+        repeats)
+    long_table['decile_idx'] = np.repeat(group['decile_idx'].to_numpy(),
+        repeats)
+
+    return long_table
+
+
+def _in_order(table):
+    """
+    Sort a table by option and then decile (keeping fuel order).
+
+    """
+    table = table.sort_values(['option_idx', 'decile_idx'], kind='stable')
+
+    return table.drop(columns=['option_idx', 'decile_idx'],
+        errors='ignore').reset_index(drop=True)
+
+
+def estimate_demand(country, deciles):
+    """
+    Estimate demand metrics.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles with a positive area.
+
+    """
+    deciles = pd.DataFrame(deciles).copy()
+
+    geotypes = {1: 'urban', 2: 'suburban', 3: 'suburban'}
+    geotypes.update({decile: 'rural' for decile in range(4, 11)})
+    geotype = deciles['decile'].astype(int).map(geotypes)
+    if 'geotype' in deciles:
+        geotype = geotype.fillna(deciles['geotype'])
+    deciles['geotype'] = geotype
+
+    net_handle = deciles['sharing_scenario'] + '_' + deciles['geotype']
+    deciles['networks'] = net_handle.map(country['networks'])
+
+    deciles = deciles[deciles['area_km2'] > 0].copy()
+
+    deciles['income'] = country['income']
+    deciles['wb_region'] = country['wb_region']
+    deciles['adb_region'] = country['adb_region']
+    deciles['iea_classification'] = country['iea_classification']
+
+    deciles['population_with_smartphones'] = (
+        deciles['population_total'] *
+        (country['smartphone_penetration']/100))
+
+    deciles['smartphones_on_network'] = (
+        deciles['population_with_smartphones'] / deciles['networks'])
+
+    per_user_mbps = {
+        capacity: get_per_user_capacity(
+            country, 'suburban', {'capacity': capacity})
+        for capacity in deciles['capacity'].unique()
+    }
+
+    deciles['demand_mbps_km2'] = (
+        deciles['smartphones_on_network'] *
+        deciles['capacity'].map(per_user_mbps) /
+        deciles['area_km2']
+    )
+
+    return deciles
+
+
+def estimate_supply(country, deciles, capacity_lut, density_curves=None):
+    """
+    Estimate supply metrics.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    density_curves : dict, optional
+        Precompiled site density curves (see
+        `cucumber.supply.compile_density_curves`).
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    """
+    deciles = estimate_required_sites(
+        country, deciles, capacity_lut, density_curves)
+
+    deciles = estimate_backhaul_upgrades(country, deciles)
+
+    return deciles
+
+
+def estimate_required_sites(country, deciles, capacity_lut,
+    density_curves=None):
+    """
+    Estimate the sites required to meet demand, and the greenfield sites
+    and brownfield upgrades needed to provide them.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    density_curves : dict, optional
+        Precompiled site density curves (see
+        `cucumber.supply.compile_density_curves`).
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    """
+    deciles = deciles.copy()
+
+    site_density = np.zeros(len(deciles))
+    demand = deciles['demand_mbps_km2'].to_numpy(dtype=float)
+    generation = deciles['generation'].to_numpy()
+    target_gb = (deciles['capacity'] == 0).to_numpy()
+
+    for gen in np.unique(generation):
+        curve = get_density_curve(country, gen, capacity_lut, density_curves)
+        idx = generation == gen
+        site_density[idx] = find_site_densities(curve, demand[idx])
+
+    site_density[target_gb] = 0
+
+    deciles['network_required_sites'] = np.ceil(
+        site_density * deciles['area_km2'].to_numpy()).astype(int)
+
+    deciles['total_required_sites'] = np.where(
+        deciles['population_km2'] < country['pop_density_satellite_threshold'],
+        0, np.nan)
+
+    deciles = estimate_site_upgrades(country, deciles)
+
+    return deciles
+
+
+def estimate_site_upgrades(country, deciles):
+    """
+    Estimate the number of greenfield sites and brownfield upgrades for the
+    single network being modeled.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    """
+    deciles['network_existing_sites'] = (
+        deciles['total_existing_sites'] / deciles['networks'])
+
+    deciles['network_existing_sites_4G'] = (
+        deciles['total_existing_sites_4G'] / deciles['networks'])
+
+    required = deciles['network_required_sites'].to_numpy()
+    existing = deciles['network_existing_sites'].to_numpy()
+    existing_4G = deciles['network_existing_sites_4G'].to_numpy()
+    is_4G = (deciles['generation'] == '4G').to_numpy()
+    is_5G = (deciles['generation'] == '5G').to_numpy()
+    has_4G = is_4G & (existing_4G > 0)
+
+    upgraded = np.where(
+        required > existing,
+        np.where(existing > 0,
+            np.where(has_4G, existing - existing_4G, existing), 0),
+        np.where(has_4G, np.maximum(required - existing_4G, 0), required)
+    )
+
+    new = np.where(is_4G, required - (existing_4G + upgraded),
+        np.where(is_5G, required - upgraded, np.nan))
+
+    deciles['network_upgraded_sites'] = upgraded
+    deciles['network_new_sites'] = np.where(new < 0, 0, new)
+
+    return deciles
+
+
+def estimate_backhaul_upgrades(country, deciles):
+    """
+    Estimates the number of backhaul links requiring upgrades for the
+    single network being modeled.
+
+    Parameters
+    ----------
+    country : dict
+        Country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    """
+    network_sites = (
+        deciles['network_upgraded_sites'] + deciles['network_new_sites']
+    ).to_numpy()
+
+    fiber = np.floor(deciles['backhaul_fiber'] / deciles['networks'])
+    wireless = np.floor(
+        (deciles['backhaul_wireless'] + deciles['backhaul_fiber']) /
+        deciles['networks'])
+
+    backhaul_existing = np.select(
+        [deciles['backhaul'] == 'fiber', deciles['backhaul'] == 'wireless'],
+        [fiber, wireless], default=np.nan)
+
+    backhaul_new = np.where(backhaul_existing < network_sites,
+        np.ceil(network_sites - backhaul_existing), 0)
+
+    backhaul_new = np.where(
+        np.isnan(backhaul_existing), np.nan, backhaul_new)
+
+    #link counts stay integers unless a backhaul type is unknown
+    if not np.isnan(backhaul_existing).any():
+        backhaul_existing = backhaul_existing.astype(int)
+        backhaul_new = backhaul_new.astype(int)
+
+    deciles['backhaul_existing'] = backhaul_existing
+    deciles['backhaul_new'] = backhaul_new
+
+    return deciles
+
+
+def assess_energy(country, deciles, on_grid_mix):
+    """
+    Estimate energy consumption.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    on_grid_mix : dict
+        Share of on-grid generation by fuel type.
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    energy : pandas DataFrame
+        Energy by decile and fuel type (long format).
+
+    """
+    deciles = estimate_network_energy(country, deciles)
+
+    by_fuel = estimate_by_fuel(country, deciles, on_grid_mix)
+
+    return deciles, energy_long_format(country, deciles, by_fuel)
+
+
+def assess_emissions(country, deciles, on_grid_mix, emissions_lut):
+    """
+    Estimate emissions.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    on_grid_mix : dict
+        Share of on-grid generation by fuel type.
+    emissions_lut : EmissionsFactors or dict
+        Emissions factors (g CO2 per kWh) by region, scenario and fuel.
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    emissions : pandas DataFrame
+        Emissions by decile and fuel type (long format).
+
+    """
+    by_fuel = estimate_by_fuel(country, deciles, on_grid_mix, emissions_lut)
+
+    deciles = add_emissions(deciles, by_fuel)
+
+    return deciles, emissions_long_format(country, deciles, by_fuel)
+
+
+def assess_energy_emissions(country, deciles, on_grid_mix, emissions_lut,
+    long_format=False):
+    """
+    Estimate energy consumption and emissions in a single pass.
+
+    Energy and emissions by fuel type are kept as (deciles x fuels)
+    matrices, rather than one row per decile and fuel repeating the
+    decile and country metadata.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    on_grid_mix : dict
+        Share of on-grid generation by fuel type.
+    emissions_lut : EmissionsFactors or dict
+        Emissions factors (g CO2 per kWh) by region, scenario and fuel.
+    long_format : bool
+        Whether to also expand the matrices into the long-format energy
+        and emissions tables.
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+    by_fuel : dict
+        Matrices by fuel type (see `estimate_by_fuel`). If `long_format`
+        is set, the energy and emissions tables are returned instead.
+
+    """
+    deciles = estimate_network_energy(country, deciles)
+
+    by_fuel = estimate_by_fuel(country, deciles, on_grid_mix, emissions_lut)
+
+    deciles = add_emissions(deciles, by_fuel)
+
+    if long_format:
+        return (deciles, energy_long_format(country, deciles, by_fuel),
+            emissions_long_format(country, deciles, by_fuel))
+
+    return deciles, by_fuel
+
+
+def estimate_network_energy(country, deciles):
+    """
+    Estimate the existing and new energy consumption of the single
+    network being modeled.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    """
+    deciles = deciles.copy()
+
+    site_kwh = country['energy_equipment_kwh']
+    wireless_bh_kwh = country['energy_wireless_medium_kwh']
+    fiber_bh_kwh = country['energy_fiber_kwh']
+
+    selected_backhaul = deciles['backhaul'].map(
+        {'wireless': wireless_bh_kwh, 'fiber': fiber_bh_kwh})
+
+    existing_site_energy_kwh = (
+        (deciles['total_existing_sites'] / deciles['networks']) *
+        site_kwh * 24 * 365)
+    existing_backhaul_energy_kwh = (
+        (np.floor(deciles['backhaul_wireless'] / deciles['networks']) *
+         wireless_bh_kwh * 24 * 365) +
+        (np.floor(deciles['backhaul_fiber'] / deciles['networks']) *
+         fiber_bh_kwh * 24 * 365))
+    new_site_energy_kwh = deciles['network_new_sites'] * site_kwh * 24 * 365
+    new_backhaul_energy_kwh = (
+        deciles['backhaul_new'] * selected_backhaul * 24 * 365)
+
+    deciles['network_existing_energy_kwh'] = (
+        existing_site_energy_kwh + existing_backhaul_energy_kwh)
+    deciles['network_new_energy_kwh'] = (
+        new_site_energy_kwh + new_backhaul_energy_kwh)
+
+    return deciles
+
+
+def estimate_by_fuel(country, deciles, on_grid_mix, emissions_lut=None):
+    """
+    Split network energy (and optionally emissions) by fuel type.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles, with network energy estimated.
+    on_grid_mix : dict
+        Share of on-grid generation by fuel type.
+    emissions_lut : EmissionsFactors or dict, optional
+        Emissions factors (g CO2 per kWh) by region, scenario and fuel.
+
+    Returns
+    -------
+    by_fuel : dict
+        The fuel types, plus (deciles x fuels) matrices of existing and
+        new energy (kWh) and, given an emissions table, existing and new
+        emissions (t CO2).
+
+    """
+    fuels = list(on_grid_mix.keys())
+    shares = np.array(list(on_grid_mix.values()), dtype=float)
+
+    by_fuel = {
+        'fuels': fuels,
+        'existing_energy_kwh': np.outer(
+            deciles['network_existing_energy_kwh'].to_numpy(dtype=float),
+            shares),
+        'new_energy_kwh': np.outer(
+            deciles['network_new_energy_kwh'].to_numpy(dtype=float), shares),
+    }
+
+    if emissions_lut is None:
+        return by_fuel
+
+    #emissions factor (kg per kwh) for each decile (rows) and fuel (columns)
+    emissions_lut = as_emissions_factors(emissions_lut)
+    scenarios, scenario_idx = np.unique(
+        deciles['energy_scenario'].to_numpy(), return_inverse=True)
+    factors_kg = emissions_lut.lookup(country['iea_classification'],
+        scenarios, fuels)[scenario_idx.ravel()] / 1000
+
+    by_fuel['existing_emissions_t_co2'] = np.round(
+        (by_fuel['existing_energy_kwh'] * factors_kg) / 1000, 5)
+    by_fuel['new_emissions_t_co2'] = np.round(
+        by_fuel['new_energy_kwh'] * factors_kg / 1000, 5)
+
+    return by_fuel
+
+
+def add_emissions(deciles, by_fuel):
+    """
+    Add emissions by fuel type, and network totals, to the decile table.
+
+    """
+    deciles = deciles.copy()
+
+    existing_emissions_t_co2 = by_fuel['existing_emissions_t_co2']
+    new_emissions_t_co2 = by_fuel['new_emissions_t_co2']
+
+    existing_network = np.zeros(len(deciles))
+    new_network = np.zeros(len(deciles))
+    for idx, fuel in enumerate(by_fuel['fuels']):
+        deciles['existing_emissions_t_co2_' + fuel] = (
+            existing_emissions_t_co2[:, idx])
+        deciles['new_emissions_t_co2_' + fuel] = new_emissions_t_co2[:, idx]
+        existing_network = existing_network + existing_emissions_t_co2[:, idx]
+        new_network = new_network + new_emissions_t_co2[:, idx]
+
+    deciles['network_existing_emissions_t_co2'] = existing_network
+    deciles['network_new_emissions_t_co2'] = new_network
+
+    return deciles
+
+
+def energy_long_format(country, deciles, by_fuel):
+    """
+    Expand energy by fuel type into one row per decile and fuel type.
+
+    """
+    fuels = by_fuel['fuels']
+
+    energy = _long_format(country, deciles, fuels, [
+        'country_name', 'iso3', 'decile', 'population', 'area_km2',
+        'population_km2', 'capacity', 'generation', 'backhaul',
+        'energy_scenario', 'income', 'wb_region', 'adb_region',
+        'iea_classification'])
+    energy['product'] = np.tile(fuels, len(deciles))
+    energy['network_existing_energy_kwh'] = (
+        by_fuel['existing_energy_kwh'].ravel())
+    energy['network_new_energy_kwh'] = by_fuel['new_energy_kwh'].ravel()
+
+    return energy
+
+
+def emissions_long_format(country, deciles, by_fuel):
+    """
+    Expand energy and emissions by fuel type into one row per decile and
+    fuel type.
+
+    """
+    fuels = by_fuel['fuels']
+
+    emissions = _long_format(country, deciles, fuels, [
+        'country_name', 'iso3', 'decile', 'population', 'area_km2',
+        'population_km2', 'capacity', 'generation', 'backhaul',
+        'energy_scenario', 'sharing_scenario', 'income', 'wb_region',
+        'adb_region', 'iea_classification'])
+    emissions['product'] = np.tile(fuels, len(deciles))
+    emissions['existing_energy_kwh'] = by_fuel['existing_energy_kwh'].ravel()
+    emissions['new_energy_kwh'] = by_fuel['new_energy_kwh'].ravel()
+    emissions['existing_emissions_t_co2'] = (
+        by_fuel['existing_emissions_t_co2'].ravel())
+    emissions['new_emissions_t_co2'] = by_fuel['new_emissions_t_co2'].ravel()
+
+    return emissions
+
+
+def _long_format(country, deciles, fuels, columns):
+    """
+    Repeat decile and country metadata once per fuel type.
+
+    """
+    repeats = len(fuels)
+    output = {}
+
+    for column in columns:
+        if column in ['country_name', 'iso3', 'income', 'wb_region',
+            'adb_region', 'iea_classification']:
+            output[column] = np.repeat(country[column], len(deciles) * repeats)
+        elif column == 'population':
+            output[column] = np.repeat(
+                deciles['population_total'].to_numpy(), repeats)
+        else:
+            output[column] = np.repeat(deciles[column].to_numpy(), repeats)
+
+    return pd.DataFrame(output)
+
+
+def assess_cost(country, deciles):
+    """
+    Estimate costs.
+
+    Parameters
+    ----------
+    country : dict
+        All country metadata.
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    Returns
+    -------
+    deciles : pandas DataFrame
+        Data for all deciles (one row per decile).
+
+    """
+    deciles = deciles.copy()
+
+    passive = (deciles['sharing_scenario'] == 'passive').to_numpy()
+    new_sites = deciles['network_new_sites']
+
+    deciles['network_cost_site_build_usd'] = np.where(passive,
+        (new_sites * country['cost_site_build']) * (1 / deciles['networks']),
+        (new_sites * country['cost_site_build']))
+
+    deciles['network_cost_equipment_usd'] = (
+        new_sites * country['cost_equipment'])
+    deciles['network_cost_installation_usd'] = (
+        new_sites * country['cost_installation'])
+    deciles['network_cost_operation_and_maintenance_usd'] = (
+        new_sites * country['cost_operation_and_maintenance'])
+    deciles['network_cost_power_usd'] = new_sites * country['cost_power']
+
+    deciles['network_new_cost_usd'] = (
+        deciles['network_cost_equipment_usd'] +
+        deciles['network_cost_site_build_usd'] +
+        deciles['network_cost_installation_usd'] +
+        deciles['network_cost_operation_and_maintenance_usd'] +
+        deciles['network_cost_power_usd']
+    )
+
+    #sites
+    deciles['total_required_sites'] = calc(deciles, 'network_required_sites')
+    deciles['total_upgraded_sites'] = calc(deciles, 'network_upgraded_sites')
+    deciles['total_new_sites'] = calc(deciles, 'network_new_sites')
+
+    #energy/emissions
+    deciles['total_existing_energy_kwh'] = calc(
+        deciles, 'network_existing_energy_kwh')
+    deciles['total_new_energy_kwh'] = calc(deciles, 'network_new_energy_kwh')
+    deciles['total_existing_emissions_t_co2'] = calc(
+        deciles, 'network_existing_emissions_t_co2')
+    deciles['total_new_emissions_t_co2'] = calc(
+        deciles, 'network_new_emissions_t_co2')
+
+    #costs
+    deciles['total_new_cost_usd'] = calc(deciles, 'network_new_cost_usd')
+    deciles['total_cost_equipment_usd'] = calc(
+        deciles, 'network_cost_equipment_usd')
+    deciles['total_cost_site_build_usd'] = np.where(passive,
+        deciles['network_cost_site_build_usd'],
+        calc(deciles, 'network_cost_site_build_usd'))
+    deciles['total_cost_installation_usd'] = calc(
+        deciles, 'network_cost_installation_usd')
+    deciles['total_cost_operation_and_maintenance_usd'] = calc(
+        deciles, 'network_cost_operation_and_maintenance_usd')
+    deciles['total_cost_power_usd'] = calc(deciles, 'network_cost_power_usd')
+
+    return deciles
+
+
+def calc(deciles, metric):
+    """
+    Scale a per-network metric to all smartphone users.
+
+    """
+    if metric not in deciles:
+        return np.zeros(len(deciles))
+
+    value = deciles[metric].to_numpy(dtype=float)
+    users = deciles['smartphones_on_network'].to_numpy(dtype=float)
+    population = deciles['population_with_smartphones'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value_per_user = value / users
+        output = value_per_user * population
+
+    return np.where((value == 0) | (users == 0), 0, output)
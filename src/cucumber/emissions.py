@@ -6,6 +6,118 @@ Written by Ed Oughton
 June 2021
 
 """
+import numpy as np
+import pandas as pd
+
+
+class EmissionsFactors(object):
+    """
+
+    Emissions factors (g CO2 per kWh) compiled into a dense array indexed
+    by (region, scenario, fuel), with integer codes for each name.
+
+    Combinations missing from the source table are NaN.
+
+    Parameters
+    ----------
+    regions : list
+        IEA regions.
+    scenarios : list
+        Energy scenarios.
+    fuels : list
+        Fuel types (lower case).
+    factors : numpy array
+        Factors with shape (regions, scenarios, fuels).
+
+    """
+    def __init__(self, regions, scenarios, fuels, factors):
+
+        self.regions = {region: idx for idx, region in enumerate(regions)}
+        self.scenarios = {
+            scenario: idx for idx, scenario in enumerate(scenarios)}
+        self.fuels = {fuel: idx for idx, fuel in enumerate(fuels)}
+        self.factors = np.asarray(factors, dtype=float)
+
+
+    def codes(self, mapping, names):
+        """
+        Return the integer codes of some names, raising a KeyError for
+        unknown names.
+
+        """
+        return np.array([mapping[name] for name in names], dtype=int)
+
+
+    def lookup(self, region, scenarios, fuels):
+        """
+        Return the factors for each scenario (rows) and fuel (columns) in
+        a region.
+
+        """
+        factors = self.factors[self.regions[region]][np.ix_(
+            self.codes(self.scenarios, scenarios),
+            self.codes(self.fuels, fuels))]
+
+        if np.isnan(factors).any():
+            raise KeyError('Missing emissions factors for {}'.format(region))
+
+        return factors
+
+
+def compile_emissions_factors(data):
+    """
+    Compile emissions factors from the IEA emissions factors table.
+
+    Parameters
+    ----------
+    data : pandas DataFrame
+        Rows with region, scenario, fuel and co2_g_kwh. Where a
+        combination is repeated, the last row wins.
+
+    Returns
+    -------
+    emissions_factors : EmissionsFactors
+        Compiled emissions factors.
+
+    """
+    region_codes, regions = pd.factorize(data['region'])
+    scenario_codes, scenarios = pd.factorize(data['scenario'])
+    fuel_codes, fuels = pd.factorize(data['fuel'])
+
+    #rows with a missing region, scenario or fuel are dropped
+    valid = (region_codes >= 0) & (scenario_codes >= 0) & (fuel_codes >= 0)
+
+    values = pd.Series(np.asarray(data['co2_g_kwh'], dtype=float)[valid])
+    last = values.groupby([region_codes[valid], scenario_codes[valid],
+        fuel_codes[valid]], sort=False).last()
+
+    factors = np.full((len(regions), len(scenarios), len(fuels)), np.nan)
+    index = np.array(last.index.tolist(), dtype=int).reshape(-1, 3)
+    factors[index[:, 0], index[:, 1], index[:, 2]] = last.to_numpy()
+
+    return EmissionsFactors(list(regions), list(scenarios), list(fuels),
+        factors)
+
+
+def as_emissions_factors(emissions_lut):
+    """
+    Compile a nested {region: {scenario: {fuel: factor}}} dict, returning
+    compiled emissions factors unchanged.
+
+    """
+    if isinstance(emissions_lut, EmissionsFactors):
+        return emissions_lut
+
+    rows = [
+        (region, scenario, fuel, factor)
+        for region, scenarios in emissions_lut.items()
+        for scenario, fuels in scenarios.items()
+        for fuel, factor in fuels.items()
+    ]
+
+    return compile_emissions_factors(pd.DataFrame(rows,
+        columns=['region', 'scenario', 'fuel', 'co2_g_kwh']))
+
 
 def assess_emissions(country, deciles, on_grid_mix, emissions_lut):
     """
@@ -17,6 +129,10 @@ def assess_emissions(country, deciles, on_grid_mix, emissions_lut):
         All country metadata.
     deciles : list of dicts
         Data for all deciles (one dict per decile).
+    on_grid_mix : dict
+        Share of on-grid generation by fuel type.
+    emissions_lut : EmissionsFactors or dict
+        Emissions factors (g CO2 per kWh) by region, scenario and fuel.
 
     Returns
     -------
@@ -27,6 +143,10 @@ def assess_emissions(country, deciles, on_grid_mix, emissions_lut):
     output = []
     emissions = []
 
+    emissions_lut = as_emissions_factors(emissions_lut)
+    fuels = list(on_grid_mix.keys())
+    factors_kg = {}
+
     for decile in deciles:
 
         decile_dict = {}
@@ -36,10 +156,13 @@ def assess_emissions(country, deciles, on_grid_mix, emissions_lut):
         region = country['iea_classification']
         scenario = decile['energy_scenario']
 
-        for energy_type, percentage in on_grid_mix.items():
+        if scenario not in factors_kg:
+            factors_kg[scenario] = emissions_lut.lookup(
+                region, [scenario], fuels)[0] / 1000
+
+        for idx, (energy_type, percentage) in enumerate(on_grid_mix.items()):
 
-            emissions_by_type = emissions_lut[region][scenario][energy_type]
-            emissions_by_type_kg = emissions_by_type / 1000
+            emissions_by_type_kg = factors_kg[scenario][idx]
 
             energy_type_key = 'existing_emissions_t_co2_' + energy_type
             existing_energy_kwh = (float(decile['network_existing_energy_kwh']) * 
@@ -13,6 +13,8 @@ See the git repo for futher details: https://github.com/urschrei/hexcover
 import os
 import configparser
 import math
+import numpy as np
+import pyproj
 from shapely.geometry import Point, mapping, shape, Polygon
 from rtree import index
 import geopandas as gpd
@@ -317,8 +319,189 @@ def generate_site_areas(point, site_radius):
     return site_area, interfering_site_areas
 
 
+TRANSFORMERS = {}
+
+#axial (q, r) steps to the six neighbours of a hex, in ring order
+HEX_DIRECTIONS = [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)]
+
+
+def project_point(point, original_crs, new_crs):
+    """
+
+    Project x and y coordinates, reusing one transformer per crs pair.
+
+    Parameters
+    ----------
+    point : tuple
+        x and y coordinates.
+    original_crs : string
+        Original Coordinate Reference System.
+    new_crs : string
+        New Coordinate Reference System.
+
+    Returns
+    -------
+    point : tuple
+        x and y coordinates in the new Coordinate Reference System.
+
+    """
+    key = (original_crs, new_crs)
+
+    if key not in TRANSFORMERS:
+        TRANSFORMERS[key] = pyproj.Transformer.from_crs(
+            original_crs, new_crs, always_xy=True)
+
+    return TRANSFORMERS[key].transform(point[0], point[1])
+
+
+def hex_ring_coordinates(rings):
+    """
+
+    Axial coordinates of a hex and the rings of hexes around it.
+
+    Parameters
+    ----------
+    rings : int
+        Number of rings around the central hex.
+
+    Returns
+    -------
+    coordinates : numpy array
+        Axial (q, r) coordinates, starting with the central hex (0, 0),
+        followed by the 6k hexes of each ring k in turn.
+
+    """
+    coordinates = [(0, 0)]
+
+    for ring in range(1, rings + 1):
+        q, r = -ring, ring
+        for dq, dr in HEX_DIRECTIONS:
+            for step in range(ring):
+                coordinates.append((q, r))
+                q, r = q + dq, r + dr
+
+    return np.array(coordinates, dtype=int)
+
+
+def hex_centers(origin, site_radius, rings):
+    """
+
+    Centers of a hex site and the rings of sites around it.
+
+    The hexes are pointy-topped, as in `calculate_polygons`, so every
+    neighbouring site is two site radii away.
+
+    Parameters
+    ----------
+    origin : tuple
+        Projected x and y coordinates of the central site.
+    site_radius : int
+        Distance between transmitter and site edge in meters.
+    rings : int
+        Number of rings around the central site.
+
+    Returns
+    -------
+    centers : numpy array
+        Projected (x, y) coordinates of each site, ordered as in
+        `hex_ring_coordinates`.
+
+    """
+    axial = hex_ring_coordinates(rings)
+
+    x = origin[0] + site_radius * (2 * axial[:, 0] + axial[:, 1])
+    y = origin[1] + site_radius * math.sqrt(3) * axial[:, 1]
+
+    return np.column_stack([x, y])
+
+
+def hexagon_coordinates(x, y, site_radius):
+    """
+
+    Vertices of the hex site area centered on a point, ordered as in
+    `calculate_polygons`.
+
+    """
+    sl = (2 * site_radius) * math.tan(math.pi / 6)
+    p = sl * 0.5
+    b = sl * math.cos(math.radians(30))
+
+    return [
+        (x - b, y - p),
+        (x - b, y + p),
+        (x, y + sl),
+        (x + b, y + p),
+        (x + b, y - p),
+        (x, y - sl),
+        (x - b, y - p),
+    ]
+
+
+def generate_hex_sites(origin, site_radius, rings=1):
+    """
+
+    Generate a site area and the surrounding interfering site areas in
+    closed form, without building and searching a grid of hexagons.
+
+    Parameters
+    ----------
+    origin : tuple
+        Projected x and y coordinates of the transmitter.
+    site_radius : int
+        Distance between transmitter and site edge in meters.
+    rings : int
+        Number of rings of interfering sites (6, 18 or 36 sites for 1, 2
+        or 3 rings).
+
+    Returns
+    -------
+    transmitter : List of dicts
+        Contains a geojson dict for the transmitter site.
+    interfering_transmitters : List of dicts
+        Contains multiple geojson dicts for the interfering transmitter sites.
+    site_area : List of dicts
+        Contains a geojson dict for the transmitter site area.
+    interfering_site_areas : List of dicts
+        Contains multiple geojson dicts for the interfering transmitter site
+        areas.
+
+    """
+    sites = []
+    areas = []
+
+    for site_id, (x, y) in enumerate(hex_centers(origin, site_radius, rings)):
+
+        x, y = float(x), float(y)
+
+        sites.append({
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Point',
+                'coordinates': (x, y),
+            },
+            'properties': {
+                'site_id': site_id
+            }
+        })
+
+        areas.append({
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [hexagon_coordinates(x, y, site_radius)],
+            },
+            'properties': {
+                'site_id': site_id
+            }
+        })
+
+    sites[0]['properties']['site_id'] = 'transmitter'
+
+    return sites[:1], sites[1:], areas[:1], areas[1:]
+
+
 def produce_sites_and_site_areas(unprojected_point, site_radius, unprojected_crs,
-    projected_crs):
+    projected_crs, rings=1):
     """
 
     Meta function to produce a set of hex shapes with a specific site_radius.
@@ -329,6 +512,12 @@ def produce_sites_and_site_areas(unprojected_point, site_radius, unprojected_crs
         x and y coordinates for an unprojected point.
     site_radius : int
         Distance between transmitter and site edge in meters.
+    unprojected_crs : string
+        Coordinate Reference System of the point.
+    projected_crs : string
+        Projected Coordinate Reference System for the sites.
+    rings : int
+        Number of rings of interfering sites.
 
     Returns
     -------
@@ -343,14 +532,6 @@ def produce_sites_and_site_areas(unprojected_point, site_radius, unprojected_crs
         areas.
 
     """
-    point = convert_point_to_projected_crs(unprojected_point, unprojected_crs,
-        projected_crs
-    )
-
-    site_area, interfering_site_areas = generate_site_areas(point, site_radius)
-
-    transmitter, interfering_transmitters = find_site_locations(site_area,
-        interfering_site_areas
-    )
+    origin = project_point(unprojected_point, unprojected_crs, projected_crs)
 
-    return transmitter, interfering_transmitters, site_area, interfering_site_areas
+    return generate_hex_sites(origin, site_radius, rings)
@@ -0,0 +1,171 @@
+"""
+Compiled capacity lookup table.
+
+The capacity lookup table produced by `scripts/sim.py` is compiled into a
+single binary file: a short JSON index header followed by one contiguous
+float64 block. Each (ant_type, frequency, generation, ci) key maps to a
+slice of sorted (sites_per_km2, capacity_mbps_km2) rows. Loading the
+file memory-maps the block, so it is near-instant and the pages are
+shared between worker processes.
+
+Written by Ed Oughton.
+
+October 2026
+
+"""
+import os
+import json
+import struct
+import numpy as np
+import pandas as pd
+
+MAGIC = b'CUCLUT01'
+ALIGNMENT = 64
+
+
+def read_capacity_lut_csv(path):
+    """
+    Read the capacity lookup table .csv into sorted arrays.
+
+    Rows with no capacity are dropped, and rows are sorted by site
+    density (keeping file order for ties), as in `read_capacity_lut`.
+
+    Parameters
+    ----------
+    path : string
+        Path to capacity_lut_by_frequency.csv.
+
+    Returns
+    -------
+    capacity_lut : dict
+        Keyed by (ant_type, frequency, generation, ci) strings, with
+        (n, 2) arrays of site density and capacity.
+
+    """
+    data = pd.read_csv(path, dtype={
+        'ant_type': str, 'generation': str, 'confidence_interval': str})
+
+    data = data[data['capacity_mbps_km2'] > 0]
+
+    frequency = (data['frequency_GHz'].astype(float) * 1e3).astype(int)
+    data = data.assign(frequency=frequency.astype(str))
+
+    capacity_lut = {}
+
+    keys = ['ant_type', 'frequency', 'generation', 'confidence_interval']
+    for key, group in data.groupby(keys, sort=False):
+        group = group.sort_values('sites_per_km2', kind='stable')
+        capacity_lut[key] = group[
+            ['sites_per_km2', 'capacity_mbps_km2']].to_numpy(dtype=float)
+
+    return capacity_lut
+
+
+def write_capacity_lut(capacity_lut, path):
+    """
+    Write a capacity lookup table to the compiled binary format.
+
+    Parameters
+    ----------
+    capacity_lut : dict
+        Keyed by (ant_type, frequency, generation, ci), with sorted
+        (site density, capacity) pairs.
+    path : string
+        Output file path.
+
+    """
+    index = []
+    blocks = []
+    start = 0
+
+    for key, values in capacity_lut.items():
+        values = np.asarray(values, dtype='<f8').reshape(-1, 2)
+        index.append({'key': list(key), 'start': start,
+            'stop': start + len(values)})
+        blocks.append(values)
+        start += len(values)
+
+    header = json.dumps({'rows': start, 'index': index}).encode('utf-8')
+    offset = len(MAGIC) + 8 + len(header)
+    padding = -offset % ALIGNMENT
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header) + padding))
+        f.write(header + b' ' * padding)
+        for values in blocks:
+            f.write(values.tobytes())
+
+    os.replace(path + '.tmp', path)
+
+
+def load_capacity_lut(path):
+    """
+    Memory-map a compiled capacity lookup table.
+
+    Parameters
+    ----------
+    path : string
+        Path to a file written by `write_capacity_lut`.
+
+    Returns
+    -------
+    capacity_lut : dict
+        Keyed by (ant_type, frequency, generation, ci), with read-only
+        (n, 2) array views of site density and capacity.
+
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a compiled capacity lookup table: {}'.format(
+                path))
+        header_length = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    offset = len(MAGIC) + 8 + header_length
+
+    if header['rows'] > 0:
+        data = np.memmap(path, dtype='<f8', mode='r', offset=offset,
+            shape=(header['rows'], 2))
+    else:
+        data = np.empty((0, 2))
+
+    capacity_lut = {}
+
+    for item in header['index']:
+        capacity_lut[tuple(item['key'])] = data[item['start']:item['stop']]
+
+    return capacity_lut
+
+
+def compile_capacity_lut(csv_path, lut_path=None):
+    """
+    Compile the capacity lookup table .csv, unless an up to date
+    compiled file already exists.
+
+    Parameters
+    ----------
+    csv_path : string
+        Path to capacity_lut_by_frequency.csv.
+    lut_path : string, optional
+        Compiled file path. Defaults to the .csv path with a .lut
+        extension.
+
+    Returns
+    -------
+    lut_path : string
+        Path to the compiled file.
+
+    """
+    if lut_path is None:
+        lut_path = os.path.splitext(csv_path)[0] + '.lut'
+
+    if (not os.path.exists(lut_path) or
+        os.path.getmtime(lut_path) < os.path.getmtime(csv_path)):
+        write_capacity_lut(read_capacity_lut_csv(csv_path), lut_path)
+
+    return lut_path
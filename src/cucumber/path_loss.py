@@ -98,6 +98,7 @@ def lognormal_dist_values(mu, sigma, seed_value, draws):
     normal_std = np.sqrt(np.log10(1 + (sigma/mu)**2))
     normal_mean = np.log10(mu) - normal_std**2 / 2
 
-    random_variations = np.random.lognormal(normal_mean, normal_std, draws)
+    random_variations = np.random.default_rng(seed_value).lognormal(
+        normal_mean, normal_std, draws)
 
     return random_variations
@@ -0,0 +1,240 @@
+"""
+Streaming result writers.
+
+Results are appended to disk one batch at a time (for example, one
+country), so memory use is bounded by the largest batch rather than by
+the size of the full output.
+
+Written by Ed Oughton.
+
+October 2026
+
+"""
+import os
+import pandas as pd
+
+
+def open_sink(path, columns=None, backend=None):
+    """
+    Open a result sink, choosing the backend from the file extension
+    unless one is given.
+
+    Parameters
+    ----------
+    path : string
+        Output file path.
+    columns : list, optional
+        Column order. Defaults to the columns of the first batch.
+    backend : string, optional
+        Either 'csv' or 'parquet'.
+
+    Returns
+    -------
+    sink : CSVSink or ParquetSink
+        Open result sink.
+
+    """
+    if backend is None:
+        backend = 'parquet' if path.endswith('.parquet') else 'csv'
+
+    if backend == 'csv':
+        return CSVSink(path, columns)
+    elif backend == 'parquet':
+        return ParquetSink(path, columns)
+    else:
+        raise ValueError('Did not recognize sink backend: {}'.format(backend))
+
+
+class CSVSink(object):
+    """
+
+    Appends batches of rows to a single .csv file.
+
+    Parameters
+    ----------
+    path : string
+        Output file path.
+    columns : list, optional
+        Column order. Defaults to the columns of the first batch.
+
+    """
+    def __init__(self, path, columns=None):
+
+        self.path = path
+        self.columns = list(columns) if columns is not None else None
+        self.rows = 0
+        self._file = None
+
+
+    def write(self, batch):
+        """
+        Append a batch of rows (a DataFrame or a list of dicts).
+
+        """
+        batch = _to_frame(batch, self.columns)
+
+        if self.columns is None:
+            self.columns = list(batch.columns)
+
+        if self._file is None:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            self._file = open(self.path, 'w', newline='')
+            batch.to_csv(self._file, index=False)
+        else:
+            batch.to_csv(self._file, index=False, header=False)
+
+        self.rows += len(batch)
+
+
+    def close(self):
+        """
+        Close the file, writing just the header if no rows were added.
+
+        """
+        if self._file is None and self.columns is not None:
+            self.write(pd.DataFrame(columns=self.columns))
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ParquetSink(object):
+    """
+
+    Appends batches of rows to a single .parquet file as row groups.
+
+    Requires pyarrow. The schema is taken from the first batch, with
+    numeric and boolean columns stored as float64 and all others as
+    strings, so later batches whose columns are ints in one country and
+    floats or missing in another still fit it. Columns with no values in
+    the first batch (e.g. missing from the first country) are stored as
+    strings, and text in a later batch's float64 column is stored as
+    null.
+
+    Parameters
+    ----------
+    path : string
+        Output file path.
+    columns : list, optional
+        Column order. Defaults to the columns of the first batch.
+
+    """
+    def __init__(self, path, columns=None):
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('pyarrow is required to write .parquet results')
+
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.columns = list(columns) if columns is not None else None
+        self.rows = 0
+        self._writer = None
+
+
+    def write(self, batch):
+        """
+        Append a batch of rows (a DataFrame or a list of dicts).
+
+        """
+        batch = _to_frame(batch, self.columns)
+
+        if self.columns is None:
+            self.columns = list(batch.columns)
+
+        if self._writer is None:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            schema = self.pa.schema([
+                (column, self.pa.float64() if _is_numeric(batch[column])
+                    else self.pa.string())
+                for column in batch.columns])
+            self._writer = self.pq.ParquetWriter(self.path, schema)
+
+        table = self.pa.Table.from_pandas(
+            _conform(batch, self._writer.schema, self.pa),
+            schema=self._writer.schema, preserve_index=False)
+
+        self._writer.write_table(table)
+
+        self.rows += len(batch)
+
+
+    def close(self):
+        """
+        Close the file.
+
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _is_numeric(values):
+    """
+    Whether a column is stored as float64 (numbers or booleans) rather
+    than as strings. Columns without any values are stored as strings,
+    as their type is unknown.
+
+    """
+    if values.isna().all():
+        return False
+
+    return (pd.api.types.is_numeric_dtype(values) or
+        pd.api.types.is_bool_dtype(values))
+
+
+def _conform(batch, schema, pa):
+    """
+    Convert each column of a batch to the type it has in the schema.
+
+    """
+    batch = batch.copy()
+
+    for field in schema:
+        values = batch[field.name]
+        if field.type == pa.float64():
+            batch[field.name] = pd.to_numeric(values,
+                errors='coerce').astype('float64')
+        else:
+            batch[field.name] = pd.Series([
+                None if pd.isna(value) else str(value) for value in values
+            ], index=batch.index, dtype=object)
+
+    return batch
+
+
+def _to_frame(batch, columns):
+    """
+    Convert a batch to a DataFrame with the given column order.
+
+    """
+    batch = pd.DataFrame(batch)
+
+    if columns is not None:
+        batch = batch.reindex(columns=columns)
+
+    return batch
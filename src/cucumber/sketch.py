@@ -0,0 +1,124 @@
+"""
+Streaming quantile sketches.
+
+A merging t-digest: values are summarized by at most about
+`compression` weighted centroids, which are small in the tails and
+larger around the median, so quantiles can be estimated from batches
+of any size in constant memory.
+
+Written by Ed Oughton.
+
+October 2026
+
+"""
+import numpy as np
+
+
+class TDigest(object):
+    """
+
+    Streaming quantile sketch (t-digest).
+
+    Each batch of values is merged with the existing centroids in one
+    sorted pass, grouping neighbours which fall within the same unit
+    of the arcsine scale function.
+
+    Parameters
+    ----------
+    compression : int
+        Upper bound on the number of centroids, trading memory for
+        accuracy.
+
+    """
+    def __init__(self, compression=200):
+
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+
+    def update(self, values):
+        """
+        Add an array of values of any shape. NaN values are ignored.
+
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+
+        if len(values) == 0:
+            return self
+
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        self.compress(np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(len(values))]))
+
+        return self
+
+
+    def merge(self, other):
+        """
+        Add all the values summarized by another sketch.
+
+        """
+        if other.count == 0:
+            return self
+
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        self.compress(np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights]))
+
+        return self
+
+
+    def compress(self, means, weights):
+        """
+        Replace the centroids by a compressed summary of weighted means.
+
+        """
+        order = np.argsort(means, kind='stable')
+        means = means[order]
+        weights = weights[order]
+
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+
+        #arcsine scale: centroid sizes shrink towards the tails
+        q = (cumulative - weights / 2) / total
+        k = np.floor(self.compression * (
+            np.arcsin(2 * q - 1) / np.pi + 0.5)).astype(int)
+
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        self.count = total
+
+
+    def quantile(self, q):
+        """
+        Estimate quantiles, with q between 0 and 1 (scalar or array).
+
+        Quantiles are interpolated between centroid means, placed at the
+        middle of their weight, with the exact minimum and maximum at
+        either end. An empty sketch gives NaN.
+
+        """
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)[()]
+
+        positions = np.cumsum(self.weights) - self.weights / 2
+        positions = np.r_[0, positions, self.count]
+        values = np.r_[self.min, self.means, self.max]
+
+        #centroid means are clipped in case of rounding at the ends
+        values = np.clip(values, self.min, self.max)
+
+        return np.interp(np.asarray(q, dtype=float) * self.count,
+            positions, values)[()]
@@ -7,11 +7,12 @@ Winter 2020
 
 """
 import math
+import numpy as np
 from itertools import tee
 from operator import itemgetter
 
 
-def estimate_supply(country, deciles, capacity_lut):
+def estimate_supply(country, deciles, capacity_lut, density_curves=None):
     """
     Estimate supply metrics.
 
@@ -23,6 +24,9 @@ def estimate_supply(country, deciles, capacity_lut):
         Data for all deciles (one dict per decile).
     capacity_lut : dict
         A dictionary containing the lookup capacities.
+    density_curves : dict, optional
+        Precompiled site density curves (see `compile_density_curves`).
+        Missing curves are built on first use and added to this dict.
 
     Returns
     -------
@@ -32,12 +36,16 @@ def estimate_supply(country, deciles, capacity_lut):
     """
     output = []
 
+    if density_curves is None:
+        density_curves = {}
+
     for decile in deciles:
 
         total_site_density = find_site_density(
             country, 
             decile, 
-            capacity_lut
+            capacity_lut,
+            density_curves
         )
 
         decile['network_required_sites'] = math.ceil(
@@ -63,7 +71,7 @@ def estimate_supply(country, deciles, capacity_lut):
     return output
 
 
-def find_site_density(country, decile, capacity_lut):
+def find_site_density(country, decile, capacity_lut, density_curves=None):
 
     """
     For a given decile, estimate the number of needed sites.
@@ -76,6 +84,8 @@ def find_site_density(country, decile, capacity_lut):
         Data for a single decile.
     capacity_lut : dict
         A dictionary containing the lookup capacities.
+    density_curves : dict, optional
+        Precompiled site density curves (see `compile_density_curves`).
 
     Return
     ------
@@ -84,99 +94,202 @@ def find_site_density(country, decile, capacity_lut):
 
     """
     demand = decile['demand_mbps_km2']
-    geotype = decile['geotype'].split(' ')[0]
-    ant_type = 'macro'
     generation = decile['generation']#.split('_')[0]
-    all_frequencies = find_frequencies(country)
-    frequencies = all_frequencies[generation]
     target_gb = decile['capacity'] #30 #find_target(geotype, option)
 
     if target_gb == 0:
         return 0
 
+    curve = get_density_curve(
+        country,
+        generation,
+        capacity_lut,
+        density_curves
+    )
+
+    site_density = find_site_densities(curve, [demand])[0]
+
+    return float(site_density)
+
+
+def compile_density_curves(capacity_lut, incomes, generations,
+    confidence_intervals):
+    """
+    Precompile site density curves for every combination of income tier,
+    generation and confidence interval available in the lookup table.
+
+    Parameters
+    ----------
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    incomes : list
+        Country income tiers, such as HIC or LIC.
+    generations : list
+        Cellular generations, such as 4G or 5G.
+    confidence_intervals : list
+        Confidence interval values.
+
+    Returns
+    -------
+    density_curves : dict
+        Site density and aggregate capacity arrays, keyed by
+        (income, generation, ci).
+
+    """
+    density_curves = {}
+
+    for income in incomes:
+        for generation in generations:
+            for ci in confidence_intervals:
+                try:
+                    get_density_curve(
+                        {'income': income, 'confidence': [ci]},
+                        generation,
+                        capacity_lut,
+                        density_curves
+                    )
+                except KeyError:
+                    continue
+
+    return density_curves
+
+
+def get_density_curve(country, generation, capacity_lut, density_curves=None):
+    """
+    Return the site density curve for a country and generation, building
+    it if it is not already in `density_curves`.
+
+    Parameters
+    ----------
+    country : dict
+        Country metadata.
+    generation : string
+        The cellular generation such as 4G or 5G.
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    density_curves : dict, optional
+        Cache of previously built curves.
+
+    Returns
+    -------
+    curve : tuple of arrays
+        Sorted site densities and their aggregate capacities.
+
+    """
     ci = str(country['confidence'][0])
+    key = (country['income'], generation, ci)
 
-    unique_densities = set()
+    if density_curves is not None and key in density_curves:
+        return density_curves[key]
 
-    capacity = 0
+    frequencies = find_frequencies(country)[generation]
 
-    for item in frequencies:
+    curve = build_density_curve(
+        capacity_lut,
+        frequencies,
+        'macro',
+        generation,
+        ci
+    )
 
-        frequency = str(item['frequency'])
-        bandwidth = str(item['bandwidth'].split('x')[1])
+    if density_curves is not None:
+        density_curves[key] = curve
 
-        density_capacities = lookup_capacity(
-            capacity_lut,
-            geotype,
-            ant_type,
-            frequency,
-            generation,
-            ci
-        )
+    return curve
 
-        for item in density_capacities:
-            site_density, capacity = item
-            unique_densities.add(site_density)
 
-    density_lut = []
+def build_density_curve(capacity_lut, frequencies, ant_type, generation, ci):
+    """
+    Sum the capacity of all bands in a spectrum portfolio at each site
+    density, giving a single site density to capacity curve.
 
-    for density in list(unique_densities):
+    Parameters
+    ----------
+    capacity_lut : dict
+        A dictionary containing the lookup capacities.
+    frequencies : list of dicts
+        Spectrum portfolio (see `find_frequencies`).
+    ant_type : string
+        The antenna type, such as a macro cell or micro cell.
+    generation : string
+        The cellular generation such as 4G or 5G.
+    ci : string
+        Confidence interval.
 
-        capacity = 0
+    Returns
+    -------
+    densities : numpy array
+        Sorted site densities (sites per km^2).
+    capacities : numpy array
+        Aggregate capacity (Mbps per km^2) at each site density.
 
-        for item in frequencies:
+    """
+    pairs = [np.empty((0, 2))]
 
-            frequency = str(item['frequency'])
-            channels, bandwidth = item['bandwidth'].split('x')
-            channels, bandwidth = float(channels), float(bandwidth)
+    for item in frequencies:
 
-            if channels == 1: #allocate downlink channel width when using TDD
-                downlink = 0.8 #float(global_parameters['tdd_dl_to_ul'].split(':')[0])
-                bandwidth = bandwidth * (downlink / 100)
+        density_capacities = lookup_capacity(
+            capacity_lut,
+            None,
+            ant_type,
+            str(item['frequency']),
+            generation,
+            ci
+        )
 
-            density_capacities = lookup_capacity(
-                capacity_lut,
-                geotype,
-                ant_type,
-                frequency,
-                generation,
-                ci
-            )
+        pairs.append(np.asarray(density_capacities, dtype=float).reshape(-1, 2))
 
-            for density_capacity in density_capacities:
+    pairs = np.concatenate(pairs)
 
-                if density_capacity[0] == density:
-                    capacity += density_capacity[1]
+    densities, inverse = np.unique(pairs[:, 0], return_inverse=True)
+    capacities = np.bincount(inverse, weights=pairs[:, 1],
+        minlength=len(densities))
 
-        density_lut.append((density, capacity))
+    return densities, capacities
 
-    density_lut = sorted(density_lut, key=lambda tup: tup[0])
 
-    max_density, max_capacity = density_lut[-1]
-    min_density, min_capacity = density_lut[0]
+def find_site_densities(curve, demand):
+    """
+    Solve the site density needed to meet each demand value, using a
+    binary search over the density curve followed by linear interpolation.
 
-    if demand > max_capacity:
-        return max_density
+    Demand below the curve returns the lowest site density, and demand
+    above it returns the highest.
 
-    elif demand < min_capacity:
-        return min_density
+    Parameters
+    ----------
+    curve : tuple of arrays
+        Sorted site densities and their aggregate capacities.
+    demand : array_like
+        Demand values in Mbps per km^2.
 
-    else:
+    Returns
+    -------
+    site_densities : numpy array
+        Estimated site density for each demand value.
+
+    """
+    densities, capacities = curve
+    demand = np.asarray(demand, dtype=float)
 
-        for a, b in pairwise(density_lut):
+    if len(densities) == 1:
+        return np.full(demand.shape, densities[0])
 
-            lower_density, lower_capacity  = a
-            upper_density, upper_capacity  = b
+    idx = np.searchsorted(capacities, demand, side='right') - 1
+    idx = np.clip(idx, 0, len(capacities) - 2)
 
-            if lower_capacity <= demand < upper_capacity:
+    site_densities = interpolate(
+        capacities[idx], densities[idx],
+        capacities[idx + 1], densities[idx + 1],
+        demand
+    )
 
-                site_density = interpolate(
-                    lower_capacity, lower_density,
-                    upper_capacity, upper_density,
-                    demand
-                )
+    site_densities = np.where(demand > capacities[-1], densities[-1],
+        site_densities)
+    site_densities = np.where(demand < capacities[0], densities[0],
+        site_densities)
 
-                return site_density
+    return site_densities
 
 
 def find_frequencies(country):
@@ -12,9 +12,8 @@ import numpy as np
 from itertools import tee
 from collections import OrderedDict
 
-from cucumber.path_loss import path_loss_calculator, lognormal_dist_values
-
-np.random.seed(42)
+from cucumber.path_loss import path_loss_calculator
+from cucumber.variations import draw_variations
 
 class SimulationManager(object):
     """
@@ -59,7 +58,8 @@ class SimulationManager(object):
 
     def estimate_link_budget(self, frequency, bandwidth,
         generation, ant_type, tranmission_type, environment,
-        modulation_and_coding_lut, simulation_parameters):
+        modulation_and_coding_lut, simulation_parameters,
+        random_variations=None):
         """
 
         Takes propagation parameters and calculates link budget capacity.
@@ -83,6 +83,10 @@ class SimulationManager(object):
             spectral efficiencies and SINR estimates.
         simulation_parameters : dict
             A dict containing all simulation parameters necessary.
+        random_variations : numpy array
+            Lognormal variations with shape (receivers, 1 + interferers):
+            the serving site, then each interfering site. Drawn from the
+            seeded streams for the band when not given.
 
         Returns
         -------
@@ -92,15 +96,19 @@ class SimulationManager(object):
         """
         results = []
 
-        random_variations = lognormal_dist_values(6, 3, 42, len(self.receivers))
+        if random_variations is None:
+            random_variations = self.draw_random_variations(frequency,
+                simulation_parameters)
 
-        for index, receiver in enumerate(self.receivers.values()):
+        #compiled once rather than for every receiver
+        modulation_and_coding_lut = as_spectral_efficiency_lut(
+            modulation_and_coding_lut)
 
-            random_variation = random_variations[index:index+1][0]
+        for index, receiver in enumerate(self.receivers.values()):
 
             path_loss, r_model, r_distance = self.estimate_path_loss(
                 receiver, frequency, environment, simulation_parameters, 
-                random_variation
+                random_variations[index, 0]
             )
 
             received_power = self.estimate_received_power(self.transmitter,
@@ -109,7 +117,7 @@ class SimulationManager(object):
 
             interference, i_model, ave_distance, ave_inf_pl = self.estimate_interference(
                 receiver, frequency, environment, simulation_parameters, 
-                random_variations[::-1])
+                random_variations[index, 1:])
 
             noise = self.estimate_noise(
                 bandwidth
@@ -121,7 +129,7 @@ class SimulationManager(object):
                 )
 
             spectral_efficiency = self.estimate_spectral_efficiency(
-                sinr, generation, modulation_and_coding_lut
+                sinr, generation, modulation_and_coding_lut, tranmission_type
             )
 
             capacity_mbps, capacity_mbps_km2 = (
@@ -155,6 +163,225 @@ class SimulationManager(object):
         return results
 
 
+    def estimate_link_budget_vectorized(self, frequency, bandwidth,
+        generation, ant_type, tranmission_type, environment,
+        modulation_and_coding_lut, simulation_parameters,
+        random_variations=None):
+        """
+
+        Array equivalent of `estimate_link_budget`.
+
+        Distances, path loss, received power, interference, SINR, spectral
+        efficiency and capacity are computed for all receivers at once,
+        giving the same per-receiver results.
+
+        Parameters
+        ----------
+        frequency : float
+            The carrier frequency for the chosen spectrum band (GHz).
+        bandwidth : int
+            The bandwidth of the carrier frequency (MHz).
+        generation : string
+            The technology generation type.
+        ant_type : str
+            Type of antenna (macro, small etc.).
+        tranmission_type : string
+            Transmission type (SISO, MIMO etc.).
+        environment : string
+            Either urban, suburban or rural.
+        modulation_and_coding_lut : list of tuples
+            A lookup table containing modulation and coding rates,
+            spectral efficiencies and SINR estimates.
+        simulation_parameters : dict
+            A dict containing all simulation parameters necessary.
+        random_variations : numpy array
+            Lognormal variations with shape (receivers, 1 + interferers):
+            the serving site, then each interfering site. Drawn from the
+            seeded streams for the band when not given.
+
+        Returns
+        -------
+        results : List of dicts
+            Each dict is an individual simulation result.
+
+        """
+        receivers = list(self.receivers.values())
+
+        if random_variations is None:
+            random_variations = self.draw_random_variations(frequency,
+                simulation_parameters)
+
+        arrays = self.estimate_link_budget_arrays(frequency, bandwidth,
+            generation, tranmission_type, modulation_and_coding_lut,
+            simulation_parameters, random_variations)
+
+        columns = zip(
+            arrays['path_loss'].tolist(),
+            arrays['ave_inf_pl'].tolist(),
+            arrays['received_power'].tolist(),
+            arrays['distance'].tolist(),
+            arrays['interference'].tolist(),
+            arrays['ave_distance'].tolist(),
+            arrays['i_plus_n'].tolist(),
+            arrays['sinr'].tolist(),
+            arrays['spectral_efficiency'].tolist(),
+            arrays['capacity_mbps'].tolist(),
+            arrays['capacity_mbps_km2'].tolist(),
+            arrays['receiver_xy'].tolist(),
+        )
+
+        results = []
+
+        for receiver, values in zip(receivers, columns):
+
+            results.append({
+                'id': receiver.id,
+                'path_loss': values[0],
+                'r_model': 'fspl',
+                'ave_inf_pl': values[1],
+                'received_power': values[2],
+                'distance': values[3],
+                'interference': values[4],
+                'i_model': 'fspl',
+                'network_load': simulation_parameters['network_load'],
+                'ave_distance': values[5],
+                'noise': arrays['noise'],
+                'i_plus_n': values[6],
+                'tranmission_type': tranmission_type,
+                'sinr': values[7],
+                'spectral_efficiency': values[8],
+                'capacity_mbps': values[9],
+                'capacity_mbps_km2': values[10],
+                'receiver_x': values[11][0],
+                'receiver_y': values[11][1],
+                })
+
+        return results
+
+
+    def estimate_link_budget_arrays(self, frequency, bandwidth, generation,
+        tranmission_type, modulation_and_coding_lut, simulation_parameters,
+        random_variations):
+        """
+
+        Link budget arrays for all receivers, over any number of leading
+        dimensions of random variations (e.g. Monte Carlo iterations).
+
+        Parameters
+        ----------
+        frequency : float
+            The carrier frequency for the chosen spectrum band (GHz).
+        bandwidth : int
+            The bandwidth of the carrier frequency (MHz).
+        generation : string
+            The technology generation type.
+        tranmission_type : string
+            Transmission type (SISO, MIMO etc.).
+        modulation_and_coding_lut : list of tuples
+            A lookup table containing modulation and coding rates,
+            spectral efficiencies and SINR estimates.
+        simulation_parameters : dict
+            A dict containing all simulation parameters necessary.
+        random_variations : numpy array
+            Lognormal variations with shape (..., receivers,
+            1 + interferers).
+
+        Returns
+        -------
+        arrays : dict
+            Per-receiver arrays with shape (..., receivers), apart from
+            the distances and coordinates, which do not vary, and the
+            noise, which is a float.
+
+        """
+        receivers = list(self.receivers.values())
+        interferers = list(self.interfering_transmitters.values())
+
+        receiver_xy = np.array(
+            [receiver.coordinates for receiver in receivers], dtype=float)
+        gain = np.array([receiver.gain for receiver in receivers], dtype=float)
+        losses = np.array(
+            [receiver.losses for receiver in receivers], dtype=float)
+        misc_losses = np.array(
+            [receiver.misc_losses for receiver in receivers], dtype=float)
+
+        #serving site
+        distance = np.maximum(straight_line_distance(
+            receiver_xy, np.array([self.transmitter.coordinates], dtype=float)
+        )[:, 0], 20)
+
+        path_loss = (free_space_path_loss(distance, frequency) +
+            random_variations[..., 0])
+
+        eirp = (
+            float(self.transmitter.power) +
+            float(self.transmitter.gain) -
+            float(self.transmitter.losses)
+        )
+
+        received_power = eirp - path_loss - misc_losses + gain - losses
+
+        #interfering sites (receivers x interferers)
+        interference_distance = straight_line_distance(receiver_xy, np.array(
+            [interferer.coordinates for interferer in interferers], dtype=float))
+
+        interference_path_loss = (
+            free_space_path_loss(interference_distance, frequency) +
+            random_variations[..., 1:]
+        )
+
+        interference = (eirp - interference_path_loss - misc_losses[:, None] +
+            gain[:, None] - losses[:, None])
+
+        ave_distance = interference_distance.sum(axis=1) / len(interferers)
+        ave_pl = interference_path_loss.sum(axis=-1) / len(interferers)
+
+        noise = self.estimate_noise(bandwidth)
+
+        raw_sum_of_interference, i_plus_n, sinr = estimate_sinr_arrays(
+            received_power, interference, noise, simulation_parameters)
+
+        spectral_efficiency = estimate_spectral_efficiency_arrays(
+            sinr, generation, modulation_and_coding_lut, tranmission_type)
+
+        capacity_mbps = (bandwidth * 1e6 * spectral_efficiency) / 1e6
+        capacity_mbps_km2 = capacity_mbps / (self.site_area.area / 1e6)
+
+        return {
+            'path_loss': path_loss,
+            'ave_inf_pl': ave_pl,
+            'received_power': received_power,
+            'distance': distance,
+            'interference': np.log10(raw_sum_of_interference),
+            'ave_distance': ave_distance,
+            'noise': noise,
+            'i_plus_n': np.log10(i_plus_n),
+            'sinr': sinr,
+            'spectral_efficiency': spectral_efficiency,
+            'capacity_mbps': capacity_mbps,
+            'capacity_mbps_km2': capacity_mbps_km2,
+            'receiver_xy': receiver_xy,
+        }
+
+
+    def draw_random_variations(self, frequency, simulation_parameters):
+        """
+
+        Draw the lognormal variations for a band from the streams keyed
+        by the seed value (a site radius of 0 is used, as the manager
+        does not know the radius).
+
+        Returns
+        -------
+        random_variations : numpy array
+            Variations with shape (receivers, 1 + interferers).
+
+        """
+        return draw_variations(simulation_parameters.get('seed_value', 42),
+            0, [frequency], len(self.receivers),
+            1 + len(self.interfering_transmitters))[0, 0]
+
+
     def estimate_path_loss(self, receiver, frequency, environment,
         simulation_parameters, random_variation):
         """
@@ -434,7 +661,8 @@ class SimulationManager(object):
             interference_list.append(output_value)
 
         interference_list.sort(reverse=True)
-        interference_list = interference_list[:3]
+        top_n = simulation_parameters.get('interference_top_n', 3) or None
+        interference_list = interference_list[:top_n]
 
         network_load = simulation_parameters['network_load']
         i_summed = sum(interference_list)
@@ -452,7 +680,7 @@ class SimulationManager(object):
 
 
     def estimate_spectral_efficiency(self, sinr, generation,
-        modulation_and_coding_lut):
+        modulation_and_coding_lut, transmission_type=None):
         """
         Uses the SINR to determine spectral efficiency given the relevant
         modulation and coding scheme.
@@ -463,9 +691,12 @@ class SimulationManager(object):
             Signal-to-Interference-plus-Noise-Ratio (SINR) in decibels.
         generation : string
             Either 4G or 5G dependent on technology.
-        modulation_and_coding_lut : list of tuples
+        modulation_and_coding_lut : dict
             A lookup table containing modulation and coding rates,
-            spectral efficiencies and SINR estimates.
+            spectral efficiencies and SINR estimates, either as lists of
+            tuples or compiled with `compile_spectral_efficiency_lut`.
+        transmission_type : string, optional
+            MIMO configuration (e.g. 2x2).
 
         Returns
         -------
@@ -473,30 +704,9 @@ class SimulationManager(object):
             Efficiency of information transfer in Bps/Hz
 
         """
-        lookup = modulation_and_coding_lut[generation]
-
-        spectral_efficiency = 0.1
-        for lower, upper in pairwise(lookup):
-            if lower[0] and upper[0] == generation:
-
-                lower_sinr = lower[6]
-                upper_sinr = upper[6]
-
-                if sinr >= lower_sinr and sinr < upper_sinr:
-                    spectral_efficiency = lower[5]
-                    return spectral_efficiency
-
-                highest_value = lookup[-1]
-
-                if sinr >= highest_value[6]:
-                    spectral_efficiency = highest_value[5]
-                    return spectral_efficiency
-
-                lowest_value = lookup[0]
-
-                if sinr < lowest_value[5]:
-                    spectral_efficiency = 0
-                    return spectral_efficiency
+        return float(estimate_spectral_efficiency_arrays(
+            np.array([sinr], dtype=float), generation,
+            modulation_and_coding_lut, transmission_type)[0])
 
 
     def estimate_average_capacity(self, bandwidth, spectral_efficiency):
@@ -560,6 +770,192 @@ class SimulationManager(object):
         return receiver_density
 
 
+def straight_line_distance(origins, destinations):
+    """
+
+    Euclidean distance between every origin and destination.
+
+    Parameters
+    ----------
+    origins : numpy array
+        Projected coordinates with shape (n, 2).
+    destinations : numpy array
+        Projected coordinates with shape (m, 2).
+
+    Returns
+    -------
+    distance : numpy array
+        Distances in meters with shape (n, m).
+
+    """
+    delta = origins[:, None, :] - destinations[None, :, :]
+
+    return np.sqrt((delta ** 2).sum(axis=2))
+
+
+def free_space_path_loss(distance, frequency):
+    """
+
+    Array version of the free space path loss in `path_loss_calculator`,
+    excluding the random variation.
+
+    """
+    return 20*np.log10(distance) + 20*np.log10(frequency) + 32.44
+
+
+def estimate_sinr_arrays(received_power, interference, noise,
+    simulation_parameters):
+    """
+
+    Array version of `SimulationManager.estimate_sinr`.
+
+    Parameters
+    ----------
+    received_power : numpy array
+        UE received power in decibels, with shape (..., n).
+    interference : numpy array
+        Received interference power in decibels, with shape
+        (..., n, interferers).
+    noise : float
+        Received noise at the UE receiver in decibels
+    simulation_parameters : dict
+        A dict containing all simulation parameters necessary. The
+        optional 'interference_top_n' sets how many of the strongest
+        interferers are summed (3 by default, or all if None or 0).
+
+    Returns
+    -------
+    raw_sum_of_interference : numpy array
+        Linear values of summed interference at each receiver.
+    i_plus_n : numpy array
+        Linear sum of interference plus noise.
+    sinr : numpy array
+        Signal-to-Interference-plus-Noise-Ratio (SINR) in decibels.
+
+    """
+    raw_received_power = 10**received_power
+
+    #keep the strongest interferers (all of them if top_n is None or 0)
+    top_n = simulation_parameters.get('interference_top_n', 3) or None
+    raw_interference = -np.sort(-(10**interference), axis=-1)[..., :top_n]
+
+    i_summed = np.zeros(np.shape(received_power))
+    for idx in range(raw_interference.shape[-1]):
+        i_summed = i_summed + raw_interference[..., idx]
+
+    network_load = simulation_parameters['network_load']
+    raw_sum_of_interference = i_summed * (network_load/100)
+
+    raw_noise = 10**noise
+
+    i_plus_n = (raw_sum_of_interference + raw_noise)
+
+    sinr = np.round(np.log10(raw_received_power / i_plus_n), 2)
+
+    return raw_sum_of_interference, i_plus_n, sinr
+
+
+def compile_spectral_efficiency_lut(modulation_and_coding_lut):
+    """
+
+    Compile the modulation and coding lookup table into sorted SINR
+    thresholds and spectral efficiencies for each generation and MIMO
+    configuration.
+
+    Parameters
+    ----------
+    modulation_and_coding_lut : dict
+        Lists of (generation, MIMO, CQI, modulation, coding rate,
+        spectral efficiency, SINR) tuples, keyed by generation.
+
+    Returns
+    -------
+    spectral_efficiency_lut : dict
+        (thresholds, efficiencies) arrays sorted by SINR, keyed by
+        (generation, MIMO). Each generation also has an entry keyed by
+        (generation, None) covering all of its rows.
+
+    """
+    spectral_efficiency_lut = {}
+
+    for generation, lookup in modulation_and_coding_lut.items():
+
+        groups = {None: list(lookup)}
+        for row in lookup:
+            groups.setdefault(row[1], []).append(row)
+
+        for mimo, rows in groups.items():
+            rows = sorted(rows, key=lambda row: row[6])
+            spectral_efficiency_lut[(generation, mimo)] = (
+                np.array([row[6] for row in rows], dtype=float),
+                np.array([row[5] for row in rows], dtype=float),
+            )
+
+    return spectral_efficiency_lut
+
+
+def as_spectral_efficiency_lut(modulation_and_coding_lut):
+    """
+
+    Compile a modulation and coding lookup table, returning a compiled
+    table unchanged.
+
+    """
+    if all(isinstance(key, tuple) for key in modulation_and_coding_lut):
+        return modulation_and_coding_lut
+
+    return compile_spectral_efficiency_lut(modulation_and_coding_lut)
+
+
+def estimate_spectral_efficiency_arrays(sinr, generation,
+    modulation_and_coding_lut, transmission_type=None):
+    """
+
+    Map SINR values to spectral efficiency with a single binary search.
+
+    Each SINR takes the spectral efficiency of the highest SINR threshold
+    it meets. Values below the lowest threshold have a spectral
+    efficiency of 0, and NaN values stay NaN.
+
+    Parameters
+    ----------
+    sinr : numpy array
+        Signal-to-Interference-plus-Noise-Ratio (SINR) in decibels.
+    generation : string
+        Either 4G or 5G dependent on technology.
+    modulation_and_coding_lut : dict
+        A lookup table containing modulation and coding rates,
+        spectral efficiencies and SINR estimates, either as lists of
+        tuples or compiled with `compile_spectral_efficiency_lut`.
+    transmission_type : string, optional
+        MIMO configuration (e.g. 2x2). All of the generation's rows are
+        used if the table has none for this configuration.
+
+    Returns
+    -------
+    spectral_efficiency : numpy array
+        Efficiency of information transfer in Bps/Hz
+
+    """
+    modulation_and_coding_lut = as_spectral_efficiency_lut(
+        modulation_and_coding_lut)
+
+    key = (generation, transmission_type)
+    if key not in modulation_and_coding_lut:
+        key = (generation, None)
+
+    thresholds, efficiencies = modulation_and_coding_lut[key]
+
+    sinr = np.asarray(sinr, dtype=float)
+
+    idx = np.searchsorted(thresholds, sinr, side='right') - 1
+
+    spectral_efficiency = np.where(idx >= 0,
+        efficiencies[np.maximum(idx, 0)], 0.0)
+
+    return np.where(np.isnan(sinr), np.nan, spectral_efficiency)
+
+
 class Transmitter(object):
     """
 
@@ -0,0 +1,205 @@
+"""
+Resumable staged processing.
+
+A country's preprocessing is a chain of stages, each reading some input
+files and writing some output files. A manifest records a fingerprint of
+each stage's inputs (file sizes and modification times, plus any stage
+parameters) when it last completed. On rerun, a stage is skipped when its
+fingerprint is unchanged and its outputs exist, so only stages downstream
+of a changed input are run again.
+
+Written by Ed Oughton.
+
+October 2026
+
+"""
+import os
+import json
+import hashlib
+
+SHAPEFILE_PARTS = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+
+
+class Stage(object):
+    """
+
+    A single processing stage.
+
+    Parameters
+    ----------
+    name : string
+        Unique stage name.
+    function : callable
+        Called with no arguments to run the stage.
+    inputs : list
+        Paths the stage reads.
+    outputs : list
+        Paths the stage writes.
+    params : dict, optional
+        Other settings the outputs depend on.
+
+    """
+    def __init__(self, name, function, inputs, outputs, params=None):
+
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params if params is not None else {}
+
+
+def expand_paths(paths):
+    """
+    Add the sidecar files of any shapefiles to a list of paths.
+
+    """
+    output = []
+
+    for path in paths:
+        stem, extension = os.path.splitext(path)
+        if extension.lower() == '.shp':
+            output.extend(stem + part for part in SHAPEFILE_PARTS)
+        else:
+            output.append(path)
+
+    return output
+
+
+def fingerprint(stage):
+    """
+    Fingerprint a stage's inputs and parameters.
+
+    Parameters
+    ----------
+    stage : Stage
+        Stage to fingerprint.
+
+    Returns
+    -------
+    fingerprint : string
+        Hex digest, which changes when any input file is added, removed
+        or modified, or when a parameter changes.
+
+    """
+    files = []
+
+    for path in expand_paths(stage.inputs):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            files.append([path, stat.st_size, stat.st_mtime_ns])
+        else:
+            files.append([path, None, None])
+
+    content = json.dumps({'files': files, 'params': stage.params},
+        sort_keys=True, default=str)
+
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def missing_inputs(stage):
+    """
+    Return the declared inputs of a stage which do not exist.
+
+    Shapefile sidecars are not checked, as some (.prj, .cpg) are
+    optional.
+
+    """
+    return [path for path in stage.inputs if not os.path.exists(path)]
+
+
+def read_manifest(path):
+    """
+    Read a manifest, returning an empty one if it does not exist.
+
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, path):
+    """
+    Write a manifest, replacing the old one in a single step.
+
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.replace(path + '.tmp', path)
+
+
+def is_stale(stage, manifest):
+    """
+    Whether a stage needs to run.
+
+    """
+    record = manifest.get(stage.name)
+
+    if record is None or record['fingerprint'] != fingerprint(stage):
+        return True
+
+    return not all(os.path.exists(path) for path in record['outputs'])
+
+
+def run_stages(stages, manifest_path):
+    """
+    Run the stale stages in order, recording each one in the manifest
+    as it completes.
+
+    Stages must be listed so that each comes after the stages whose
+    outputs it reads. Rerunning a stage rewrites its outputs, which
+    changes the fingerprints of the stages that read them.
+
+    A stale stage with a missing declared input raises a
+    FileNotFoundError before it runs, so a wrong path never gets
+    recorded with a fingerprint that later changes to the file would
+    not affect.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        Stages in dependency order.
+    manifest_path : string
+        Path to the .json manifest.
+
+    Returns
+    -------
+    ran : list
+        Names of the stages that were run.
+
+    """
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError('Stage names must be unique: {}'.format(names))
+
+    manifest = read_manifest(manifest_path)
+
+    ran = []
+
+    for stage in stages:
+
+        if not is_stale(stage, manifest):
+            continue
+
+        missing = missing_inputs(stage)
+        if missing:
+            raise FileNotFoundError('Stage {} is missing inputs: {}'.format(
+                stage.name, missing))
+
+        stage.function()
+
+        manifest[stage.name] = {
+            'fingerprint': fingerprint(stage),
+            'outputs': stage.outputs,
+        }
+        write_manifest(manifest, manifest_path)
+
+        ran.append(stage.name)
+
+    return ran
@@ -0,0 +1,203 @@
+"""
+Seeded random variation streams for the system simulator.
+
+Every (site radius, band, receiver) has its own random stream, keyed by
+the simulation seed, so the values a receiver gets do not depend on
+which process draws them, in what order, or what else is simulated
+alongside.
+
+Streams are built on the counter based Philox generator: the seed,
+site radius and band give the Philox key, and each receiver's stream
+starts at its own counter, so one generator can be moved between the
+receivers of a band rather than seeding a new one per receiver.
+
+Written by Ed Oughton.
+
+October 2026
+
+"""
+import numpy as np
+
+
+def band_key(frequency):
+    """
+    Integer key for a carrier frequency in GHz (the frequency in MHz).
+
+    """
+    return int(round(frequency * 1e3))
+
+
+def variation_stream(seed_value, *key):
+    """
+    Return a random number generator for a seed value and integer key.
+
+    Parameters
+    ----------
+    seed_value : int
+        Simulation seed value.
+    key : ints
+        Identifies the stream, e.g. (site radius,).
+
+    Returns
+    -------
+    rng : numpy Generator
+        Generator for the stream.
+
+    """
+    return np.random.default_rng(np.random.SeedSequence(
+        seed_value, spawn_key=tuple(int(value) for value in key)))
+
+
+def philox_key(seed_value, site_radius, frequency):
+    """
+    Return the Philox key for the streams of a site radius and band.
+
+    """
+    return np.random.SeedSequence(seed_value, spawn_key=(int(site_radius),
+        band_key(frequency))).generate_state(2, np.uint64)
+
+
+def philox_state(key, receiver):
+    """
+    Return the Philox state at the start of a receiver's stream.
+
+    """
+    return {
+        'bit_generator': 'Philox',
+        'state': {
+            'counter': np.array([0, 0, receiver, 0], dtype=np.uint64),
+            'key': key,
+        },
+        'buffer': np.zeros(4, dtype=np.uint64),
+        'buffer_pos': 4,
+        'has_uint32': 0,
+        'uinteger': 0,
+    }
+
+
+def receiver_stream(seed_value, site_radius, frequency, receiver):
+    """
+    Return the random number generator for a single receiver's stream.
+
+    """
+    bit_generator = np.random.Philox()
+    bit_generator.state = philox_state(
+        philox_key(seed_value, site_radius, frequency), receiver)
+
+    return np.random.Generator(bit_generator)
+
+
+def lognormal_parameters(mu, sigma):
+    """
+    Return the mean and standard deviation of the underlying normal
+    distribution, as in `lognormal_dist_values`.
+
+    """
+    normal_std = np.sqrt(np.log10(1 + (sigma/mu)**2))
+    normal_mean = np.log10(mu) - normal_std**2 / 2
+
+    return normal_mean, normal_std
+
+
+class VariationStreams(object):
+    """
+
+    The random streams of every receiver for a site radius and band,
+    drawn a batch of iterations at a time.
+
+    Each receiver's stream continues from where the last batch stopped,
+    so the values do not depend on how the iterations are batched.
+
+    Parameters
+    ----------
+    seed_value : int
+        Simulation seed value.
+    site_radius : int
+        Site radius in meters.
+    frequency : float
+        Carrier frequency (GHz).
+    receivers : int
+        Number of receivers.
+    links : int
+        Number of links per receiver (the serving site, then each
+        interfering site).
+    mu : int
+        Mean of the desired distribution.
+    sigma : int
+        Standard deviation of the desired distribution.
+
+    """
+    def __init__(self, seed_value, site_radius, frequency, receivers, links,
+        mu=6, sigma=3):
+
+        key = philox_key(seed_value, site_radius, frequency)
+
+        self.states = [philox_state(key, receiver)
+            for receiver in range(receivers)]
+        self.links = links
+        self.normal_mean, self.normal_std = lognormal_parameters(mu, sigma)
+        self.bit_generator = np.random.Philox()
+        self.rng = np.random.Generator(self.bit_generator)
+
+
+    def draw(self, iterations):
+        """
+        Draw the next iterations for every receiver and link.
+
+        Returns
+        -------
+        random_variations : numpy array
+            Variations with shape (iterations, receivers, links).
+
+        """
+        random_variations = np.empty(
+            (iterations, len(self.states), self.links))
+
+        for receiver, state in enumerate(self.states):
+            self.bit_generator.state = state
+            random_variations[:, receiver, :] = self.rng.lognormal(
+                self.normal_mean, self.normal_std, (iterations, self.links))
+            self.states[receiver] = self.bit_generator.state
+
+        return random_variations
+
+
+def draw_variations(seed_value, site_radius, frequencies, receivers, links,
+    iterations=1, mu=6, sigma=3):
+    """
+    Draw lognormal random variations for every band, receiver and link in
+    bulk.
+
+    Each receiver's values for a band come from its own keyed stream, so
+    drawing more iterations extends rather than changes earlier ones.
+
+    Parameters
+    ----------
+    seed_value : int
+        Simulation seed value.
+    site_radius : int
+        Site radius in meters.
+    frequencies : list
+        Carrier frequencies (GHz).
+    receivers : int
+        Number of receivers.
+    links : int
+        Number of links per receiver (the serving site, then each
+        interfering site).
+    iterations : int
+        Number of draws per link.
+    mu : int
+        Mean of the desired distribution.
+    sigma : int
+        Standard deviation of the desired distribution.
+
+    Returns
+    -------
+    random_variations : numpy array
+        Variations with shape (bands, iterations, receivers, links).
+
+    """
+    return np.array([VariationStreams(seed_value, site_radius, frequency,
+        receivers, links, mu, sigma).draw(iterations)
+        for frequency in frequencies]).reshape(
+        len(frequencies), iterations, receivers, links)
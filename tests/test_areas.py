@@ -0,0 +1,74 @@
+import os
+import pyproj
+import numpy as np
+import pytest
+from shapely.geometry import Polygon, box
+from cucumber.areas import (geodesic_area, geodesic_areas,
+    cached_geodesic_areas)
+
+
+@pytest.fixture(scope='function')
+def setup_geometries():
+
+    return [
+        box(0, 0, 1, 1),
+        box(10, 50, 10.5, 50.5),
+        Polygon([(30, -10), (31, -10), (30.5, -9)]),
+        box(-1, 0, 0, 1).union(box(2, 0, 3, 1)),
+    ]
+
+
+def test_geodesic_area(setup_geometries):
+    """
+    Unit test.
+
+    """
+    geod = pyproj.Geod(ellps='WGS84')
+
+    for geometry in setup_geometries:
+        expected = abs(geod.geometry_area_perimeter(geometry)[0])
+        assert geodesic_area(geometry) == expected
+
+    #a one degree cell at the equator is about 12,309 km^2
+    assert round(geodesic_area(box(0, 0, 1, 1)) / 1e6) == 12309
+
+    assert np.isnan(geodesic_area(Polygon()))
+    assert np.isnan(geodesic_area(None))
+
+
+def test_geodesic_areas(setup_geometries):
+    """
+    Unit test.
+
+    """
+    expected = [geodesic_area(geometry) for geometry in setup_geometries]
+
+    assert geodesic_areas(setup_geometries).tolist() == expected
+    assert geodesic_areas(setup_geometries, workers=2,
+        chunksize=1).tolist() == expected
+
+
+def test_cached_geodesic_areas(setup_geometries, tmp_path):
+    """
+    Unit test.
+
+    """
+    path = os.path.join(str(tmp_path), 'areas', 'region_areas.csv')
+    ids = ['AAA.1_1', 'AAA.2_1', 'AAA.3_1', 'AAA.4_1']
+    expected = [geodesic_area(geometry) for geometry in setup_geometries]
+
+    assert cached_geodesic_areas(ids, setup_geometries, path).tolist() == expected
+    assert os.path.exists(path)
+
+    #an up to date cache is not rewritten
+    modified = os.path.getmtime(path)
+    assert cached_geodesic_areas(ids, setup_geometries, path).tolist() == expected
+    assert os.path.getmtime(path) == modified
+
+    #a changed shape is recomputed rather than read from the cache
+    geometries = list(setup_geometries)
+    geometries[0] = box(0, 0, 2, 2)
+    answer = cached_geodesic_areas(ids, geometries, path)
+
+    assert answer[0] == geodesic_area(box(0, 0, 2, 2))
+    assert answer[1:].tolist() == expected[1:]
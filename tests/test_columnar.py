@@ -0,0 +1,238 @@
+import copy
+import pytest
+import pandas as pd
+from cucumber import columnar
+from cucumber.demand import estimate_demand
+from cucumber.supply import estimate_supply
+from cucumber.energy import assess_energy
+from cucumber.emissions import assess_emissions
+from cucumber.costs import assess_cost
+
+
+@pytest.fixture(scope='function')
+def setup_decile_table(setup_deciles):
+
+    rural = dict(setup_deciles[1])
+    rural.update({
+        'decile': 6,
+        'population_total': 250000,
+        'area_km2': 60000,
+        'population_km2': 4.1667,
+        'total_existing_sites': 120,
+        'total_existing_sites_4G': 60,
+        'backhaul_wireless': 80.0,
+        'backhaul_fiber': 10.0,
+    })
+    empty = dict(rural)
+    empty.update({'decile': 10, 'area_km2': 0})
+
+    return setup_deciles + [rural, empty]
+
+
+def run_dict_path(country, deciles, capacity_lut, on_grid_mix, emissions_lut):
+
+    deciles = copy.deepcopy(deciles)
+    deciles = estimate_demand(country, deciles)
+    deciles = estimate_supply(country, deciles, capacity_lut)
+    deciles, energy = assess_energy(country, deciles, on_grid_mix)
+    deciles, emissions = assess_emissions(
+        country, deciles, on_grid_mix, emissions_lut)
+    deciles = assess_cost(country, deciles)
+
+    return (pd.DataFrame(deciles), pd.DataFrame(energy),
+        pd.DataFrame(emissions))
+
+
+def assert_frames_match(expected, actual):
+
+    assert len(expected) == len(actual)
+    assert set(expected.columns) <= set(actual.columns)
+
+    for column in expected.columns:
+        expected_values = expected[column].tolist()
+        actual_values = actual[column].tolist()
+        if pd.api.types.is_numeric_dtype(expected[column]):
+            assert actual_values == pytest.approx(
+                expected_values, rel=1e-9, nan_ok=True), column
+        else:
+            assert actual_values == expected_values, column
+
+
+@pytest.mark.parametrize('generation, ci', [('4G', 50), ('5G', 90)])
+@pytest.mark.parametrize('backhaul', ['wireless', 'fiber'])
+@pytest.mark.parametrize('sharing', ['baseline', 'passive', 'active', 'srn'])
+def test_run_pipeline_parity(
+        setup_country,
+        setup_decile_table,
+        setup_capacity_lut,
+        setup_on_grid_mix,
+        setup_emissions_lut,
+        generation,
+        ci,
+        backhaul,
+        sharing
+    ):
+    """
+    Integration test against the dict-based functions.
+
+    """
+    setup_country['confidence'] = [ci]
+    for decile in setup_decile_table:
+        decile['generation'] = generation
+        decile['backhaul'] = backhaul
+        decile['sharing_scenario'] = sharing
+
+    expected = run_dict_path(setup_country, setup_decile_table,
+        setup_capacity_lut, setup_on_grid_mix, setup_emissions_lut)
+
+    actual = columnar.run_pipeline(setup_country,
+        pd.DataFrame(setup_decile_table), setup_capacity_lut,
+        setup_on_grid_mix, setup_emissions_lut)
+
+    for expected_frame, actual_frame in zip(expected, actual):
+        assert_frames_match(expected_frame, actual_frame)
+
+
+def test_estimate_demand(setup_country, setup_decile_table):
+    """
+    Unit test.
+
+    """
+    deciles = pd.DataFrame(setup_decile_table)
+
+    answer = columnar.estimate_demand(setup_country, deciles)
+
+    assert len(answer) == 3
+    assert answer['geotype'].tolist() == ['urban', 'suburban', 'rural']
+    assert answer['networks'].tolist() == [4, 4, 4]
+    assert answer['smartphones_on_network'].iloc[0] == (
+        setup_decile_table[0]['population_total'] * 0.9 / 4)
+    assert deciles['geotype'].iloc[1] == 'suburban 1'
+
+
+def test_calc():
+    """
+    Unit test.
+
+    """
+    deciles = pd.DataFrame({
+        'network_new_sites': [1, 0, 2],
+        'smartphones_on_network': [1000, 1000, 0],
+        'population_with_smartphones': [4000, 4000, 4000],
+    })
+
+    assert columnar.calc(deciles, 'network_new_sites').tolist() == [4, 0, 0]
+    assert columnar.calc(deciles, 'missing').tolist() == [0, 0, 0]
+
+
+def test_assess_energy_emissions(
+        setup_country,
+        setup_decile_table,
+        setup_capacity_lut,
+        setup_on_grid_mix,
+        setup_emissions_lut
+    ):
+    """
+    Unit test.
+
+    """
+    setup_country['confidence'] = [50]
+    for decile in setup_decile_table:
+        decile['generation'] = '4G'
+
+    deciles = columnar.estimate_demand(setup_country,
+        pd.DataFrame(setup_decile_table))
+    deciles = columnar.estimate_supply(setup_country, deciles,
+        setup_capacity_lut)
+
+    expected, energy = columnar.assess_energy(
+        setup_country, deciles, setup_on_grid_mix)
+    expected, emissions = columnar.assess_emissions(
+        setup_country, expected, setup_on_grid_mix, setup_emissions_lut)
+
+    answer, by_fuel = columnar.assess_energy_emissions(
+        setup_country, deciles, setup_on_grid_mix, setup_emissions_lut)
+
+    assert_frames_match(expected, answer)
+
+    fuels = list(setup_on_grid_mix.keys())
+    assert by_fuel['fuels'] == fuels
+    for key in ['existing_energy_kwh', 'new_energy_kwh',
+        'existing_emissions_t_co2', 'new_emissions_t_co2']:
+        assert by_fuel[key].shape == (len(deciles), len(fuels))
+
+    assert by_fuel['existing_emissions_t_co2'].sum(axis=1) == pytest.approx(
+        answer['network_existing_emissions_t_co2'].tolist())
+
+    answer, energy_long, emissions_long = columnar.assess_energy_emissions(
+        setup_country, deciles, setup_on_grid_mix, setup_emissions_lut,
+        long_format=True)
+
+    assert_frames_match(energy, energy_long)
+    assert_frames_match(emissions, emissions_long)
+    assert len(emissions_long) == len(deciles) * len(fuels)
+
+
+def test_run_sweep(
+        setup_country,
+        setup_decile_table,
+        setup_capacity_lut,
+        setup_on_grid_mix,
+        setup_emissions_lut
+    ):
+    """
+    Integration test against running the pipeline once per option.
+
+    """
+    setup_country['confidence'] = [50]
+
+    setup_emissions_lut['Europe']['sps-2022'] = {
+        fuel: factor * 2 for fuel, factor in
+        setup_emissions_lut['Europe']['aps-2030'].items()
+    }
+    on_grid_mixes = {
+        'aps-2030': setup_on_grid_mix,
+        'sps-2022': {'wind': 0.25, 'oil': 0.75},
+    }
+
+    options = [
+        '{}_4G_{}_{}_{}'.format(capacity, backhaul, energy, sharing)
+        for capacity in [30, 10]
+        for backhaul in ['wireless', 'fiber']
+        for energy in ['sps-2022', 'aps-2030']
+        for sharing in ['srn', 'baseline', 'active']
+    ]
+
+    deciles = []
+    energy = []
+    emissions = []
+    for option in options:
+        table = pd.DataFrame(setup_decile_table)
+        for axis, value in zip(columnar.SWEEP_AXES, option.split('_')):
+            table[axis] = value
+        results = columnar.run_pipeline(setup_country, table,
+            setup_capacity_lut, on_grid_mixes[option.split('_')[3]],
+            setup_emissions_lut)
+        deciles.append(results[0])
+        energy.append(results[1])
+        emissions.append(results[2])
+
+    expected = [pd.concat(deciles, ignore_index=True),
+        pd.concat(energy, ignore_index=True),
+        pd.concat(emissions, ignore_index=True)]
+
+    actual = columnar.run_sweep(setup_country,
+        pd.DataFrame(setup_decile_table), options, setup_capacity_lut,
+        on_grid_mixes, setup_emissions_lut, long_format=True)
+
+    for expected_frame, actual_frame in zip(expected, actual):
+        assert_frames_match(expected_frame, actual_frame)
+
+    answer = columnar.run_sweep(setup_country,
+        pd.DataFrame(setup_decile_table), options, setup_capacity_lut,
+        on_grid_mixes, setup_emissions_lut)
+
+    assert len(answer) == len(options) * 3
+    assert list(answer.columns[:len(setup_decile_table[0])]) == [
+        column for column in setup_decile_table[0]
+        if column not in columnar.SWEEP_AXES] + columnar.SWEEP_AXES
@@ -1,5 +1,8 @@
 import pytest
-from cucumber.emissions import assess_emissions
+import numpy as np
+import pandas as pd
+from cucumber.emissions import (assess_emissions, compile_emissions_factors,
+    as_emissions_factors)
 
 
 def test_assess_emissions(        
@@ -79,3 +82,38 @@ def test_assess_emissions(
     assert emissions[1]['new_energy_kwh'] == 10000.0
     assert emissions[1]['existing_emissions_t_co2'] == 0.0001
     assert emissions[1]['new_emissions_t_co2'] == 0.0001
+
+
+def test_compile_emissions_factors():
+    """
+    Unit test.
+
+    """
+    data = pd.DataFrame({
+        'region': ['Europe', 'Europe', 'Africa', 'Europe', np.nan],
+        'scenario': ['sps-2022', 'aps-2030', 'sps-2022', 'sps-2022', 'sps-2022'],
+        'fuel': ['oil', 'oil', 'wind', 'oil', 'oil'],
+        'co2_g_kwh': [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+
+    answer = compile_emissions_factors(data)
+
+    assert answer.factors.shape == (2, 2, 2)
+    assert answer.regions == {'Europe': 0, 'Africa': 1}
+
+    #the last row wins for repeated combinations
+    assert answer.lookup('Europe', ['sps-2022', 'aps-2030'],
+        ['oil']).tolist() == [[4.0], [2.0]]
+    assert answer.lookup('Africa', ['sps-2022'], ['wind']).tolist() == [[3.0]]
+
+    with pytest.raises(KeyError):
+        answer.lookup('Africa', ['sps-2022'], ['oil'])
+    with pytest.raises(KeyError):
+        answer.lookup('World', ['sps-2022'], ['oil'])
+
+    nested = {'Europe': {'sps-2022': {'oil': 4.0}, 'aps-2030': {'oil': 2.0}}}
+    answer = as_emissions_factors(nested)
+
+    assert as_emissions_factors(answer) is answer
+    assert answer.lookup('Europe', ['aps-2030', 'sps-2022'],
+        ['oil']).tolist() == [[2.0], [4.0]]
@@ -0,0 +1,104 @@
+import math
+import pytest
+import numpy as np
+from shapely.geometry import Polygon
+from cucumber.generate_hex import (hex_ring_coordinates, hex_centers,
+    hexagon_coordinates, generate_hex_sites, produce_sites_and_site_areas,
+    convert_point_to_projected_crs, generate_site_areas, find_site_locations)
+
+
+def test_hex_ring_coordinates():
+    """
+    Unit test.
+
+    """
+    for rings, count in [(0, 1), (1, 7), (2, 19), (3, 37)]:
+        answer = hex_ring_coordinates(rings)
+        assert len(answer) == count
+        assert len(set(map(tuple, answer))) == count
+
+    answer = hex_ring_coordinates(3)
+    q, r = answer[:, 0], answer[:, 1]
+    ring = (np.abs(q) + np.abs(r) + np.abs(q + r)) // 2
+
+    assert ring.tolist() == [0] + [1] * 6 + [2] * 12 + [3] * 18
+
+
+def test_hex_centers():
+    """
+    Unit test.
+
+    """
+    origin = (1000.0, -500.0)
+    answer = hex_centers(origin, 250, 2)
+
+    assert answer[0].tolist() == [1000.0, -500.0]
+
+    distances = np.hypot(answer[:, 0] - origin[0], answer[:, 1] - origin[1])
+    assert distances[1:7] == pytest.approx([500] * 6)
+    assert distances[7:].max() == pytest.approx(1000)
+
+    #every site is at least one inter-site distance from every other
+    gaps = np.hypot(*(answer[:, None, :] - answer[None, :, :]).T)
+    assert gaps[~np.eye(len(answer), dtype=bool)].min() == pytest.approx(500)
+
+
+def test_generate_hex_sites():
+    """
+    Unit test.
+
+    """
+    transmitter, interfering_transmitters, site_area, interfering_site_areas = \
+        generate_hex_sites((0, 0), 1000, rings=2)
+
+    assert transmitter[0]['geometry']['coordinates'] == (0, 0)
+    assert transmitter[0]['properties']['site_id'] == 'transmitter'
+    assert len(interfering_transmitters) == len(interfering_site_areas) == 18
+
+    polygon = Polygon(site_area[0]['geometry']['coordinates'][0])
+    assert polygon.area == pytest.approx(2 * math.sqrt(3) * 1000 ** 2)
+
+    #neighbouring site areas tile without overlapping
+    for area in interfering_site_areas[:6]:
+        neighbour = Polygon(area['geometry']['coordinates'][0])
+        assert polygon.intersection(neighbour).area == pytest.approx(0, abs=1e-3)
+        assert polygon.touches(neighbour) or polygon.distance(neighbour) < 1e-6
+
+
+def test_produce_sites_and_site_areas():
+    """
+    Integration test against the hex grid search.
+
+    """
+    point = (-0.0733, 51.4231)
+    site_radius = 2000
+
+    transmitter, interfering_transmitters, site_area, interfering_site_areas = \
+        produce_sites_and_site_areas(point, site_radius, 'epsg:4326',
+            'epsg:3857')
+
+    projected = convert_point_to_projected_crs(point, 'epsg:4326', 'epsg:3857')
+    assert transmitter[0]['geometry']['coordinates'] == pytest.approx(
+        projected['geometry'].coords[0])
+
+    expected_area, expected_interfering_areas = generate_site_areas(
+        projected, site_radius)
+    expected_transmitter, expected_interfering = find_site_locations(
+        expected_area, expected_interfering_areas)
+
+    #the same layout, up to the grid's offset from the point
+    offset = np.subtract(transmitter[0]['geometry']['coordinates'],
+        expected_transmitter[0]['geometry']['coordinates'])
+
+    expected = sorted(
+        tuple(np.round(np.add(site['geometry']['coordinates'], offset), 3))
+        for site in expected_interfering)
+    answer = sorted(
+        tuple(np.round(site['geometry']['coordinates'], 3))
+        for site in interfering_transmitters)
+
+    assert answer == expected
+
+    assert np.allclose(
+        np.add(expected_area[0]['geometry']['coordinates'][0], offset),
+        site_area[0]['geometry']['coordinates'][0])
@@ -0,0 +1,99 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from cucumber.lut import (read_capacity_lut_csv, write_capacity_lut,
+    load_capacity_lut, compile_capacity_lut)
+from cucumber.supply import build_density_curve
+
+
+@pytest.fixture(scope='function')
+def setup_lut_csv(tmp_path):
+
+    rows = []
+    for frequency, generation in [(0.7, '5G'), (0.8, '4G'), (3.5, '5G')]:
+        for density, capacity in [(4.6, 300), (0.01, 0), (0.29, 20), (1.15, 80)]:
+            rows.append({
+                'confidence_interval': 50,
+                'environment': 'free-space',
+                'sites_per_km2': density,
+                'frequency_GHz': frequency,
+                'generation': generation,
+                'ant_type': 'macro',
+                'capacity_mbps_km2': capacity * frequency,
+            })
+
+    path = os.path.join(str(tmp_path), 'capacity_lut_by_frequency.csv')
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+    return path
+
+
+def test_read_capacity_lut_csv(setup_lut_csv):
+    """
+    Unit test.
+
+    """
+    answer = read_capacity_lut_csv(setup_lut_csv)
+
+    assert list(answer.keys()) == [
+        ('macro', '700', '5G', '50'),
+        ('macro', '800', '4G', '50'),
+        ('macro', '3500', '5G', '50'),
+    ]
+
+    assert answer[('macro', '800', '4G', '50')].tolist() == [
+        [0.29, 20 * 0.8], [1.15, 80 * 0.8], [4.6, 300 * 0.8]]
+
+
+def test_write_and_load_capacity_lut(setup_lut_csv, tmp_path):
+    """
+    Unit test.
+
+    """
+    capacity_lut = read_capacity_lut_csv(setup_lut_csv)
+    capacity_lut[('micro', '2600', '4G', '90')] = [(0.5, 1.0), (2.0, 5.0)]
+
+    path = os.path.join(str(tmp_path), 'compiled', 'capacity_lut.lut')
+    write_capacity_lut(capacity_lut, path)
+
+    answer = load_capacity_lut(path)
+
+    assert answer.keys() == capacity_lut.keys()
+    for key, values in capacity_lut.items():
+        assert np.asarray(values).tolist() == answer[key].tolist()
+        assert not answer[key].flags.writeable
+
+    with open(path, 'wb') as f:
+        f.write(b'not a lut')
+
+    with pytest.raises(ValueError):
+        load_capacity_lut(path)
+
+
+def test_compile_capacity_lut(setup_lut_csv):
+    """
+    Unit test.
+
+    """
+    path = compile_capacity_lut(setup_lut_csv)
+
+    assert path == setup_lut_csv.replace('.csv', '.lut')
+
+    #an up to date file is reused
+    modified = os.path.getmtime(path)
+    assert compile_capacity_lut(setup_lut_csv) == path
+    assert os.path.getmtime(path) == modified
+
+    capacity_lut = load_capacity_lut(path)
+    frequencies = [{'frequency': 700}, {'frequency': 3500}]
+
+    densities, capacities = build_density_curve(
+        capacity_lut, frequencies, 'macro', '5G', '50')
+
+    expected = build_density_curve(read_capacity_lut_csv(setup_lut_csv),
+        frequencies, 'macro', '5G', '50')
+
+    assert densities.tolist() == expected[0].tolist() == [0.29, 1.15, 4.6]
+    assert capacities.tolist() == expected[1].tolist()
+    assert capacities[0] == 20 * 0.7 + 20 * 3.5
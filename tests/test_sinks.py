@@ -0,0 +1,141 @@
+import os
+import pytest
+import pandas as pd
+from cucumber.sinks import open_sink, CSVSink
+
+
+def test_csv_sink(tmp_path):
+    """
+    Unit test.
+
+    """
+    path = os.path.join(str(tmp_path), 'results', 'output.csv')
+
+    with open_sink(path) as sink:
+        sink.write([{'iso3': 'GBR', 'value': 1}, {'iso3': 'GBR', 'value': 2}])
+        sink.write(pd.DataFrame([{'value': 3, 'iso3': 'KEN'}]))
+
+    assert isinstance(sink, CSVSink)
+    assert sink.rows == 3
+
+    answer = pd.read_csv(path)
+    assert answer.columns.tolist() == ['iso3', 'value']
+    assert answer['value'].tolist() == [1, 2, 3]
+    assert answer['iso3'].tolist() == ['GBR', 'GBR', 'KEN']
+
+    #matches writing the concatenated data in one go
+    expected = pd.DataFrame([
+        {'iso3': 'GBR', 'value': 1},
+        {'iso3': 'GBR', 'value': 2},
+        {'iso3': 'KEN', 'value': 3},
+    ])
+    with open(path) as results:
+        assert results.read() == expected.to_csv(index=False)
+
+
+def test_csv_sink_columns(tmp_path):
+    """
+    Unit test.
+
+    """
+    path = os.path.join(str(tmp_path), 'output.csv')
+
+    with open_sink(path, columns=['a', 'b']) as sink:
+        sink.write([{'b': 1}])
+        sink.write([{'a': 2, 'b': 3, 'c': 4}])
+
+    answer = pd.read_csv(path)
+    assert answer.columns.tolist() == ['a', 'b']
+    assert answer['b'].tolist() == [1, 3]
+
+    path = os.path.join(str(tmp_path), 'empty.csv')
+    with open_sink(path, columns=['a', 'b']):
+        pass
+
+    assert pd.read_csv(path).columns.tolist() == ['a', 'b']
+
+
+def test_parquet_sink(tmp_path):
+    """
+    Unit test.
+
+    """
+    pytest.importorskip('pyarrow')
+
+    path = os.path.join(str(tmp_path), 'output.parquet')
+
+    with open_sink(path) as sink:
+        sink.write([{'iso3': 'GBR', 'value': 1.5}])
+        sink.write([{'iso3': 'KEN', 'value': 2.5}])
+
+    answer = pd.read_parquet(path)
+    assert answer['iso3'].tolist() == ['GBR', 'KEN']
+    assert answer['value'].tolist() == [1.5, 2.5]
+
+
+def test_parquet_sink_types(tmp_path):
+    """
+    Unit test of batches whose column types differ.
+
+    """
+    pytest.importorskip('pyarrow')
+
+    path = os.path.join(str(tmp_path), 'output.parquet')
+
+    with open_sink(path) as sink:
+        sink.write(pd.DataFrame({'iso3': ['GBR'], 'sites': [3],
+            'backhaul': [None]}))
+        sink.write(pd.DataFrame({'iso3': ['KEN', None],
+            'sites': [2.5, float('nan')], 'backhaul': ['fiber', None]}))
+        sink.write(pd.DataFrame({'sites': [1], 'iso3': ['IND'],
+            'backhaul': [4], 'new': ['dropped']}))
+
+    assert sink.rows == 4
+
+    answer = pd.read_parquet(path)
+    assert answer.columns.tolist() == ['iso3', 'sites', 'backhaul']
+    assert answer['iso3'].tolist()[:2] == ['GBR', 'KEN']
+    assert answer['iso3'].iloc[3] == 'IND'
+    assert answer['iso3'].isna().tolist() == [False, False, True, False]
+    assert answer['sites'].tolist()[:2] == [3.0, 2.5]
+    assert answer['sites'].isna().tolist() == [False, False, True, False]
+    assert answer['sites'].iloc[3] == 1.0
+    assert answer['backhaul'].isna().tolist() == [True, False, True, False]
+    assert answer['backhaul'].tolist()[1::2] == ['fiber', '4']
+
+
+def test_parquet_sink_missing_columns(tmp_path):
+    """
+    Unit test of columns with no values in the first batch.
+
+    """
+    pytest.importorskip('pyarrow')
+
+    path = os.path.join(str(tmp_path), 'output.parquet')
+
+    with open_sink(path, columns=['iso3', 'geotype', 'decile', 'sites']) \
+        as sink:
+        sink.write([{'iso3': 'GBR', 'decile': float('nan'), 'sites': 1}])
+        sink.write([{'iso3': 'KEN', 'geotype': 'urban', 'decile': 'd1',
+            'sites': 'unknown'}])
+        sink.write([{'iso3': 'IND', 'geotype': 'rural', 'decile': 2,
+            'sites': 2.5}])
+
+    answer = pd.read_parquet(path)
+    assert answer['iso3'].tolist() == ['GBR', 'KEN', 'IND']
+    assert answer['geotype'].isna().tolist() == [True, False, False]
+    assert answer['geotype'].tolist()[1:] == ['urban', 'rural']
+    assert answer['decile'].tolist()[1:] == ['d1', '2']
+
+    #text which cannot be parsed in a numeric column is stored as null
+    assert answer['sites'].isna().tolist() == [False, True, False]
+    assert answer['sites'].tolist()[::2] == [1.0, 2.5]
+
+
+def test_open_sink_backend(tmp_path):
+    """
+    Unit test.
+
+    """
+    with pytest.raises(ValueError):
+        open_sink(os.path.join(str(tmp_path), 'output.txt'), backend='txt')
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from cucumber.sketch import TDigest
+
+
+def test_tdigest():
+    """
+    Unit test.
+
+    """
+    rng = np.random.default_rng(42)
+    values = rng.lognormal(0, 1, (100, 2000))
+
+    sketch = TDigest()
+    for batch in values:
+        sketch.update(batch)
+
+    assert sketch.count == values.size
+    assert len(sketch.means) <= sketch.compression + 1
+    assert sketch.weights.sum() == values.size
+
+    #estimates are within a small fraction of a percentile rank
+    ordered = np.sort(values.ravel())
+    quantiles = [0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999]
+    answer = sketch.quantile(quantiles)
+    ranks = np.searchsorted(ordered, answer) / ordered.size
+    assert ranks == pytest.approx(quantiles, abs=5e-4)
+
+    #the extremes are exact
+    assert sketch.quantile(0) == values.min()
+    assert sketch.quantile(1) == values.max()
+
+
+def test_tdigest_small():
+    """
+    Unit test.
+
+    """
+    sketch = TDigest()
+    assert np.isnan(sketch.quantile(0.5))
+
+    #NaN values are ignored and a few values are kept exactly
+    sketch.update([5, 1, np.nan, 3, 2, 4])
+    assert sketch.count == 5
+    assert sketch.means.tolist() == [1, 2, 3, 4, 5]
+    assert sketch.quantile(0.5) == 3
+
+    sketch = TDigest().update(np.full(1000, -3.5))
+    assert sketch.quantile([0, 0.1, 0.5, 1]).tolist() == [-3.5] * 4
+
+
+def test_tdigest_merge():
+    """
+    Unit test.
+
+    """
+    rng = np.random.default_rng(1)
+    values = rng.normal(0, 1, 50000)
+
+    merged = TDigest().update(values[:20000]).merge(
+        TDigest().update(values[20000:]))
+
+    assert merged.count == 50000
+    assert merged.min == values.min()
+    assert merged.max == values.max()
+    assert merged.quantile([0.05, 0.5, 0.95]) == pytest.approx(
+        np.quantile(values, [0.05, 0.5, 0.95]), abs=0.01)
@@ -2,7 +2,8 @@ import math
 import pytest
 from cucumber.demand import estimate_demand
 from cucumber.supply import (estimate_supply, find_site_density,
-    estimate_site_upgrades, estimate_backhaul_upgrades)
+    estimate_site_upgrades, estimate_backhaul_upgrades, build_density_curve,
+    compile_density_curves, find_site_densities, find_frequencies)
 
 def test_find_site_density(
     setup_country,
@@ -39,6 +40,50 @@ def test_find_site_density(
     assert round(answer, 1) == .3
 
 
+def test_build_density_curve(setup_country, setup_capacity_lut):
+
+    frequencies = find_frequencies(setup_country)['4G']
+
+    densities, capacities = build_density_curve(
+        setup_capacity_lut, frequencies, 'macro', '4G', '50')
+
+    #800 + 1800 + 2600 MHz capacity at each density
+    assert densities.tolist() == [0.01, 0.02, 0.05, 0.15, 2]
+    assert capacities.tolist() == [11, 22, 45, 95, 2100]
+
+
+def test_compile_density_curves(setup_capacity_lut):
+
+    curves = compile_density_curves(
+        setup_capacity_lut, ['HIC', 'LIC'], ['4G', '5G'], [50, 90])
+
+    assert set(curves.keys()) == {
+        ('HIC', '4G', '50'), ('HIC', '5G', '90'),
+        ('LIC', '4G', '50'), ('LIC', '5G', '90'),
+    }
+    assert curves[('LIC', '4G', '50')][1].tolist() == [1, 2, 5, 15, 100]
+    assert curves[('HIC', '5G', '90')][1].tolist() == [6, 12, 25, 55, 1100]
+
+
+def test_find_site_densities(setup_capacity_lut):
+
+    curve = compile_density_curves(
+        setup_capacity_lut, ['LIC'], ['4G'], [50])[('LIC', '4G', '50')]
+
+    answer = find_site_densities(curve, [0.5, 1, 1.5, 5, 100, 250])
+
+    assert answer.tolist() == pytest.approx([0.01, 0.01, 0.015, 0.05, 2, 2])
+
+    #batch results match the single decile solver
+    country = {'income': 'LIC', 'confidence': [50]}
+    for demand, site_density in zip([0.5, 1.5, 10, 60], 
+        find_site_densities(curve, [0.5, 1.5, 10, 60])):
+        decile = {
+            'demand_mbps_km2': demand, 'generation': '4G', 'capacity': '20'}
+        assert find_site_density(
+            country, decile, setup_capacity_lut) == site_density
+
+
 def test_estimate_site_upgrades(
         setup_country,
         setup_deciles
@@ -0,0 +1,318 @@
+import math
+import pytest
+import numpy as np
+from cucumber.generate_hex import generate_hex_sites
+from cucumber.variations import draw_variations
+from cucumber.system_simulator import (SimulationManager,
+    estimate_sinr_arrays, compile_spectral_efficiency_lut,
+    estimate_spectral_efficiency_arrays)
+
+
+PARAMETERS = {
+    'los_breakpoint_m': 500,
+    'tx_macro_baseline_height': 30,
+    'tx_macro_power': 40,
+    'tx_macro_gain': 16,
+    'tx_macro_losses': 1,
+    'rx_gain': 0,
+    'rx_losses': 4,
+    'rx_misc_losses': 4,
+    'rx_height': 1.5,
+    'network_load': 100,
+}
+
+MODULATION_AND_CODING_LUT = {
+    '4G': [
+        ('4G', '2x2', 1, 'QPSK', 78, 0.3, -6.7),
+        ('4G', '2x2', 2, 'QPSK', 120, 0.46, -4.7),
+        ('4G', '2x2', 3, 'QPSK', 193, 0.74, -2.3),
+        ('4G', '2x2', 4, 'QPSK', 308, 1.2, 0.2),
+        ('4G', '2x2', 5, 'QPSK', 449, 1.6, 2.4),
+        ('4G', '2x2', 6, 'QPSK', 602, 2.2, 4.3),
+        ('4G', '2x2', 7, '16QAM', 378, 2.8, 5.9),
+        ('4G', '2x2', 8, '16QAM', 490, 3.8, 8.1),
+        ('4G', '2x2', 9, '16QAM', 616, 4.8, 10.3),
+        ('4G', '2x2', 10, '64QAM', 466, 5.4, 11.7),
+        ('4G', '2x2', 11, '64QAM', 567, 6.6, 14.1),
+        ('4G', '2x2', 12, '64QAM', 666, 7.8, 16.3),
+        ('4G', '2x2', 13, '64QAM', 772, 9, 18.7),
+        ('4G', '2x2', 14, '64QAM', 973, 10.2, 21),
+        ('4G', '2x2', 15, '64QAM', 948, 11.4, 22.7),
+    ],
+}
+
+
+def feature(x, y, properties):
+
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': (x, y)},
+        'properties': properties,
+    }
+
+
+def build_manager(site_radius):
+
+    transmitter = [feature(0, 0, {'site_id': 'transmitter'})]
+
+    interfering_transmitters = []
+    for idx in range(6):
+        angle = math.radians(30 + 60 * idx)
+        interfering_transmitters.append(feature(
+            2 * site_radius * math.cos(angle),
+            2 * site_radius * math.sin(angle),
+            {'site_id': 'site_id_{}'.format(idx)}
+        ))
+
+    hexagon = [(site_radius * math.cos(math.radians(60 * idx)),
+        site_radius * math.sin(math.radians(60 * idx))) for idx in range(6)]
+    site_area = [{
+        'type': 'Feature',
+        'geometry': {'type': 'Polygon', 'coordinates': [hexagon + hexagon[:1]]},
+        'properties': {'site_id': 'site_area'},
+    }]
+
+    receivers = []
+    steps = np.linspace(-0.8 * site_radius, 0.8 * site_radius, 15)
+    for x in steps:
+        for y in steps:
+            receivers.append(feature(x, y, {
+                'ue_id': 'id_{}'.format(len(receivers)),
+                'ue_height': PARAMETERS['rx_height'],
+                'gain': PARAMETERS['rx_gain'],
+                'losses': PARAMETERS['rx_losses'],
+                'misc_losses': PARAMETERS['rx_misc_losses'],
+                'indoor': False,
+            }))
+
+    return SimulationManager(transmitter, interfering_transmitters, 'macro',
+        receivers, site_area, PARAMETERS)
+
+
+@pytest.mark.parametrize('site_radius', [500, 5000])
+@pytest.mark.parametrize('frequency', [0.8, 2.6])
+def test_estimate_link_budget_vectorized(site_radius, frequency):
+    """
+    Integration test against the per-receiver link budget.
+
+    """
+    manager = build_manager(site_radius)
+    args = (frequency, 10, '4G', 'macro', '2x2', 'free-space',
+        MODULATION_AND_CODING_LUT, PARAMETERS)
+
+    expected = manager.estimate_link_budget(*args)
+    actual = manager.estimate_link_budget_vectorized(*args)
+
+    assert len(expected) == len(actual) == 225
+
+    for expected_result, actual_result in zip(expected, actual):
+        assert expected_result.keys() == actual_result.keys()
+        for key, value in expected_result.items():
+            if isinstance(value, str):
+                assert actual_result[key] == value, key
+            else:
+                assert actual_result[key] == pytest.approx(
+                    value, rel=1e-9), key
+
+
+@pytest.mark.parametrize('rings, top_n', [(1, 3), (2, None), (3, 6)])
+def test_interference_rings(rings, top_n):
+    """
+    Integration test for several tiers of interfering sites.
+
+    """
+    site_radius = 500
+    manager = build_manager(site_radius)
+    receivers = list(manager.receivers.values())
+    receivers = [feature(receiver.coordinates[0], receiver.coordinates[1], {
+        'ue_id': receiver.id,
+        'ue_height': PARAMETERS['rx_height'],
+        'gain': PARAMETERS['rx_gain'],
+        'losses': PARAMETERS['rx_losses'],
+        'misc_losses': PARAMETERS['rx_misc_losses'],
+        'indoor': False,
+        }) for receiver in receivers]
+
+    transmitter, interfering_transmitters, site_area, _ = generate_hex_sites(
+        (0, 0), site_radius, rings)
+
+    parameters = dict(PARAMETERS, interference_top_n=top_n)
+    manager = SimulationManager(transmitter, interfering_transmitters,
+        'macro', receivers, site_area, parameters)
+    args = (0.8, 10, '4G', 'macro', '2x2', 'free-space',
+        MODULATION_AND_CODING_LUT, parameters)
+
+    assert len(manager.interfering_transmitters) == 3 * rings * (rings + 1)
+
+    expected = manager.estimate_link_budget(*args)
+    actual = manager.estimate_link_budget_vectorized(*args)
+
+    for expected_result, actual_result in zip(expected, actual):
+        assert actual_result['sinr'] == pytest.approx(
+            expected_result['sinr'], rel=1e-9)
+        assert actual_result['interference'] == pytest.approx(
+            expected_result['interference'], rel=1e-9)
+
+
+def test_random_variations():
+    """
+    Unit test of the seeded random variations.
+
+    """
+    manager = build_manager(500)
+    args = (0.8, 10, '4G', 'macro', '2x2', 'free-space',
+        MODULATION_AND_CODING_LUT, PARAMETERS)
+
+    #reproducible without any global random state
+    np.random.seed(1)
+    expected = manager.estimate_link_budget_vectorized(*args)
+    np.random.seed(2)
+    actual = manager.estimate_link_budget_vectorized(*args)
+    assert actual == expected
+
+    #given variations are used for the serving and interfering sites
+    random_variations = np.zeros((225, 7))
+    actual = manager.estimate_link_budget_vectorized(*args,
+        random_variations=random_variations)
+    expected = manager.estimate_link_budget(*args,
+        random_variations=random_variations)
+
+    distance = np.array([result['distance'] for result in actual])
+    path_loss = np.array([result['path_loss'] for result in actual])
+    assert path_loss == pytest.approx(
+        20 * np.log10(distance / 1e3) + 20 * np.log10(800) + 32.44)
+
+    for expected_result, actual_result in zip(expected, actual):
+        assert actual_result['sinr'] == pytest.approx(
+            expected_result['sinr'], rel=1e-9)
+
+    random_variations[:, 1:] = 10
+    louder = manager.estimate_link_budget_vectorized(*args,
+        random_variations=random_variations)
+    for result, quieter in zip(louder, actual):
+        assert result['ave_inf_pl'] == pytest.approx(quieter['ave_inf_pl'] + 10)
+
+
+def test_estimate_link_budget_compiles_once(monkeypatch):
+    """
+    Unit test.
+
+    """
+    import cucumber.system_simulator as system_simulator
+
+    calls = []
+    compile_lut = system_simulator.compile_spectral_efficiency_lut
+
+    def counted(lut):
+        calls.append(lut)
+        return compile_lut(lut)
+
+    monkeypatch.setattr(system_simulator, 'compile_spectral_efficiency_lut',
+        counted)
+
+    manager = build_manager(500)
+    results = manager.estimate_link_budget(0.8, 10, '4G', 'macro', '2x2',
+        'free-space', MODULATION_AND_CODING_LUT, PARAMETERS)
+
+    assert len(results) == 225
+    assert len(calls) == 1
+
+
+def test_estimate_link_budget_arrays():
+    """
+    Unit test of link budgets over several iterations at once.
+
+    """
+    manager = build_manager(500)
+    random_variations = draw_variations(42, 500, [0.8], 225, 7,
+        iterations=4)[0]
+
+    arrays = manager.estimate_link_budget_arrays(0.8, 10, '4G', '2x2',
+        MODULATION_AND_CODING_LUT, PARAMETERS, random_variations)
+
+    assert arrays['sinr'].shape == (4, 225)
+    assert arrays['distance'].shape == (225,)
+
+    #each iteration matches a single link budget with its variations
+    for iteration in range(4):
+        results = manager.estimate_link_budget_vectorized(0.8, 10, '4G',
+            'macro', '2x2', 'free-space', MODULATION_AND_CODING_LUT,
+            PARAMETERS, random_variations[iteration])
+
+        for key in ['path_loss', 'received_power', 'interference', 'sinr',
+            'spectral_efficiency', 'capacity_mbps_km2']:
+            assert arrays[key][iteration].tolist() == [
+                result[key] for result in results], key
+
+
+def test_estimate_sinr_arrays():
+    """
+    Unit test.
+
+    """
+    received_power = np.array([-5.0, -6.0])
+    interference = np.array([
+        [-7.0, -8.0, -9.0, -10.0, -11.0, -12.0, -13.0],
+        [-9.0, -7.0, -8.0, -7.5, -12.0, -12.0, -12.0],
+    ])
+    noise = -10.0
+
+    raw, i_plus_n, sinr = estimate_sinr_arrays(
+        received_power, interference, noise, PARAMETERS)
+    assert raw[0] == pytest.approx(10**-7 + 10**-8 + 10**-9)
+    assert raw[1] == pytest.approx(10**-7 + 10**-7.5 + 10**-8)
+
+    #more interferers lower the sinr
+    parameters = dict(PARAMETERS, interference_top_n=None)
+    all_raw, all_i_plus_n, all_sinr = estimate_sinr_arrays(
+        received_power, interference, noise, parameters)
+    assert all_raw == pytest.approx((10**interference).sum(axis=1))
+    assert (all_sinr <= sinr).all()
+
+    parameters = dict(PARAMETERS, network_load=50)
+    half_raw, _, _ = estimate_sinr_arrays(
+        received_power, interference, noise, parameters)
+    assert half_raw == pytest.approx(raw / 2)
+
+
+def test_estimate_spectral_efficiency_arrays():
+    """
+    Unit test of the boundaries between modulation and coding schemes.
+
+    """
+    manager = build_manager(500)
+
+    #below, on and between thresholds (SINR values between 0.3 and 1.2
+    #used to be compared against spectral efficiency and given 0)
+    sinr = np.array([-10, -6.71, -6.7, -5, -4.7, 0.19, 0.2, 0.25, 1.0,
+        22.69, 22.7, 30, np.nan])
+
+    answer = estimate_spectral_efficiency_arrays(
+        sinr, '4G', MODULATION_AND_CODING_LUT)
+
+    assert answer[:-1].tolist() == [0, 0, 0.3, 0.3, 0.46, 0.74, 1.2, 1.2,
+        1.2, 10.2, 11.4, 11.4]
+    assert np.isnan(answer[-1])
+
+    for value, result in zip(sinr[:-1], answer[:-1]):
+        assert result == manager.estimate_spectral_efficiency(
+            value, '4G', MODULATION_AND_CODING_LUT)
+
+    #a compiled table, unsorted rows and a missing MIMO configuration
+    compiled = compile_spectral_efficiency_lut({
+        '4G': MODULATION_AND_CODING_LUT['4G'][::-1]})
+
+    assert estimate_spectral_efficiency_arrays(sinr, '4G', compiled,
+        '4x4')[:-1].tolist() == answer[:-1].tolist()
+
+    lut = {'5G': [
+        ('5G', '2x2', 1, 'QPSK', 78, 0.5, -5.0),
+        ('5G', '2x2', 2, 'QPSK', 193, 1.0, 0.0),
+        ('5G', '4x4', 1, 'QPSK', 78, 1.5, -5.0),
+        ('5G', '4x4', 2, 'QPSK', 193, 3.0, 0.0),
+    ]}
+
+    assert estimate_spectral_efficiency_arrays(np.array([-6, -5, 1]), '5G',
+        lut, '2x2').tolist() == [0, 0.5, 1.0]
+    assert estimate_spectral_efficiency_arrays(np.array([-6, -5, 1]), '5G',
+        lut, '4x4').tolist() == [0, 1.5, 3.0]
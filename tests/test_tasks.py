@@ -0,0 +1,146 @@
+import os
+import pytest
+from cucumber.tasks import (Stage, expand_paths, fingerprint, read_manifest,
+    run_stages)
+
+
+def write(path, text):
+
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+@pytest.fixture(scope='function')
+def setup_pipeline(tmp_path):
+
+    folder = str(tmp_path)
+    paths = {
+        name: os.path.join(folder, name + '.csv')
+        for name in ['raw', 'first', 'second', 'other']
+    }
+    write(paths['raw'], '1')
+    write(paths['other'], '1')
+
+    calls = []
+
+    def first():
+        calls.append('first')
+        with open(paths['raw']) as f:
+            write(paths['first'], f.read() + '2')
+
+    def second():
+        calls.append('second')
+        with open(paths['first']) as f:
+            write(paths['second'], f.read() + '3')
+
+    def stages(params=None):
+        return [
+            Stage('first', first, [paths['raw']], [paths['first']]),
+            Stage('second', second, [paths['first'], paths['other']],
+                [paths['second']], params=params),
+        ]
+
+    manifest = os.path.join(folder, 'manifest', 'manifest.json')
+
+    return paths, calls, stages, manifest
+
+
+def test_run_stages(setup_pipeline):
+    """
+    Unit test.
+
+    """
+    paths, calls, stages, manifest = setup_pipeline
+
+    assert run_stages(stages(), manifest) == ['first', 'second']
+    assert set(read_manifest(manifest)) == {'first', 'second'}
+    with open(paths['second']) as f:
+        assert f.read() == '123'
+
+    #nothing changed
+    assert run_stages(stages(), manifest) == []
+
+    #only the stage reading a changed input reruns
+    write(paths['other'], '22')
+    assert run_stages(stages(), manifest) == ['second']
+
+    #a changed upstream input reruns everything downstream
+    write(paths['raw'], '99')
+    assert run_stages(stages(), manifest) == ['first', 'second']
+    with open(paths['second']) as f:
+        assert f.read() == '9923'
+
+    #missing outputs and changed parameters rerun a stage
+    os.remove(paths['second'])
+    assert run_stages(stages(), manifest) == ['second']
+    assert run_stages(stages({'seed': 1}), manifest) == ['second']
+
+    assert calls == ['first', 'second', 'second', 'first', 'second',
+        'second', 'second']
+
+
+def test_run_stages_failure(setup_pipeline):
+    """
+    Unit test.
+
+    """
+    paths, calls, stages, manifest = setup_pipeline
+
+    def fail():
+        raise RuntimeError('failed')
+
+    failing = stages()
+    failing[1].function = fail
+
+    with pytest.raises(RuntimeError):
+        run_stages(failing, manifest)
+
+    #the completed stage is kept, and the failed stage is retried
+    assert set(read_manifest(manifest)) == {'first'}
+    assert run_stages(stages(), manifest) == ['second']
+
+    with pytest.raises(ValueError):
+        run_stages(stages() + stages(), manifest)
+
+
+def test_run_stages_missing_input(setup_pipeline):
+    """
+    Unit test.
+
+    """
+    paths, calls, stages, manifest = setup_pipeline
+
+    os.remove(paths['other'])
+
+    #the first stage runs, the second is neither run nor recorded
+    with pytest.raises(FileNotFoundError):
+        run_stages(stages(), manifest)
+
+    assert calls == ['first']
+    assert set(read_manifest(manifest)) == {'first'}
+
+    #once the input exists, the second stage runs
+    write(paths['other'], '1')
+    assert run_stages(stages(), manifest) == ['second']
+
+
+def test_fingerprint(tmp_path):
+    """
+    Unit test.
+
+    """
+    path = os.path.join(str(tmp_path), 'regions.shp')
+
+    assert expand_paths([path, 'a.csv'])[:3] == [
+        path, path.replace('.shp', '.shx'), path.replace('.shp', '.dbf')]
+    assert expand_paths([path, 'a.csv'])[-1] == 'a.csv'
+
+    stage = Stage('regions', None, [path], [])
+    missing = fingerprint(stage)
+
+    write(path.replace('.shp', '.dbf'), 'attributes')
+    assert fingerprint(stage) != missing
+    assert fingerprint(stage) == fingerprint(stage)
+
+    stage.params = {'tile_size': 256}
+    assert fingerprint(stage) != missing
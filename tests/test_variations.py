@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from cucumber.variations import (band_key, receiver_stream,
+    lognormal_parameters, VariationStreams, draw_variations)
+
+
+def test_band_key():
+    """
+    Unit test.
+
+    """
+    assert band_key(0.7) == 700
+    assert band_key(2.6) == 2600
+    assert band_key(3.5) == 3500
+
+
+def test_draw_variations():
+    """
+    Unit test.
+
+    """
+    frequencies = [0.7, 0.8, 3.5]
+    answer = draw_variations(42, 1000, frequencies, 50, 7, iterations=3)
+
+    assert answer.shape == (3, 3, 50, 7)
+    assert (answer > 0).all()
+
+    #reproducible, and independent of the other bands drawn
+    assert np.array_equal(answer,
+        draw_variations(42, 1000, frequencies, 50, 7, iterations=3))
+    assert np.array_equal(answer[1],
+        draw_variations(42, 1000, [0.8], 50, 7, iterations=3)[0])
+
+    #independent of the number of receivers and extended by iterations
+    assert np.array_equal(answer[:, :, :20],
+        draw_variations(42, 1000, frequencies, 20, 7, iterations=3))
+    assert np.array_equal(answer[:, :2],
+        draw_variations(42, 1000, frequencies, 50, 7, iterations=2))
+
+    #each receiver has its own stream
+    normal_mean, normal_std = lognormal_parameters(6, 3)
+    rng = receiver_stream(42, 1000, 0.8, 17)
+    assert np.array_equal(answer[1, :, 17],
+        rng.lognormal(normal_mean, normal_std, (3, 7)))
+
+    #other seeds, radii and bands give different values
+    for seed_value, site_radius, frequency in [(43, 1000, 0.8),
+        (42, 1500, 0.8), (42, 1000, 1.8)]:
+        other = draw_variations(seed_value, site_radius, [frequency], 50, 7,
+            iterations=3)[0]
+        assert not np.isclose(other, answer[1]).any()
+
+
+def test_variation_streams():
+    """
+    Unit test.
+
+    """
+    expected = draw_variations(42, 1000, [0.8], 30, 4, iterations=10)[0]
+
+    #the same values however the iterations are batched
+    streams = VariationStreams(42, 1000, 0.8, 30, 4)
+    answer = np.concatenate([streams.draw(size) for size in [3, 1, 6]])
+
+    assert answer.shape == (10, 30, 4)
+    assert np.array_equal(answer, expected)
+
+
+def test_draw_variations_distribution():
+    """
+    Unit test.
+
+    """
+    answer = draw_variations(42, 500, [0.8], 2000, 50)[0, 0]
+    normal_mean, normal_std = lognormal_parameters(6, 3)
+
+    assert np.log(answer).mean() == pytest.approx(normal_mean, abs=0.01)
+    assert np.log(answer).std() == pytest.approx(normal_std, abs=0.01)
@@ -0,0 +1,148 @@
+import os
+import pytest
+import numpy as np
+import rasterio
+from rasterio.mask import mask
+from affine import Affine
+from shapely.geometry import Polygon, box, mapping
+from cucumber.zonal import (iter_windows, label_grid, zonal_sums,
+    zonal_sums_tiled, clip_raster_tiled)
+
+
+@pytest.fixture(scope='function')
+def setup_raster():
+
+    rng = np.random.default_rng(1)
+
+    array = rng.gamma(0.5, 40, size=(60, 80)).astype('float32')
+    array[rng.random(array.shape) < 0.1] = 0
+    array[5, 5] = -99
+    array[6, 6] = np.nan
+
+    transform = Affine(0.01, 0, 30.0, 0, -0.01, 1.0)
+
+    return array, transform
+
+
+@pytest.fixture(scope='function')
+def setup_raster_path(setup_raster, tmp_path):
+
+    array, transform = setup_raster
+
+    path = os.path.join(str(tmp_path), 'settlements.tif')
+    with rasterio.open(path, 'w', driver='GTiff', height=array.shape[0],
+        width=array.shape[1], count=1, dtype='float32', crs='epsg:4326',
+        transform=transform, nodata=255) as dest:
+        dest.write(array, 1)
+
+    return path
+
+
+@pytest.fixture(scope='function')
+def setup_geometries():
+
+    return [
+        box(30.0, 0.6, 30.35, 1.0),
+        Polygon([(30.3512, 0.6013), (30.8031, 0.9987), (30.7969, 0.4021),
+            (30.4037, 0.4511)]),
+        None,
+        box(30.1, 0.41, 30.333, 0.597),
+        box(31.5, 0.0, 32.0, 0.5),
+    ]
+
+
+def test_iter_windows():
+    """
+    Unit test.
+
+    """
+    windows = list(iter_windows(5, 7, 3))
+
+    assert len(windows) == 6
+    assert (windows[0].col_off, windows[0].row_off) == (0, 0)
+    assert (windows[1].col_off, windows[1].row_off) == (3, 0)
+    assert (windows[-1].width, windows[-1].height) == (1, 2)
+    assert sum(w.width * w.height for w in windows) == 35
+
+
+def test_label_grid(setup_raster, setup_geometries):
+    """
+    Unit test.
+
+    """
+    array, transform = setup_raster
+
+    labels = label_grid(setup_geometries, array.shape, transform)
+
+    assert labels.shape == array.shape
+    assert labels[0, 0] == 1
+    assert labels[59, 0] == 0
+    assert set(np.unique(labels)) == {0, 1, 2, 4}
+
+    assert label_grid([None], (2, 2), transform).tolist() == [[0, 0], [0, 0]]
+
+
+def test_zonal_sums(setup_raster, setup_geometries):
+    """
+    Integration test against rasterstats.
+
+    """
+    zonal_stats = pytest.importorskip('rasterstats').zonal_stats
+
+    array, transform = setup_raster
+
+    answer = zonal_sums(array, transform, setup_geometries)
+
+    assert len(answer) == len(setup_geometries)
+
+    clamped = array.copy()
+    clamped[clamped <= 0] = 0
+
+    for geometry, value in zip(setup_geometries, answer):
+        if geometry is None:
+            assert value == 0
+            continue
+        expected = zonal_stats(geometry, clamped, stats=['sum'], nodata=0,
+            affine=transform)[0]['sum']
+        assert value == pytest.approx(expected or 0, rel=1e-6)
+        assert round(value) == round(expected or 0)
+
+
+@pytest.mark.parametrize('tile_size', [7, 32, 1000])
+def test_zonal_sums_tiled(setup_raster, setup_raster_path, setup_geometries,
+    tile_size):
+    """
+    Unit test.
+
+    """
+    array, transform = setup_raster
+
+    expected = zonal_sums(array, transform, setup_geometries)
+
+    answer = zonal_sums_tiled(setup_raster_path, setup_geometries, tile_size)
+
+    assert answer.tolist() == pytest.approx(expected.tolist(), rel=1e-12)
+
+
+@pytest.mark.parametrize('tile_size', [5, 1000])
+def test_clip_raster_tiled(setup_raster_path, tmp_path, tile_size):
+    """
+    Integration test against rasterio.mask.
+
+    """
+    shapes = [mapping(Polygon(
+        [(30.1213, 0.9317), (30.6089, 0.8121), (30.5231, 0.5213),
+        (30.2019, 0.5687)]))]
+    path = os.path.join(str(tmp_path), 'clipped.tif')
+
+    with rasterio.open(setup_raster_path) as src:
+        expected, expected_transform = mask(src, shapes, crop=True)
+        clip_raster_tiled(src, shapes, path, tile_size)
+
+    with rasterio.open(path) as clipped:
+        assert clipped.transform == expected_transform
+        assert clipped.nodata == 255
+        answer = clipped.read()
+
+    np.testing.assert_array_equal(answer, expected)
+    assert (answer == 255).any()